@@ -0,0 +1,107 @@
+import os
+import platform
+import sys
+
+import benchmark
+
+'''
+CPU 학습 host 를 위한 Session thread pool autotune
+
+1. benchmark 와 같이 메모리 안의 랜덤 이미지로, 후보 설정마다 새 process 에서 steps 만큼 학습해서 steps/s 를 잰다.
+   -> 후보 설정의 OMP, KMP 환경 변수는 새 process 에서 tensorflow 를 import 하기 전에 적용된다.
+      부모 shell 에 이미 설정된 값은 후보 설정으로 덮어쓰거나 지운다.
+2. 1단계 : intra_op(=OMP_NUM_THREADS) x inter_op 조합을 잰다.
+   2단계 : 1단계에서 가장 빠른 조합에 KMP_BLOCKTIME 을 바꿔가며 잰다.
+   -> 모든 조합을 재지 않으므로 짧게 끝난다.
+3. 가장 빠른 설정을 ~/.tensorflow_thread_config/{host}.json 의 모델 이름 아래에 저장한다.
+   -> 모든 model() 은 threads=None 이면 이 설정을 불러와서 Session 을 만든다.(ThreadConfig.py)
+4. cores 를 주면 모든 후보 설정을 그 core 들에 고정(pinning, KMP_AFFINITY)해서 찾고, 모델 이름/slot 아래에 저장한다.
+   -> 학습할 때 threads=slot 으로 불러온다.
+   -> 같은 host 에서 같은 모델을 여러 개 동시에 학습할 때, slot 마다 다른 core 를 준다.
+   -> cores 를 주지 않으면 core 를 고정하지 않는다.(동시에 돌리는 학습들이 모두 같은 core 에 고정되지 않도록)
+5. save_default=True 이면 찾은 설정을 host 기본 설정("default")으로도 저장한다.
+   -> autotune 으로 재지 않는 모델들(NeuralStyle, Word2Vec, CNN, FNN, Autoencoder 등)은 자기 설정이 없으면 이 설정을 쓴다.
+   -> slot 설정(core 고정)은 host 기본 설정으로 저장하지 않는다.
+'''
+
+
+def _setting(intra_op, inter_op, cores=None, kmp_blocktime=None):
+    setting = {"intra_op": intra_op, "inter_op": inter_op, "OMP_NUM_THREADS": intra_op}
+    if cores:
+        setting["cores"] = list(cores)
+        setting["KMP_AFFINITY"] = "granularity=fine,compact,1,0"
+    if kmp_blocktime is not None:
+        setting["KMP_BLOCKTIME"] = kmp_blocktime
+    return setting
+
+
+def autotune(model="pix2pix", image_size=(256, 256), batch_size=1, norm_selection="IN", steps=10,
+             cores=None, slot=None, intra_ops=None, inter_ops=(1, 2, 4), kmp_blocktimes=(0, 1), save=True, save_default=False, **kwargs):
+
+    folder, _ = benchmark.MODELS[model]
+    sys.path.insert(0, os.path.join(benchmark.APPLICATION_PATH, folder))
+    import ThreadConfig
+
+    if cores is not None and slot is None:
+        print("<<< cores 를 주면 slot 도 주어야 합니다. -> 학습할 때 threads=slot 으로 불러온다. >>>")
+        exit(0)
+    if cores is not None:
+        cores = list(cores)
+        available = len(cores)
+    else:
+        available = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    if intra_ops is None:
+        intra_ops = sorted({max(1, available // 4), max(1, available // 2), available})
+
+    results = []
+
+    def measure(setting):
+        result = benchmark.benchmark(model=model, image_size=image_size, batch_size=batch_size,
+                                     norm_selection=norm_selection, steps=steps, threads=setting, **kwargs)
+        speed = result.get("steps_per_sec", 0.0)
+        print("<<< {} : {} >>>".format(setting if setting else "tensorflow 기본값",
+                                       result.get("error", "{:.3f} steps/s".format(speed))))
+        results.append((speed, setting))
+        return speed
+
+    # tensorflow 기본값
+    default_speed = measure(False)
+
+    # 1단계 - thread pool 크기
+    for intra_op in intra_ops:
+        for inter_op in inter_ops:
+            measure(_setting(intra_op, inter_op, cores=cores))
+    best_speed, best = max((result for result in results if result[1]), key=lambda result: result[0])
+
+    # 2단계 - KMP_BLOCKTIME
+    for kmp_blocktime in kmp_blocktimes:
+        measure(_setting(best["intra_op"], best["inter_op"], cores=cores, kmp_blocktime=kmp_blocktime))
+    best_speed, best = max((result for result in results if result[1]), key=lambda result: result[0])
+
+    if best_speed <= default_speed:
+        print("<<< {} : tensorflow 기본값({:.3f} steps/s)보다 빠른 설정이 없습니다. >>>".format(model, default_speed))
+        best = False
+    else:
+        print("<<< {} : {} -> {:.3f} steps/s (기본값 {:.3f} steps/s, x{:.2f}) >>>".format(
+            model, best, best_speed, default_speed, best_speed / default_speed if default_speed else float("inf")))
+    if save:
+        path = ThreadConfig.save_thread_config(model, best if best else {}, slot=slot)
+        print("<<< {} : {} saved as {} >>>".format(platform.node(), path, ThreadConfig.thread_config_key(model, slot)))
+        if save_default and slot is None:
+            path = ThreadConfig.save_thread_config(ThreadConfig.DEFAULT_MODEL, best if best else {})
+            print("<<< {} : {} saved as {} >>>".format(platform.node(), path, ThreadConfig.DEFAULT_MODEL))
+    return best
+
+
+if __name__ == "__main__":
+    # model -> pix2pix, CycleGAN
+    # 같은 host 에서 두 학습을 나눠서 돌린다면 예) cores=range(0, 32), slot="0" / cores=range(32, 64), slot="1" 로 각각 찾는다.
+    for model, norm_selection in (("pix2pix", "IN"), ("CycleGAN", "IN")):
+        autotune(model=model, image_size=(256, 256), batch_size=1, norm_selection=norm_selection, steps=10,
+                 cores=None,  # None -> 이 process 가 쓸 수 있는 모든 core 를 쓰고 고정하지 않는다.
+                 slot=None,  # cores 를 줄 때 저장할 이름 -> 학습할 때 threads=slot 으로 불러온다.
+                 intra_ops=None,  # None -> core 개수의 1/4, 1/2, 전부
+                 inter_ops=(1, 2, 4),
+                 kmp_blocktimes=(0, 1),  # ms, MKL(oneDNN) 빌드에서 OpenMP thread 가 일이 끝난 뒤 기다리는 시간
+                 save=True,  # ~/.tensorflow_thread_config/{host}.json 에 저장
+                 save_default=model == "pix2pix")  # True -> 나머지 모델들이 쓸 host 기본 설정으로도 저장
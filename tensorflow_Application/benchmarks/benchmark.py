@@ -0,0 +1,137 @@
+import importlib
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+'''
+pix2pix(ImageToImageTranslation), CycleGAN(UnpairedImageToImageTranslation) 학습 속도 측정
+
+1. 데이터셋을 받거나 TFRecord 를 만들지 않고, 메모리 안의 랜덤 이미지(synthetic_size)로 학습한다.
+2. 설정마다 새 process 에서, 임시 폴더를 작업 폴더로 해서 실행한다.
+   -> 그래프, checkpoint, tensorboard 파일, 메모리(peak RSS)가 설정끼리 섞이지 않는다.
+3. 측정 항목 : graph 생성 시간(s), 첫 step 시간(ms), 첫 step 을 뺀 steps/s 와 images/s, peak RSS(MB)
+4. 결과는 results/{git commit}.json 으로 저장한다. -> commit 끼리 비교(diff)할 수 있다.
+5. data_format="NCHW" 설정은 NCHW 를 지원하지 않는 tensorflow(MKL 이 아닌 CPU 빌드)에서는 NHWC 로 측정되고, 결과에 표시된다.
+6. xla 가 있는 설정은 xla 만 뺀 설정과 비교해서 컴파일 시간(첫 step 시간의 차이, ms)과 steps/s 의 배율(speedup)을 같이 기록한다.
+   -> 첫 step 에서 XLA 컴파일을 하므로, 첫 step 을 뺀 steps/s 가 컴파일 후의 속도이다.
+'''
+
+APPLICATION_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 이름 : (폴더, module)
+MODELS = {
+    "pix2pix": ("tensorflow_ImageToImageTranslationWithConditionalAdversarialNetworks_Graph",
+                "ImageToImageTranslation"),
+    "CycleGAN": ("tensorflow_UnpairedImageToImageTranslationUsingCycleConsistentAdversarialNetworks_Graph",
+                 "UnpairedImageToImageTranslation"),
+}
+
+
+def _run(model, kwargs, queue):
+
+    folder, module = MODELS[model]
+    sys.path.insert(0, os.path.join(APPLICATION_PATH, folder))
+    working_path = tempfile.mkdtemp(prefix="benchmark_")
+    os.chdir(working_path)
+    try:
+        # 후보 thread 설정(threads)은 tensorflow 를 import 하기 전에 적용한다.
+        # -> 부모 shell 에 설정된 OMP, KMP 환경 변수는 후보 설정으로 덮어쓰거나 지운다.(threads=False 이면 모두 지운다.)
+        threads = kwargs.get("threads")
+        if threads is not None and not isinstance(threads, str):
+            import ThreadConfig
+            ThreadConfig.apply_environment(threads, override=True)
+            ThreadConfig.pin_cores(threads.get("cores") if threads else None)
+        import tensorflow as tf
+        result = importlib.import_module(module).model(**kwargs)
+        # 리눅스에서 ru_maxrss 의 단위는 KB
+        result["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        result["tensorflow"] = tf.__version__
+        queue.put(result)
+    finally:
+        shutil.rmtree(working_path, ignore_errors=True)
+
+
+def benchmark(model="pix2pix", image_size=(256, 256), batch_size=1, norm_selection="IN", steps=20, **kwargs):
+
+    config = dict(model=model, image_size=list(image_size), batch_size=batch_size, norm_selection=norm_selection,
+                  steps=steps, **kwargs)
+    # 1 epoch 만 학습하고, checkpoint 는 저장하지 않는다.(display_step > training_epochs)
+    model_kwargs = dict(TEST=False, synthetic_size=tuple(image_size), synthetic_length=steps * batch_size,
+                        Inputsize_limit=tuple(image_size), norm_selection=norm_selection, batch_size=batch_size,
+                        training_epochs=1, display_step=2, **kwargs)
+
+    print("<<< benchmark : {} >>>".format(config))
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=_run, args=(model, model_kwargs, queue))
+    process.start()
+    process.join()
+    if queue.empty():
+        # 모델 안에서 exit() 했거나 오류가 난 경우
+        return dict(config, error="exit code {}".format(process.exitcode))
+    return dict(config, **queue.get())
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=APPLICATION_PATH,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(configs, save_path=None):
+
+    commit = git_commit()
+    results = [benchmark(**config) for config in configs]
+    for config, result in zip(configs, results):
+        if not config.get("xla") or "error" in result:
+            continue
+        baseline = dict((key, value) for key, value in config.items() if key != "xla")
+        for other_config, other_result in zip(configs, results):
+            if dict((key, value) for key, value in other_config.items() if key != "xla" or value) == baseline \
+                    and "error" not in other_result:
+                result["xla_compile_ms"] = result["first_step_ms"] - other_result["first_step_ms"]
+                result["xla_speedup"] = result["steps_per_sec"] / other_result["steps_per_sec"]
+                break
+    report = {"commit": commit,
+              "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+              "host": platform.node(),
+              "cpu_count": os.cpu_count(),
+              "python": platform.python_version(),
+              "results": results}
+
+    if save_path is None:
+        save_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results",
+                                 "{}.json".format(commit if commit else time.strftime("%Y%m%d_%H%M%S")))
+    if not os.path.exists(os.path.dirname(save_path)):
+        os.makedirs(os.path.dirname(save_path))
+    with open(save_path, mode='w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+
+    for config, result in zip(configs, results):
+        # model() 에 그대로 넘긴 인자 -> 예) data_format=NCHW
+        options = " ".join("{}={}".format(key, value) for key, value in sorted(config.items())
+                           if key not in ("model", "image_size", "batch_size", "norm_selection", "steps"))
+        name = "{model} {image_size} batch {batch_size} {norm_selection}".format(**result)
+        if options:
+            name += " " + options
+        # NCHW 를 지원하지 않는 tensorflow 에서는 모델이 NHWC 로 바꿔서 학습한다.
+        if "data_format" in result and config.get("data_format", "NHWC") != result["data_format"]:
+            name += " (NCHW 미지원 -> {} 로 측정)".format(result["data_format"])
+        if "error" in result:
+            print("<<< {} : {error} >>>".format(name, **result))
+        else:
+            print("<<< {} : graph {graph_build_sec:.2f}s, first step {first_step_ms:.1f}ms, {steps_per_sec:.2f} steps/s, "
+                  "{images_per_sec:.2f} images/s, peak RSS {peak_rss_mb:.0f}MB >>>".format(name, **result))
+            if "xla_speedup" in result:
+                print("<<< {} : XLA compile {xla_compile_ms:.1f}ms, speedup x{xla_speedup:.2f} >>>".format(name, **result))
+    print("<<< {} saved >>>".format(save_path))
+    return report
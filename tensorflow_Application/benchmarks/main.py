@@ -0,0 +1,28 @@
+import benchmark
+
+'''
+CPU 만 사용해서 측정하려면 CUDA_VISIBLE_DEVICES="" python main.py
+model, image_size, batch_size, norm_selection, steps 외의 인자는 그대로 model() 에 넘어간다. 예) filter_size=64
+xla 가 있는 설정은 xla 만 뺀 설정이 같이 있어야 컴파일 시간과 speedup 이 계산된다.
+autotune.py 로 찾은 thread 설정이 있으면 그 설정으로 잰다. -> threads=False 를 주면 tensorflow 기본값으로 잰다.
+'''
+configs = [
+    dict(model="pix2pix", image_size=(256, 256), batch_size=1, norm_selection="IN", steps=20),
+    dict(model="pix2pix", image_size=(256, 256), batch_size=4, norm_selection="BN", steps=20),
+    dict(model="pix2pix", image_size=(256, 256), batch_size=4, norm_selection="BN", steps=20, fused_step=True),
+    dict(model="pix2pix", image_size=(256, 256), batch_size=4, norm_selection="BN", steps=20, recompute_segments=4),
+    dict(model="pix2pix", image_size=(256, 256), batch_size=4, norm_selection="BN", steps=20, fused_norm=True),
+    dict(model="pix2pix", image_size=(256, 256), batch_size=4, norm_selection="BN", steps=20, data_format="NCHW"),
+    dict(model="pix2pix", image_size=(256, 256), batch_size=4, norm_selection="BN", steps=20, xla="global"),
+    dict(model="pix2pix", image_size=(256, 256), batch_size=4, norm_selection="BN", steps=20, xla="scope"),
+    dict(model="CycleGAN", image_size=(256, 256), batch_size=1, norm_selection="IN", steps=20),
+    dict(model="CycleGAN", image_size=(256, 256), batch_size=1, norm_selection="IN", steps=20, fused_norm=True),
+    dict(model="CycleGAN", image_size=(256, 256), batch_size=1, norm_selection="IN", steps=20, data_format="NCHW"),
+    dict(model="CycleGAN", image_size=(256, 256), batch_size=1, norm_selection="IN", steps=20, xla="global"),
+    dict(model="CycleGAN", image_size=(256, 256), batch_size=1, norm_selection="IN", steps=20, xla="scope"),
+    dict(model="CycleGAN", image_size=(256, 256), batch_size=4, norm_selection="BN", steps=20),
+    dict(model="CycleGAN", image_size=(256, 256), batch_size=4, norm_selection="BN", steps=20, data_format="NCHW"),
+]
+
+if __name__ == "__main__":
+    benchmark.run(configs, save_path=None)  # save_path=None -> results/{git commit}.json
@@ -0,0 +1,105 @@
+import json
+import os
+import platform
+
+'''
+CPU 학습용 Session thread pool 설정
+
+1. benchmarks/autotune.py 가 찾은 host, 모델별 최적 설정을 ~/.tensorflow_thread_config/{host}.json 에 저장한다.
+   -> {"pix2pix": {"intra_op": 16, "inter_op": 2, "OMP_NUM_THREADS": 16, "KMP_BLOCKTIME": 1}, ...}
+2. 모든 model() 은 Session 을 만들기 전에 apply_thread_config 로 설정을 적용한다.
+   -> threads=None : 저장된 설정을 불러온다.(모델 설정이 없으면 host 기본 설정("default"), 그것도 없으면 tensorflow 기본값)
+      -> autotune 은 pix2pix, CycleGAN 만 재므로, 나머지 모델은 autotune(..., save_default=True) 가 저장한 host 기본 설정을 쓴다.
+   -> threads=False : tensorflow 기본값을 쓴다.
+   -> threads=dict : 주어진 설정을 쓴다.(autotune 이 후보 설정을 측정할 때 사용)
+   -> threads="slot 이름" : 저장된 설정 중 그 slot 의 설정을 불러온다.
+3. intra_op, inter_op -> ConfigProto 의 intra_op_parallelism_threads, inter_op_parallelism_threads
+   OMP_NUM_THREADS, KMP_BLOCKTIME, KMP_AFFINITY -> 환경 변수(MKL, oneDNN 빌드에서 사용, 이미 설정된 값은 바꾸지 않는다.)
+   -> OpenMP 는 처음 실행될 때 환경 변수를 읽으므로, 첫 Session 을 만들기 전에 적용되어야 한다.
+   cores -> process 의 모든 thread 를 해당 core 들에만 고정(pinning)한다.(리눅스)
+   -> core 고정은 slot 설정에만 들어간다. 같은 host 에서 같은 모델을 여러 개 동시에 학습할 때,
+      autotune(cores=range(0, 32), slot="0"), autotune(cores=range(32, 64), slot="1") 처럼 slot 마다 다른 core 로 찾아서
+      저장하고, 학습마다 threads="0", threads="1" 로 불러온다.
+      -> slot 없이 저장된 모델 설정은 core 를 고정하지 않으므로, 같이 돌리는 학습들이 같은 core 에 몰리지 않는다.
+'''
+
+THREAD_CONFIG_PATH = os.path.join(os.path.expanduser("~"), ".tensorflow_thread_config")
+ENVIRONMENT_KEYS = ("OMP_NUM_THREADS", "KMP_BLOCKTIME", "KMP_AFFINITY")
+# 모델 설정이 없을 때 쓰는 host 기본 설정의 이름
+DEFAULT_MODEL = "default"
+
+
+def thread_config_path(host=None):
+    return os.path.join(THREAD_CONFIG_PATH, "{}.json".format(host if host else platform.node()))
+
+
+def thread_config_key(model, slot=None):
+    return model if slot is None else "{}/{}".format(model, slot)
+
+
+def load_thread_config(model, host=None, slot=None):
+    path = thread_config_path(host)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f).get(thread_config_key(model, slot))
+
+
+def save_thread_config(model, setting, host=None, slot=None):
+    path = thread_config_path(host)
+    if not os.path.exists(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    settings = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            settings = json.load(f)
+    settings[thread_config_key(model, slot)] = setting
+    with open(path, mode='w') as f:
+        json.dump(settings, f, indent=2, sort_keys=True)
+    return path
+
+
+def apply_environment(threads, override=False):
+    # override=True -> 이미 설정된 값도 바꾸고, 설정에 없는 값은 지운다.(autotune 의 후보 설정을 잴 때)
+    for key in ENVIRONMENT_KEYS:
+        value = threads.get(key) if threads else None
+        if value is not None and (override or key not in os.environ):
+            os.environ[key] = str(value)
+        elif value is None and override:
+            os.environ.pop(key, None)
+
+
+def pin_cores(cores):
+    if not cores or not hasattr(os, "sched_setaffinity"):
+        return
+    # sched_setaffinity 는 부른 thread 에만 적용되므로, 이미 만들어진 thread 들도 모두 고정한다.
+    # -> 이후에 만들어지는 thread 는 만든 thread 의 설정을 물려받는다.
+    task_path = "/proc/self/task"
+    thread_ids = [int(thread_id) for thread_id in os.listdir(task_path)] if os.path.exists(task_path) else [0]
+    for thread_id in thread_ids:
+        try:
+            os.sched_setaffinity(thread_id, cores)
+        except OSError:
+            # 그 사이에 끝난 thread
+            pass
+
+
+def apply_thread_config(config, model, threads=None):
+    if threads is None:
+        threads = load_thread_config(model)
+        if threads is None:
+            threads = load_thread_config(DEFAULT_MODEL)
+    elif isinstance(threads, str):
+        slot = threads
+        threads = load_thread_config(model, slot=slot)
+        if threads is None:
+            print("<<< {} 의 slot {} 설정이 없어서 tensorflow 기본값을 사용합니다. >>>".format(model, slot))
+    if not threads:
+        return config
+
+    print("<<< {} thread config : {} >>>".format(model, threads))
+    apply_environment(threads)
+    pin_cores(threads.get("cores"))
+    config.intra_op_parallelism_threads = threads.get("intra_op", 0)
+    config.inter_op_parallelism_threads = threads.get("inter_op", 0)
+    return config
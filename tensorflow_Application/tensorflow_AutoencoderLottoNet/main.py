@@ -5,4 +5,7 @@ model(TEST=False, optimizer_selection="Adam", learning_rate=0.0009, training_epo
       display_step=10,
       # 전 회차 당첨번호 6자리 입력
       # 반드시 이차원 배열로 선언
-      previous_first_prize_number=[[2, 21, 28, 38, 42, 45]], number_of_prediction=5,  regularization = 'L2', scale=0.0001)
+      previous_first_prize_number=[[2, 21, 28, 38, 42, 45]], number_of_prediction=5,  regularization = 'L2', scale=0.0001,
+      profile_steps=None,  # 예) [10, 11] -> 10, 11 번째 step 의 Chrome trace 와 scope 별 top-N 연산을 profile/{model_name} 에 저장
+      xla=None,  # None, global -> 그래프 전체를 XLA 로 JIT 컴파일, scope -> inference 만 XLA 로 컴파일
+      threads=None)  # None -> benchmarks/autotune.py 가 저장한 이 host 의 설정(없으면 host 기본 설정), False -> tensorflow 기본값, dict -> 직접 지정
@@ -7,6 +7,10 @@ import pandas as pd
 import tensorflow as tf
 from tqdm import tqdm
 
+from Profiler import StepProfiler
+from ThreadConfig import apply_thread_config
+from XLA import jit_scope, xla_config
+
 
 def DataLoader(batch_size=None):
     # 1.데이터셋 읽기
@@ -29,7 +33,8 @@ def DataLoader(batch_size=None):
 
 def model(TEST=False, optimizer_selection="Adam", learning_rate=0.0009, training_epochs=10000, batch_size=50,
           display_step=1,
-          previous_first_prize_number=None, number_of_prediction=3, regularization='L2', scale=0.0001):
+          previous_first_prize_number=None, number_of_prediction=3, regularization='L2', scale=0.0001,
+          profile_steps=None, xla=None, threads=None):
     model_name = "LottoNet"
     model_name = model_name + "reg" + regularization
 
@@ -95,7 +100,7 @@ def model(TEST=False, optimizer_selection="Adam", learning_rate=0.0009, training
             x, y = next_batch
 
             with tf.variable_scope("shared_variables", reuse=tf.AUTO_REUSE) as scope:
-                with tf.name_scope("inference"):
+                with tf.name_scope("inference"), jit_scope(xla):
                     output = inference(x)
                 # or scope.reuse_variables()
 
@@ -121,7 +126,13 @@ def model(TEST=False, optimizer_selection="Adam", learning_rate=0.0009, training
             saver.export_meta_graph(os.path.join(model_name, "Lotto_Graph.meta"), collection_list=['x', 'output'])
 
         config = tf.ConfigProto(log_device_placement=False, allow_soft_placement=True)
+        config = xla_config(config, xla)
+        config = apply_thread_config(config, "LottoNet", threads)
         config.gpu_options.allow_growth = True
+        # profile_steps 에 있는 step 만 연산별 시간, 메모리를 기록한다.
+        profiler = StepProfiler(profile_steps=profile_steps, save_path=os.path.join("profile", model_name),
+                                scopes=["fully1", "fully2", "fully3", "fully4", "fully5", "fully6", "prediction",
+                                        "loss", "trainer"])
         with tf.Session(graph=JG, config=config) as sess:
             print("initializing!!!")
             sess.run(tf.global_variables_initializer())
@@ -132,11 +143,12 @@ def model(TEST=False, optimizer_selection="Adam", learning_rate=0.0009, training
                 saver.restore(sess, ckpt.model_checkpoint_path)
 
             summary_writer = tf.summary.FileWriter(os.path.join("tensorboard"), sess.graph)
-            for epoch in tqdm(range(training_epochs)):
+            for epoch in tqdm(range(1, training_epochs + 1)):
                 avg_cost = 0.
                 total_batch = int(data_length / batch_size)
                 for i in range(total_batch):
-                    _, minibatch_cost = sess.run([train_operation, cost])
+                    _, minibatch_cost = profiler.run(sess, [train_operation, cost],
+                                                     step=(epoch - 1) * total_batch + i + 1, name="train")
                     avg_cost += (minibatch_cost / total_batch)
 
                 print("L2 cost : {}".format(avg_cost))
@@ -219,6 +231,9 @@ if __name__ == "__main__":
           # 전 회차 당첨번호 6자리 입력
           # 반드시 이차원 배열로 선언
           previous_first_prize_number=[[2, 21, 28, 38, 42, 45]], number_of_prediction=5, regularization='L2',
-          scale=0.0001)
+          scale=0.0001,
+          profile_steps=None,  # 예) [10, 11] -> 10, 11 번째 step 의 Chrome trace 와 scope 별 top-N 연산을 profile/{model_name} 에 저장
+          xla=None,  # None, global -> 그래프 전체를 XLA 로 JIT 컴파일, scope -> inference 만 XLA 로 컴파일
+          threads=None)  # None -> benchmarks/autotune.py 가 저장한 이 host 의 설정(없으면 host 기본 설정), False -> tensorflow 기본값, dict -> 직접 지정
 else:
     print("model imported")
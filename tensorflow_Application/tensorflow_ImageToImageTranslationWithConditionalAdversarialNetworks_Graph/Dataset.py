@@ -1,8 +1,17 @@
+import collections
 import glob
+import hashlib
+import json
 import os
-import random
+import shutil
+import struct
 import tarfile
+import urllib.error
+import urllib.parse
 import urllib.request
+import zipfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 
 import cv2
 import numpy as np
@@ -53,9 +62,55 @@ https://people.eecs.berkeley.edu/~tinghuiz/projects/pix2pix/datasets/{}.tar.gz
 class Dataset(object):
 
     def __init__(self, DB_name="facades", AtoB=False, batch_size=1, use_TrainDataset=True, inference_size=(256, 256),
-                 TFRecord=True):
+                 TFRecord=True, num_shards=16, num_workers=None, TFRecord_encoding="png", jpeg_quality=95,
+                 num_parallel_calls=None, prefetch_size=None, cache=None, Memmap=False, Stream=False, mirror=None,
+                 sha256=None, batch_jitter=False, jitter_seed=None):
 
+        # Memmap=True 이면 TFRecord 대신 모든 이미지를 하나의 uint8 numpy memmap 파일로 저장해서 사용한다.(TFRecord 보다 우선)
+        self.Memmap = Memmap
+        '''
+        Stream=True 이면 압축을 풀지 않고 "{DB_name}.tar.gz" 의 이미지를 순서대로 읽어서 바로 학습한다.
+        num_shards 가 2 이상이면 처음 한번 "{DB_name}.tar.gz" 를 num_shards 개의 압축하지 않은 tar 파일(shard)로 나눠두고,
+        shard 들을 동시에 읽는다. -> 작은 파일을 하나씩 여는 대신 큰 파일을 순서대로 읽는다.
+        '''
+        self.Stream = Stream and not self.Memmap
+        if self.Memmap or self.Stream:
+            TFRecord = False
         self.TFRecord = TFRecord
+        '''
+        입력 파이프라인 설정
+        num_parallel_calls -> 전처리(map)를 동시에 몇개씩 할지, None 이면 자동(AUTOTUNE 을 지원하지 않는 버전에서는 cpu 개수)
+        prefetch_size -> 학습하는 동안 미리 준비해 둘 batch 의 개수, None 이면 자동
+        cache -> None : 사용 안함, "memory" : 복원(decode)된 이미지를 메모리에 저장, "경로" : 해당 경로의 파일에 저장
+        '''
+        AUTOTUNE = getattr(getattr(tf.data, "experimental", None), "AUTOTUNE", None)
+        self.num_parallel_calls = num_parallel_calls if num_parallel_calls else (AUTOTUNE or os.cpu_count())
+        self.prefetch_size = prefetch_size if prefetch_size else (AUTOTUNE or 2)
+        self.cache = cache
+        '''
+        batch_jitter=True 이면 random jitter 를 이미지 하나씩이 아니라 batch 로 묶은 뒤에 한번에 적용한다.(batch_size > 1 일 때 빠르다.)
+        jitter_seed -> random jitter 와 데이터를 섞는 연산(shuffle, tf.random_shuffle)의 seed
+        -> 같은 seed 를 주면 같은 순서로 같은 jitter 가 적용된다.
+        -> jitter 는 (jitter_seed, 몇 번째 이미지 / batch 인지) 로 만든 stateless 난수를 쓴다.
+           여러 스레드(num_parallel_calls)로 처리해도 어떤 이미지가 어떤 난수를 받을지는 순서에만 달려 있다.
+        -> 단, 학습 시에 shard 를 sloppy=True 로 읽는 TFRecord, Stream 방식은 먼저 읽힌 shard 의 레코드부터 가져오므로 순서가 달라질 수 있다.
+        '''
+        self.batch_jitter = batch_jitter
+        self.jitter_seed = jitter_seed
+        '''
+        TFRecord 에 이미지를 어떤 형태로 저장할지
+        "raw" -> uint8 그대로 저장(float32 보다 4배 작다)
+        "png" -> 무손실 압축
+        "jpeg" -> 손실 압축, jpeg_quality(0~100)로 품질을 정한다.
+        '''
+        if TFRecord_encoding not in ("raw", "png", "jpeg"):
+            print("TFRecord_encoding 은 \"raw\", \"png\", \"jpeg\" 중 하나여야 합니다.")
+            exit(0)
+        self.TFRecord_encoding = TFRecord_encoding
+        self.jpeg_quality = jpeg_quality
+        # TFRecord 를 몇개의 파일(shard)로 나눠서 쓸지, 몇개의 프로세스로 동시에 쓸지
+        self.num_shards = num_shards
+        self.num_workers = num_workers if num_workers else os.cpu_count()
         self.Dataset_Path = "Dataset"
         self.DB_name = DB_name
         self.AtoB = AtoB
@@ -84,13 +139,26 @@ class Dataset(object):
             print("The program is forcibly terminated.")
             exit(0)
 
-        self.url = "https://people.eecs.berkeley.edu/~tinghuiz/projects/pix2pix/datasets/{}.tar.gz".format(self.DB_name)
+        '''
+        mirror -> 원래 주소 대신 받을 곳, 예) "http://내부서버/pix2pix" 또는 "file:///mnt/datasets" -> "{mirror}/{DB_name}.tar.gz"
+        sha256 -> 압축 파일의 SHA-256, None 이면 mirror 의 "{DB_name}.tar.gz.sha256" 이나 처음 받았을 때 기록해둔 값으로 확인한다.
+        '''
+        self.sha256 = sha256
+        if mirror:
+            self.url = "{}/{}.tar.gz".format(mirror.rstrip("/"), self.DB_name)
+        else:
+            self.url = "https://people.eecs.berkeley.edu/~tinghuiz/projects/pix2pix/datasets/{}.tar.gz".format(self.DB_name)
         self.dataset_folder = os.path.join(self.Dataset_Path, self.DB_name)
         self.dataset_targz = self.dataset_folder + ".tar.gz"
+        self.Stream_path = os.path.join(self.Dataset_Path, "{}_Stream".format(self.DB_name))
 
         # 데이터셋 다운로드 한다.
         self.Preparing_Learning_Dataset()
 
+        if self.Stream:
+            # shard tar 파일로 나누기.(num_shards 가 1 이하이면 "{DB_name}.tar.gz" 를 그대로 읽는다.)
+            self.StreamWriter()
+
         if self.use_TrainDataset:
 
             self.batch_size = batch_size
@@ -104,14 +172,19 @@ class Dataset(object):
                     os.makedirs(self.TFRecord_train_path)
 
                 if self.AtoB:
-                    self.TFRecord_path = os.path.join(self.TFRecord_train_path,
-                                                      'AtoBtrain.tfrecords')
+                    self.TFRecord_path = self.TFRecord_shard_path(self.TFRecord_train_path,
+                                                                  'AtoBtrain{}'.format(self.TFRecord_encoding))
                 else:
-                    self.TFRecord_path = os.path.join(self.TFRecord_train_path,
-                                                      'BtoAtrain.tfrecords')
+                    self.TFRecord_path = self.TFRecord_shard_path(self.TFRecord_train_path,
+                                                                  'BtoAtrain{}'.format(self.TFRecord_encoding))
                 # TFRecord 파일로 쓰기.
                 self.TFRecordWriter()
 
+            if self.Memmap:
+                self.Memmap_path = os.path.join(self.dataset_folder, "Memmap", "train.npy")
+                # memmap 파일로 쓰기.
+                self.MemmapWriter()
+
         else:
             # Test Dataset은 무조건 하나씩 처리하자.
             self.batch_size = 1
@@ -124,23 +197,35 @@ class Dataset(object):
                     os.makedirs(self.TFRecord_val_path)
 
                 if self.AtoB:
-                    self.TFRecord_path = os.path.join(self.TFRecord_val_path,
-                                                      'AtoBval{}x{}.tfrecords'.format(self.height_size,
-                                                                                      self.width_size))
+                    self.TFRecord_path = self.TFRecord_shard_path(self.TFRecord_val_path,
+                                                                  'AtoBval{}x{}{}'.format(self.height_size,
+                                                                                          self.width_size,
+                                                                                          self.TFRecord_encoding))
                 else:
-                    self.TFRecord_path = os.path.join(self.TFRecord_val_path,
-                                                      'BtoAval{}x{}.tfrecords'.format(self.height_size,
-                                                                                      self.width_size))
+                    self.TFRecord_path = self.TFRecord_shard_path(self.TFRecord_val_path,
+                                                                  'BtoAval{}x{}{}'.format(self.height_size,
+                                                                                          self.width_size,
+                                                                                          self.TFRecord_encoding))
 
                 # TFRecord 파일로 쓰기.
                 self.TFRecordWriter()
 
+            if self.Memmap:
+                self.Memmap_path = os.path.join(self.dataset_folder, "Memmap",
+                                                "val{}x{}.npy".format(self.height_size, self.width_size))
+                # memmap 파일로 쓰기.
+                self.MemmapWriter()
+
     def __repr__(self):
         return "Dataset Loader"
 
     def iterator(self):
 
-        if self.TFRecord:
+        if self.Memmap:
+            iterator, next_batch, db_length = self.Using_MemmapDataset()
+        elif self.Stream:
+            iterator, next_batch, db_length = self.Using_StreamDataset()
+        elif self.TFRecord:
             iterator, next_batch, db_length = self.Using_TFRecordDataset()
         else:
             iterator, next_batch, db_length = self.Using_TFBasicDataset()
@@ -152,49 +237,146 @@ class Dataset(object):
         if not os.path.exists(self.Dataset_Path):
             os.makedirs(self.Dataset_Path)
 
-        # 1. 데이터셋 폴더가 존재하지 않으면 다운로드
-        if not os.path.exists(self.dataset_folder):
-            if not os.path.exists(self.dataset_targz):  # 데이터셋 압축 파일이 존재하지 않는 다면, 다운로드
-                print("<<< {} Dataset Download required >>>".format(self.DB_name))
-                urllib.request.urlretrieve(self.url, self.dataset_targz)
-                print("<<< {} Dataset Download Completed >>>".format(self.DB_name))
-
-            # "{self.DB_name}.tar.gz"의 파일의 크기는 미리 구해놓음. (미리 확인이 필요함.)
-            elif os.path.exists(self.dataset_targz) and os.path.getsize(
-                    self.dataset_targz) == self.file_size:  # 완전한 데이터셋 압축 파일이 존재한다면, 존재한다고 print를 띄워주자.
-                print("<<< ALL {} Dataset Exists >>>".format(self.DB_name))
+        # Stream=True 이고 shard 가 이미 만들어져 있다면, 압축 파일도 필요 없다.
+        if self.Stream and self.StreamIndex() is not None:
+            print("<<< {} Stream shards already exist >>>".format(self.DB_name))
+            return
 
-            else:  # 데이터셋 압축파일이 존재하긴 하는데, 제대로 다운로드 되지 않은 상태라면, 삭제하고 다시 다운로드
+        # 1. 데이터셋 폴더가 존재하지 않으면 다운로드(Stream=True 이면 압축 파일만 있으면 된다.)
+        if self.Stream or not os.path.exists(self.dataset_folder):
+            # "{self.DB_name}.tar.gz"의 파일의 크기는 미리 구해놓음. (미리 확인이 필요함.) - mirror 를 사용하는 경우에도 같은 파일이어야 한다.
+            if os.path.exists(self.dataset_targz) and os.path.getsize(self.dataset_targz) != self.file_size:
+                # 데이터셋 압축파일이 존재하긴 하는데, 제대로 다운로드 되지 않은 상태라면, 삭제하고 다시 다운로드
                 print(
                     "<<< {} Dataset size must be : {}, but now size is {} >>>".format(self.DB_name, self.file_size,
                                                                                       os.path.getsize(
                                                                                           self.dataset_targz)))
                 os.remove(self.dataset_targz)  # 완전하게 다운로드 되지 않은 기존의 데이터셋 압축 파일을 삭제
                 print("<<< Deleting incomplete {} Dataset Completed >>>".format(self.DB_name))
-                print("<<< we need to download {} Dataset again >>>".format(self.DB_name))
-                urllib.request.urlretrieve(self.url, self.dataset_targz)
+
+            if not os.path.exists(self.dataset_targz):  # 데이터셋 압축 파일이 존재하지 않는 다면, 다운로드(.part 파일이 있으면 이어받기)
+                print("<<< {} Dataset Download required : {} >>>".format(self.DB_name, self.url))
+                try:
+                    download(self.url, self.dataset_targz, file_size=self.file_size)
+                except IOError as e:
+                    print(e)
+                    exit(0)
                 print("<<< {} Dataset Download Completed >>>".format(self.DB_name))
+            else:  # 완전한 데이터셋 압축 파일이 존재한다면, 존재한다고 print를 띄워주자.
+                print("<<< ALL {} Dataset Exists >>>".format(self.DB_name))
 
-            # 2. 완전한 압축파일이 다운로드 된 상태이므로 압축을 푼다
-            with tarfile.open(self.dataset_targz) as tar:
-                tar.extractall(path=self.Dataset_Path)
+            '''
+            2. SHA-256 확인
+            기대값 우선순위 -> sha256 인자 > 로컬의 "{파일}.sha256" > 서버(mirror)의 "{파일}.sha256"
+            -> 서버에서 받은 값도 로컬의 "{파일}.sha256" 에 기록해두므로, 데이터셋을 준비할 때마다 서버에 묻지 않는다.
+            셋다 없으면 처음 받은 파일의 SHA-256 을 로컬의 "{파일}.sha256" 에 기록해두고 다음부터 비교한다.
+            '''
+            sha256_path = self.dataset_targz + ".sha256"
+            expected = self.sha256
+            if not expected and os.path.exists(sha256_path):
+                with open(sha256_path, 'r') as f:
+                    expected = f.read().split()[0].lower()
+            if not expected:
+                expected = fetch_sha256(self.url)
+            if expected:
+                with open(sha256_path, 'w') as f:
+                    f.write("{}  {}\n".format(expected.lower(), os.path.basename(self.dataset_targz)))
+            actual = sha256sum(self.dataset_targz)
+            if expected and expected.lower() != actual:
+                print("<<< {} SHA-256 must be : {}, but now is {} >>>".format(self.DB_name, expected, actual))
+                os.remove(self.dataset_targz)  # 손상된 압축 파일을 삭제 -> 다시 실행하면 새로 받는다.
+                print("<<< Deleting corrupted {} Dataset Completed >>>".format(self.DB_name))
+                exit(0)
+            if not expected:
+                with open(sha256_path, 'w') as f:
+                    f.write("{}  {}\n".format(actual, os.path.basename(self.dataset_targz)))
+            print("<<< {} SHA-256 Verified >>>".format(os.path.basename(self.dataset_targz)))
+            if self.Stream:
+                print("<<< {} will be streamed without extracting >>>".format(os.path.basename(self.dataset_targz)))
+                return
+
+            # 3. 완전한 압축파일이 다운로드 된 상태이므로 압축을 푼다
+            # 임시 폴더에 다 푼 다음 옮긴다. -> 중간에 멈춰도 반쯤 풀린 폴더를 완전한 데이터셋으로 착각하지 않는다.
+            extract_path = os.path.join(self.Dataset_Path, ".{}.extract".format(self.DB_name))
+            if os.path.exists(extract_path):
+                shutil.rmtree(extract_path)
+            extract_tar(self.dataset_targz, extract_path)
+            os.replace(os.path.join(extract_path, self.DB_name), self.dataset_folder)
+            shutil.rmtree(extract_path)
             print("<<< {} Unzip Completed >>>".format(os.path.basename(self.dataset_targz)))
             print("<<< {} Dataset now exists >>>".format(self.DB_name))
         else:
             print("<<< {} Dataset is already Exists >>>".format(self.DB_name))
 
-    def _image_preprocessingOfBasic(self, image):
+    # 파일을 읽어서 uint8 이미지 2개(왼쪽, 오른쪽)로 복원한다.
+    def _image_decodingOfBasic(self, image):
 
         # 이미지를 읽는다.
         tensor_name = tf.read_file(image)
-        tensor_image = tf.image.decode_image(tensor_name, channels=3)
+        return self._image_decodingOfStream(tensor_name)
+
+    # tar 파일에서 읽은 jpg 바이트를 uint8 이미지 2개(왼쪽, 오른쪽)로 복원한다.
+    def _image_decodingOfStream(self, image):
+
+        tensor_image = tf.image.decode_image(image, channels=3)
         # tf.image.decode_image는 shape 정보를 반환하지 못하므로, 아래의 코드를 꼭 작성해야한다.
         tensor_image.set_shape([None, None, 3])
-        iL, iR = tf.split(tf.cast(tensor_image, tf.float32), 2, axis=1)
+        iL, iR = tf.split(tensor_image, 2, axis=1)
+        return iL, iR
+
+    # TFRecord 레코드를 읽어서 uint8 이미지 2개(왼쪽, 오른쪽)로 복원한다.
+    def _image_decodingOfTFRecord(self, image):
+
+        # 이미지를 읽는다.
+        feature = {'image_left': tf.FixedLenFeature([], tf.string),
+                   'image_right': tf.FixedLenFeature([], tf.string),
+                   'height': tf.FixedLenFeature([], tf.int64),
+                   'width': tf.FixedLenFeature([], tf.int64),
+                   'depth': tf.FixedLenFeature([], tf.int64),
+                   'encoding': tf.FixedLenFeature([], tf.string)}
+
+        parser = tf.parse_single_example(image, features=feature)
+
+        # 저장된 형식에 맞게 uint8 이미지로 복원한다.
+        if self.TFRecord_encoding == "raw":
+            height = tf.cast(parser['height'], tf.int32)
+            width = tf.cast(parser['width'], tf.int32)
+            depth = tf.cast(parser['depth'], tf.int32)
+            # 아래와 같이 shape을 지정해주는 코드작성이 필요하다.
+            iL = tf.reshape(tf.decode_raw(parser['image_left'], tf.uint8), (height, width, depth))
+            iR = tf.reshape(tf.decode_raw(parser['image_right'], tf.uint8), (height, width, depth))
+        elif self.TFRecord_encoding == "png":
+            iL = tf.image.decode_png(parser['image_left'], channels=3)
+            iR = tf.image.decode_png(parser['image_right'], channels=3)
+        else:  # self.TFRecord_encoding == "jpeg"
+            iL = tf.image.decode_jpeg(parser['image_left'], channels=3)
+            iR = tf.image.decode_jpeg(parser['image_right'], channels=3)
+        return iL, iR
+
+    # 같은 seed 를 쓰는 연산들은 같은 난수를 만들므로 연산마다 jitter_seed 에 다른 값을 더해서 준다.
+    def _seed(self, index):
+        return None if self.jitter_seed is None else self.jitter_seed + index
+
+    '''
+    0 ~ 1 사이의 float32 난수
+    jitter_seed 가 없으면 tf.random_uniform, 있으면 (jitter_seed + offset, index) 를 seed 로 쓰는 stateless 난수
+    -> tf.random_uniform 은 연산 하나가 난수열 하나를 가지고 있어서, 병렬로 처리하면 어떤 이미지가 몇 번째 난수를 받을지 매번 다르다.
+    -> stateless 난수는 seed 가 같으면 항상 같은 값이므로, index(몇 번째 이미지 / batch 인지)만 같으면 같은 jitter 가 적용된다.
+    '''
+    def _random_uniform(self, shape, offset, index):
+        if self.jitter_seed is None:
+            return tf.random_uniform(shape, 0, 1, dtype=tf.float32)
+        seed = tf.stack([tf.constant(self.jitter_seed + offset, dtype=tf.int64), tf.cast(index, tf.int64)])
+        return tf.contrib.stateless.stateless_random_uniform(shape, seed=seed, dtype=tf.float32)
+
+    # 복원된 uint8 이미지를 float 으로 바꾸고, 논문의 random jitter 를 적용한다.
+    # TFRecord 의 Test 이미지는 저장할 때 이미 크기를 바꿨으므로 resize=False 로 부른다.
+    # index -> 몇 번째 이미지인지(jitter_seed 가 있을 때 난수의 seed 로 쓴다.)
+    def _image_augmentation(self, iL, iR, resize=True, index=None):
 
         # gerator의 활성화 함수가 tanh이므로, 스케일을 맞춰준다.
-        iL_scaled = tf.subtract(tf.divide(iL, 127.5), 1.0)  # gerator의 활성화 함수가 tanh이므로, 스케일을 맞춰준다.
-        iR_scaled = tf.subtract(tf.divide(iR, 127.5), 1.0)  # gerator의 활성화 함수가 tanh이므로, 스케일을 맞춰준다.
+        iL_scaled = tf.subtract(tf.divide(tf.cast(iL, tf.float32), 127.5), 1.0)  # gerator의 활성화 함수가 tanh이므로, 스케일을 맞춰준다.
+        iR_scaled = tf.subtract(tf.divide(tf.cast(iR, tf.float32), 127.5), 1.0)  # gerator의 활성화 함수가 tanh이므로, 스케일을 맞춰준다.
 
         input = iL_scaled
         label = iR_scaled
@@ -204,12 +386,13 @@ class Dataset(object):
         Random jitter was applied by resizing the 256 x 256 input images to 286 x 286
         and then randomly cropping back to size 256 x 256
         '''
-        # Train Dataset 에서만 동작하게 하기 위함
-        if self.use_TrainDataset:
+        # Train Dataset 에서만 동작하게 하기 위함 - batch_jitter=True 이면 batch 로 묶은 뒤에 _batch_augmentation 에서 한다.
+        if self.use_TrainDataset and not self.batch_jitter:
             # 이미지를 키운다
-            expanded_area = tf.random_uniform((1,), 0, 31, dtype=tf.int32)[0]  # 0 ~ 30 의 값으로 키워서 자른다.(랜덤)
-            left = tf.random_uniform((1,), 0, 1, dtype=tf.float32)[0]
-            right = tf.random_uniform((1,), 0, 1, dtype=tf.float32)[0]
+            # 0 ~ 30 의 값으로 키워서 자른다.(랜덤)
+            expanded_area = tf.cast(tf.floor(self._random_uniform((1,), 0, index) * 31), tf.int32)[0]
+            left = self._random_uniform((1,), 1, index)[0]
+            right = self._random_uniform((1,), 2, index)[0]
             '''
             주의 
               BILINEAR = 0 -> 가장 가까운 화소값을 사용
@@ -232,15 +415,18 @@ class Dataset(object):
                                                                              method=1)), \
                                              lambda: (input, label))
 
-            # 이미지를 원본 크기로 자른다.
+            # 이미지를 원본 크기로 자른다. - 자를 위치도 같은 방법으로 뽑는다.(tf.random_crop 은 stateful 이다.)
             concat_resized = tf.concat(values=[iL_resized, iR_resized], axis=-1)
-            concat_cropped = tf.random_crop(concat_resized, size=(
-                tf.shape(iL_scaled)[0], tf.shape(iL_scaled)[1], tf.shape(concat_resized)[-1]))
+            crop_size = tf.shape(iL_scaled)[:2]
+            crop_range = tf.cast(tf.shape(concat_resized)[:2] - crop_size + 1, tf.float32)
+            crop_offset = tf.cast(tf.floor(self._random_uniform((2,), 3, index) * crop_range), tf.int32)
+            concat_cropped = tf.slice(concat_resized, tf.concat([crop_offset, [0]], axis=0),
+                                      tf.concat([crop_size, [-1]], axis=0))
             iL_random_crop, iR_random_crop = tf.split(concat_cropped, 2, axis=-1)
             input = iL_random_crop
             label = iR_random_crop
 
-        else:
+        elif resize and not self.use_TrainDataset:
             '''
             주의 
               BILINEAR = 0 -> 가장 가까운 화소값을 사용
@@ -258,145 +444,441 @@ class Dataset(object):
         else:
             return label, input
 
-    def _image_preprocessingOfTFRecord(self, image):
-
-        # 이미지를 읽는다.
-        feature = {'image_left': tf.FixedLenFeature([], tf.string),
-                   'image_right': tf.FixedLenFeature([], tf.string),
-                   'height': tf.FixedLenFeature([], tf.int64),
-                   'width': tf.FixedLenFeature([], tf.int64),
-                   'depth': tf.FixedLenFeature([], tf.int64)}
+    '''
+    batch 단위 random jitter - _image_augmentation 의 jitter 와 같은 일을 batch 전체에 대해 한번에 한다.
+    "286 x 286 으로 키운 뒤 256 x 256 으로 자르기" 는 원본 이미지에서 (256 / 286) 크기의 영역을 잘라서 256 x 256 으로 키우는 것과 같다.
+    -> 이미지마다 자를 영역(box)만 다르게 해서 tf.image.crop_and_resize 한번으로 batch 전체를 처리한다.
+    '''
+    # index -> 몇 번째 batch 인지(jitter_seed 가 있을 때 난수의 seed 로 쓴다.)
+    def _batch_augmentation(self, input, label, index=None):
+
+        # input 과 label 은 같은 위치를 잘라야 하므로 채널 방향으로 붙인다.
+        concat = tf.concat(values=[input, label], axis=-1)
+        shape = tf.shape(concat)
+        batch_size, height, width = shape[0], shape[1], shape[2]
+
+        # 이미지마다 0 ~ 30 의 값으로 키우고(절반의 확률로 키우지 않는다.), 키운 이미지 안에서 자를 위치를 정한다.
+        expanded_area = tf.cast(tf.floor(self._random_uniform((batch_size,), 0, index) * 31), tf.int32)
+        expand = tf.less(self._random_uniform((batch_size,), 1, index), 0.5)
+        expanded_area = tf.where(expand, expanded_area, tf.zeros_like(expanded_area))
+        offset = self._random_uniform(tf.stack([batch_size, 2]), 2, index)
+        offset = tf.floor(offset * tf.cast(tf.expand_dims(expanded_area, axis=1) + 1, tf.float32))
+
+        # 키운 이미지의 (offset, offset + 원본 크기) 영역 -> 원본 이미지 기준의 좌표(0 ~ 1)로 바꾼다.
+        expanded_height = tf.cast(height + expanded_area - 1, tf.float32)
+        expanded_width = tf.cast(width + expanded_area - 1, tf.float32)
+        y1 = offset[:, 0] / expanded_height
+        x1 = offset[:, 1] / expanded_width
+        y2 = (offset[:, 0] + tf.cast(height - 1, tf.float32)) / expanded_height
+        x2 = (offset[:, 1] + tf.cast(width - 1, tf.float32)) / expanded_width
+        boxes = tf.stack([y1, x1, y2, x2], axis=1)
+
+        # BILINEAR 로 키운다.(이미지 하나씩 할 때는 NEAREST_NEIGHBOR)
+        concat_cropped = tf.image.crop_and_resize(concat, boxes, box_ind=tf.range(batch_size),
+                                                  crop_size=tf.stack([height, width]))
+        concat_cropped.set_shape(concat.get_shape())
+        input, label = tf.split(concat_cropped, 2, axis=-1)
+        return input, label
 
-        parser = tf.parse_single_example(image, features=feature)
-        img_decoded_raw_left = tf.decode_raw(parser['image_left'], tf.float32)
-        img_decoded_raw_right = tf.decode_raw(parser['image_right'], tf.float32)
-        height = tf.cast(parser['height'], tf.int32)
-        width = tf.cast(parser['width'], tf.int32)
-        depth = tf.cast(parser['depth'], tf.int32)
+    def _image_preprocessingOfBasic(self, image):
+        iL, iR = self._image_decodingOfBasic(image)
+        return self._image_augmentation(iL, iR, resize=True)
 
-        # 아래와 같이 shape을 지정해주는 코드작성이 필요하다.
-        iL = tf.reshape(img_decoded_raw_left, (height, width, depth))
-        iR = tf.reshape(img_decoded_raw_right, (height, width, depth))
+    def _image_preprocessingOfTFRecord(self, image):
+        iL, iR = self._image_decodingOfTFRecord(image)
+        return self._image_augmentation(iL, iR, resize=False)
 
-        # gerator의 활성화 함수가 tanh이므로, 스케일을 맞춰준다.
-        iL_scaled = tf.subtract(tf.divide(iL, 127.5), 1.0)  # gerator의 활성화 함수가 tanh이므로, 스케일을 맞춰준다.
-        iR_scaled = tf.subtract(tf.divide(iR, 127.5), 1.0)  # gerator의 활성화 함수가 tanh이므로, 스케일을 맞춰준다.
+    '''
+    shuffle, repeat 이후의 공통 파이프라인
+    1. cache 를 사용하면 복원(decode)까지만 한 uint8 이미지를 저장해두고, 두번째 epoch 부터는 저장된 것을 사용한다.
+       -> random jitter 는 cache 이후에 적용해야 매 epoch 마다 다른 jitter 가 적용된다.
+    2. map_and_batch -> map 과 batch 를 하나의 연산으로 합쳐서(fusion) 여러 스레드로 처리한다.
+       batch_jitter=True 이면 batch 로 묶은 뒤에 _batch_augmentation 으로 random jitter 를 한번에 적용한다.
+       -> 이미지와 batch 에 번호(index)를 붙여서(enumerate) jitter 의 seed 로 쓴다.
+    3. prefetch -> 학습(generator, discriminator 업데이트)하는 동안 다음 batch 들을 미리 만들어 둔다.
+    '''
+    def _input_pipeline(self, dataset, decoding, resize):
 
-        input = iL_scaled
-        label = iR_scaled
+        if self.cache:
+            dataset = dataset.map(decoding, num_parallel_calls=self.num_parallel_calls)
+            dataset = dataset.cache() if self.cache == "memory" else dataset.cache(self.cache)
+            # 복원된 (iL, iR) 이 그대로 들어온다.
+            decoding = lambda image: image
+        map_func = lambda index, image: self._image_augmentation(*decoding(image), resize=resize, index=index)
 
-        '''
-        논문에서...
-        Random jitter was applied by resizing the 256 x 256 input images to 286 x 286
-        and then randomly cropping back to size 256 x 256
-        '''
-        # Train Dataset 에서만 동작하게 하기 위함
         if self.use_TrainDataset:
-            # 이미지를 키운다
-            expanded_area = tf.random_uniform((1,), 0, 31, dtype=tf.int32)[0]  # 0 ~ 30 의 값으로 키워서 자른다.(랜덤)
-            left = tf.random_uniform((1,), 0, 1, dtype=tf.float32)[0]
-            right = tf.random_uniform((1,), 0, 1, dtype=tf.float32)[0]
-            '''
-            주의 
-              BILINEAR = 0 -> 가장 가까운 화소값을 사용
-              NEAREST_NEIGHBOR = 1 -> 인접한 4개 화소의 화소값과 거리비를 사용하여 결정
-              BICUBIC = 2 -> 인접한 16개 화소의 화소밗과 거리에 따른 가중치의 곱을 사용
-              AREA = 3 -> 사이즈 줄일때 사용
-            '''
-            iL_resized, iR_resized = tf.cond(tf.less(left, right), \
-                                             lambda: (tf.image.resize_images(images=input,
-                                                                             size=(tf.shape(input)[
-                                                                                       0] + expanded_area,
-                                                                                   tf.shape(input)[
-                                                                                       1] + expanded_area),
-                                                                             method=1),
-                                                      tf.image.resize_images(images=label,
-                                                                             size=(tf.shape(label)[
-                                                                                       0] + expanded_area,
-                                                                                   tf.shape(label)[
-                                                                                       1] + expanded_area),
-                                                                             method=1)), \
-                                             lambda: (input, label))
-
-            # 이미지를 원본 크기로 자른다.
-            concat_resized = tf.concat(values=[iL_resized, iR_resized], axis=-1)
-            concat_cropped = tf.random_crop(concat_resized, size=(
-                tf.shape(iL_scaled)[0], tf.shape(iL_scaled)[1], tf.shape(concat_resized)[-1]))
-            iL_random_crop, iR_random_crop = tf.split(concat_cropped, 2, axis=-1)
-            input = iL_random_crop
-            label = iR_random_crop
-
-        if self.AtoB:
-            return input, label
+            dataset = dataset.shuffle(buffer_size=1000, seed=self._seed(4)).repeat()
         else:
-            return label, input
+            dataset = dataset.repeat()
+
+        dataset = dataset.apply(tf.contrib.data.enumerate_dataset())
+        dataset = dataset.apply(tf.contrib.data.map_and_batch(map_func, self.batch_size,
+                                                              num_parallel_calls=self.num_parallel_calls))
+        if self.use_TrainDataset and self.batch_jitter:
+            dataset = dataset.apply(tf.contrib.data.enumerate_dataset())
+            dataset = dataset.map(lambda index, batch: self._batch_augmentation(*batch, index=index),
+                                  num_parallel_calls=self.num_parallel_calls)
+        return dataset.prefetch(self.prefetch_size)
 
     # TFRecord를 만들기위해 이미지를 불러올때 쓴다.
     def load_image(self, address):
 
-        img = cv2.imread(address)
-
         # TEST = True 일 때
         if not self.use_TrainDataset:
-            img = cv2.resize(img, (self.width_size * 2, self.height_size), interpolation=cv2.INTER_CUBIC)
+            return load_image(address, resize=(self.height_size, self.width_size))
+        else:
+            return load_image(address)
 
-        # RGB로 바꾸기
-        img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        img = img.astype(np.float32)
-        middle_point = int(img.shape[1] / 2)
-        img_left = img[:, :middle_point, :]
-        img_right = img[:, middle_point:, :]
-        return img_left, img_right
+    # ex) AtoBtrain-00000-of-00016.tfrecords, AtoBtrain-00001-of-00016.tfrecords ...
+    def TFRecord_shard_path(self, folder, name):
+        # shard 들의 정보를 담은 manifest 파일 ex) AtoBtrain.manifest.json
+        self.TFRecord_manifest_path = os.path.join(folder, '{}.manifest.json'.format(name))
+        return [os.path.join(folder, '{}-{:05d}-of-{:05d}.tfrecords'.format(name, index, self.num_shards))
+                for index in range(self.num_shards)]
+
+    '''
+    manifest 의 구성
+    {
+        "length" : 전체 레코드 개수,
+        "encoding", "AtoB", "inference_size" : TFRecord 를 만들 때 사용한 설정,
+        "shards" : [{"path" : shard 파일 이름, "length" : 레코드 개수,
+                     "records" : [{"offset" : shard 파일 안에서의 바이트 위치, "shape" : [height, width, depth],
+                                  "source" : 원본 이미지 경로, "sha1" : 원본 이미지의 해시}, ...]}, ...]
+    }
+    -> 학습 / 테스트 시작 시 레코드를 전부 읽어서 개수를 세지 않아도 되고, offset 으로 원하는 레코드를 바로 읽을 수 있다.
+    '''
+    def TFRecordManifest(self):
+        if not hasattr(self, "manifest"):
+            with open(self.TFRecord_manifest_path, mode='r') as f:
+                self.manifest = json.load(f)
+        return self.manifest
+
+    # index 번째 레코드(직렬화된 tf.train.Example)를 manifest 의 offset 을 사용해서 바로 읽어온다.
+    def read_record(self, index):
+
+        for shard in self.TFRecordManifest()["shards"]:
+            if index < shard["length"]:
+                with open(os.path.join(os.path.dirname(self.TFRecord_manifest_path), shard["path"]), 'rb') as f:
+                    f.seek(shard["records"][index]["offset"])
+                    # TFRecord 레코드 형식 : uint64 length, uint32 masked_crc32_of_length, byte data[length], uint32 masked_crc32_of_data
+                    length = struct.unpack('<Q', f.read(8))[0]
+                    f.read(4)
+                    return f.read(length)
+            index -= shard["length"]
+        raise IndexError("record index out of range")
 
     def TFRecordWriter(self):
 
         # http: // machinelearninguru.com / deep_learning / data_preparation / tfrecord / tfrecord.html 참고했다.
         # TFRecord로 바꾸기
         print("<<< Using TFRecord format >>>")
-        if not os.path.isfile(self.TFRecord_path):  # TFRecord 파일이 존재하지 않은 경우
-            print("<<< Making {} >>>".format(os.path.basename(self.TFRecord_path)))
-            with tf.python_io.TFRecordWriter(self.TFRecord_path) as writer:  # TFRecord로 쓰자
-                if self.use_TrainDataset:
-                    random.shuffle(self.file_path_list)
-                for image_address in tqdm(self.file_path_list):
-                    img_left, img_right = self.load_image(image_address)
-                    '''넘파이 배열의 값을 바이트 스트링으로 변환한다.
-                    tf.train.BytesList, tf.train.Int64List, tf.train.FloatList 을 지원한다.
-                    '''
-                    feature = \
-                        {
-                            'image_left': tf.train.Feature(
-                                bytes_list=tf.train.BytesList(value=[tf.compat.as_bytes(img_left.tostring())])),
-                            'image_right': tf.train.Feature(
-                                bytes_list=tf.train.BytesList(value=[tf.compat.as_bytes(img_right.tostring())])),
-                            'height': tf.train.Feature(
-                                int64_list=tf.train.Int64List(value=[img_left.shape[0]])),
-                            'width': tf.train.Feature(
-                                int64_list=tf.train.Int64List(value=[img_left.shape[1]])),
-                            'depth': tf.train.Feature(
-                                int64_list=tf.train.Int64List(value=[img_left.shape[-1]])),
-                        }
-                    example = tf.train.Example(features=tf.train.Features(feature=feature))
-                    # 파일로 쓰자.
-                    writer.write(example.SerializeToString())
-            print("<<< Making {} is Completed >>>".format(os.path.basename(self.TFRecord_path)))
+        name = os.path.basename(self.TFRecord_path[0]).split("-")[0]
+        if self.use_TrainDataset:
+            resize = None
+        else:
+            resize = (self.height_size, self.width_size)
+
+        '''
+        파일을 이름의 해시값으로 shard 에 나눈다. -> 파일이 추가 / 삭제 되어도 다른 shard 의 구성은 바뀌지 않는다.
+        학습 시에는 Using_TFRecordDataset 에서 shard 와 레코드를 섞어서 읽으므로 여기서 섞을 필요가 없다.
+        '''
+        shard_file_lists = [[] for _ in range(self.num_shards)]
+        for image_address in sorted(self.file_path_list):
+            shard_file_lists[zlib.crc32(tf.compat.as_bytes(os.path.basename(image_address))) % self.num_shards].append(
+                image_address)
+
+        '''
+        cache key - shard 에 들어가는 파일들의 (경로, 크기, 수정 시간) 과 전처리 설정으로 만든다.
+        manifest 에 저장된 key 와 같고 shard 파일이 존재하면 그 shard 는 다시 만들지 않는다.
+        -> 원본 폴더가 바뀌었거나, 쓰다가 중단된 shard 만 다시 만든다.
+        '''
+        params = {"encoding": self.TFRecord_encoding, "jpeg_quality": self.jpeg_quality, "resize": resize,
+                  "AtoB": self.AtoB}
+        keys = [TFRecordCacheKey(file_path_list, params) for file_path_list in shard_file_lists]
+
+        old_shards = {}
+        if os.path.isfile(self.TFRecord_manifest_path):
+            try:
+                old_shards = {shard["path"]: shard for shard in self.TFRecordManifest()["shards"]}
+            except (ValueError, KeyError):  # manifest 가 깨진 경우 -> 전부 다시 만든다.
+                old_shards = {}
+
+        shards = {}
+        jobs = []
+        for shard_path, file_path_list, key in zip(self.TFRecord_path, shard_file_lists, keys):
+            old_shard = old_shards.get(os.path.basename(shard_path))
+            if old_shard is not None and old_shard.get("key") == key and os.path.isfile(shard_path):
+                shards[shard_path] = old_shard["records"]
+            else:
+                jobs.append((shard_path, file_path_list, resize, self.TFRecord_encoding, self.jpeg_quality))
+
+        if jobs:
+            print("<<< Making {} of {} shards of {} >>>".format(len(jobs), self.num_shards, name))
+            # 주의 : 윈도우에서 여러 프로세스를 쓰려면 실행 파일(main.py)의 코드가 if __name__ == "__main__": 안에 있어야 한다.
+            if self.num_workers <= 1 or len(jobs) == 1:
+                for job in tqdm(jobs):
+                    shard_path, records = TFRecordShardWriter(job)
+                    shards[shard_path] = records
+            else:
+                with ProcessPoolExecutor(max_workers=min(self.num_workers, len(jobs))) as executor:
+                    futures = [executor.submit(TFRecordShardWriter, job) for job in jobs]
+                    for future in tqdm(as_completed(futures), total=len(futures)):
+                        # 자식 프로세스에서 발생한 예외를 여기서 다시 발생시킨다.
+                        shard_path, records = future.result()
+                        shards[shard_path] = records
+
+            self.manifest = {"length": sum(len(records) for records in shards.values()),
+                             "encoding": self.TFRecord_encoding,
+                             "AtoB": self.AtoB,
+                             "inference_size": None if self.use_TrainDataset else [self.height_size, self.width_size],
+                             "shards": [{"path": os.path.basename(shard_path),
+                                         "key": key,
+                                         "length": len(shards[shard_path]),
+                                         "records": shards[shard_path]}
+                                        for shard_path, key in zip(self.TFRecord_path, keys)]}
+            # 임시 파일에 쓴 다음 이름을 바꾼다. -> 쓰다가 중단되어도 반쯤 쓰여진 manifest 가 남지 않는다.
+            with open(self.TFRecord_manifest_path + ".tmp", mode='w') as f:
+                json.dump(self.manifest, f)
+            os.replace(self.TFRecord_manifest_path + ".tmp", self.TFRecord_manifest_path)
+            print("<<< Making {} of {} shards of {} is Completed >>>".format(len(jobs), self.num_shards, name))
         else:  # TFRecord가 존재할 경우
-            print("<<< {} already exists >>>".format(os.path.basename(self.TFRecord_path)))
+            print("<<< {} shards of {} already exist >>>".format(self.num_shards, name))
+
+    '''
+    Stream 형식
+    {Stream_path}/index.json -> {"key" : 압축 파일의 cache key, "num_shards" : shard 개수,
+                                 "length" : {"train" : 개수, "val" : 개수, ...},
+                                 "shards" : {"train" : [shard 파일 이름, ...], "val" : [...], ...}}
+    shard 안의 이미지는 압축 파일 안에서의 경로(ex) facades/train/1.jpg)를 그대로 사용한다.
+    '''
+    def StreamIndex(self):
+
+        index_path = os.path.join(self.Stream_path, "index.json")
+        if not os.path.isfile(index_path):
+            return None
+        try:
+            with open(index_path, mode='r') as f:
+                index = json.load(f)
+        except ValueError:  # index 가 깨진 경우 -> 다시 만든다.
+            return None
+
+        if index.get("num_shards") != self.num_shards:
+            return None
+        if os.path.isfile(self.dataset_targz):
+            # 압축 파일이 바뀌었다면 다시 만든다.
+            if index.get("key") != TFRecordCacheKey([self.dataset_targz], {"num_shards": self.num_shards}):
+                return None
+        elif self.num_shards <= 1:  # 압축 파일을 그대로 읽어야 하는데 없는 경우
+            return None
+        for shard_names in index["shards"].values():
+            if not all(os.path.isfile(os.path.join(self.Stream_path, name)) for name in shard_names):
+                return None
+        return index
+
+    def StreamWriter(self):
+
+        print("<<< Using Stream format >>>")
+        self.stream_index = self.StreamIndex()
+        if self.stream_index is not None:
+            return
+
+        if not os.path.exists(self.Stream_path):
+            os.makedirs(self.Stream_path)
+
+        print("<<< Making {} Stream shards >>>".format(self.DB_name))
+        length = {}
+        shards = {}
+        writers = {}
+        # 압축 파일을 처음부터 끝까지 한번만 읽으면서, 이미지를 파일 이름의 해시값으로 shard 에 나눈다.
+        with tarfile.open(self.dataset_targz, 'r|*') as tar:
+            for member in tqdm(tar):
+                split = tar_member_split(member)
+                if split is None:
+                    continue
+                length[split] = length.get(split, 0) + 1
+                if self.num_shards <= 1:  # 개수만 센다.
+                    continue
+                name = '{}-{:05d}-of-{:05d}.tar'.format(
+                    split, zlib.crc32(tf.compat.as_bytes(os.path.basename(member.name))) % self.num_shards,
+                    self.num_shards)
+                if name not in writers:
+                    # 임시 파일에 다 쓴 다음 이름을 바꾼다.
+                    writers[name] = tarfile.open(os.path.join(self.Stream_path, name + ".tmp"), 'w')
+                    shards.setdefault(split, []).append(name)
+                writers[name].addfile(member, tar.extractfile(member))
+
+        for name, writer in writers.items():
+            writer.close()
+            os.replace(os.path.join(self.Stream_path, name + ".tmp"), os.path.join(self.Stream_path, name))
+
+        self.stream_index = {"key": TFRecordCacheKey([self.dataset_targz], {"num_shards": self.num_shards}),
+                             "num_shards": self.num_shards,
+                             "length": length,
+                             "shards": {split: sorted(names) for split, names in shards.items()}}
+        index_path = os.path.join(self.Stream_path, "index.json")
+        with open(index_path + ".tmp", mode='w') as f:
+            json.dump(self.stream_index, f)
+        os.replace(index_path + ".tmp", index_path)
+        print("<<< Making {} Stream shards is Completed >>>".format(self.DB_name))
+
+    '''
+    memmap 형식 - 모든 이미지 쌍을 (개수, 2(왼쪽, 오른쪽), height, width, depth) 크기의 uint8 배열 하나로 .npy 파일에 저장한다.
+    .npy 파일의 header 에 shape 정보가 들어있으므로 np.load(mmap_mode='r') 로 바로 열 수 있다.
+    -> 파일을 메모리에 올리지 않고 필요한 부분만 운영체제가 읽어온다.(page cache) 
+    -> shuffle buffer 가 필요 없으므로 매 epoch 마다 전체 데이터를 완벽하게 섞을 수 있다.
+    '''
+    def MemmapWriter(self):
+
+        print("<<< Using Memmap format >>>")
+        if not os.path.exists(os.path.dirname(self.Memmap_path)):
+            os.makedirs(os.path.dirname(self.Memmap_path))
+
+        if self.use_TrainDataset:
+            resize = None
+        else:
+            resize = (self.height_size, self.width_size)
+
+        file_path_list = sorted(self.file_path_list)
+        # TFRecord 와 같은 방식으로 cache key 를 만들어서 원본 폴더가 바뀌었을 때만 다시 만든다.
+        key = TFRecordCacheKey(file_path_list, {"resize": resize})
+        key_path = os.path.splitext(self.Memmap_path)[0] + ".key"
+        if os.path.isfile(self.Memmap_path) and os.path.isfile(key_path):
+            with open(key_path, mode='r') as f:
+                if f.read() == key:
+                    print("<<< {} already exists >>>".format(os.path.basename(self.Memmap_path)))
+                    return
+
+        print("<<< Making {} >>>".format(os.path.basename(self.Memmap_path)))
+        # 첫번째 이미지로 크기를 정한다. - 모든 이미지의 크기가 같아야 한다.
+        img_left, _ = load_image(file_path_list[0], resize=resize)
+        shape = (len(file_path_list), 2) + img_left.shape
+
+        # 임시 파일에 다 쓴 다음 이름을 바꾼다.
+        temp_path = self.Memmap_path + ".tmp"
+        np.lib.format.open_memmap(temp_path, mode='w+', dtype=np.uint8, shape=shape).flush()
+
+        # 각 프로세스가 memmap 의 서로 다른 부분에 쓴다.
+        jobs = [(temp_path, list(range(index, len(file_path_list), self.num_workers)),
+                 file_path_list[index::self.num_workers], resize) for index in range(self.num_workers)]
+        if self.num_workers <= 1:
+            for job in tqdm(jobs):
+                MemmapChunkWriter(job)
+        else:
+            with ProcessPoolExecutor(max_workers=self.num_workers) as executor:
+                futures = [executor.submit(MemmapChunkWriter, job) for job in jobs]
+                for future in tqdm(as_completed(futures), total=len(futures)):
+                    future.result()  # 자식 프로세스에서 발생한 예외를 여기서 다시 발생시킨다.
+
+        os.replace(temp_path, self.Memmap_path)
+        with open(key_path, mode='w') as f:
+            f.write(key)
+        print("<<< Making {} is Completed >>>".format(os.path.basename(self.Memmap_path)))
+
+    # np.memmap 을 사용하는 방법 - 매 epoch 마다 index 를 섞어서 전체 데이터를 완벽하게 섞는다.
+    def Using_MemmapDataset(self):
+
+        images = np.load(self.Memmap_path, mmap_mode='r')
+        length = images.shape[0]
+
+        # batch 의 index 들로 memmap 에서 batch 전체를 한번에 읽는다. -> batch 마다 py_func 한번, 복사 한번
+        def gather(batch_indices):
+            # 학습 시에는 정렬해서 파일을 앞에서부터 읽는다.(batch 안의 순서는 학습에 영향이 없다.)
+            if self.use_TrainDataset:
+                batch_indices = np.sort(batch_indices)
+            return images[batch_indices, 0], images[batch_indices, 1]
+
+        def read_batch(batch_indices):
+            iL, iR = tf.py_func(gather, [batch_indices], [tf.uint8, tf.uint8], stateful=False)
+            iL.set_shape((None,) + images.shape[2:])
+            iR.set_shape((None,) + images.shape[2:])
+            return iL, iR
+
+        # index 만 섞으므로 전체 길이를 buffer 로 써도 메모리를 거의 쓰지 않는다.
+        dataset = tf.data.Dataset.range(length)
+        if self.use_TrainDataset:
+            dataset = dataset.shuffle(buffer_size=length, seed=self._seed(4))
+        dataset = dataset.repeat().batch(self.batch_size)
+        dataset = dataset.map(read_batch, num_parallel_calls=self.num_parallel_calls)
+        # batch 에 번호를 붙여서 jitter 의 seed 로 쓴다. -> (index, (iL, iR))
+        dataset = dataset.apply(tf.contrib.data.enumerate_dataset())
+
+        # Test 이미지는 저장할 때 이미 크기를 바꿨다.
+        if self.use_TrainDataset and not self.batch_jitter:
+            # 이미지마다 다른 random jitter - 이미지의 번호는 batch 번호 x batch_size + batch 안의 위치
+            def augmentation(index, batch):
+                indices = index * self.batch_size + tf.range(tf.shape(batch[0], out_type=tf.int64)[0])
+                return tf.map_fn(lambda item: self._image_augmentation(item[1], item[2], resize=False, index=item[0]),
+                                 (indices,) + tuple(batch), dtype=(tf.float32, tf.float32))
+        elif self.use_TrainDataset:
+            # scale 과 AtoB 순서를 바꾼 뒤 batch 단위 random jitter
+            augmentation = lambda index, batch: self._batch_augmentation(
+                *self._image_augmentation(*batch, resize=False), index=index)
+        else:
+            # scale 과 AtoB 순서만 바꾸므로 batch 에 그대로 적용된다.
+            augmentation = lambda index, batch: self._image_augmentation(*batch, resize=False)
+        dataset = dataset.map(augmentation, num_parallel_calls=self.num_parallel_calls)
+        dataset = dataset.prefetch(self.prefetch_size)
+        iterator = dataset.make_initializable_iterator()
+        return iterator, iterator.get_next(), length
+
+    # 압축 파일(혹은 shard tar 파일)을 순서대로 읽는 방법 - 압축을 풀지 않고 tar 안의 이미지를 바로 처리하기
+    def Using_StreamDataset(self):
+
+        split = "train" if self.use_TrainDataset else "val"
+        length = self.stream_index["length"].get(split, 0)
+        if self.num_shards > 1:
+            paths = [os.path.join(self.Stream_path, name) for name in self.stream_index["shards"].get(split, [])]
+        else:
+            paths = [self.dataset_targz]
+        # shard 가 하나도 없으면 parallel_interleave 의 cycle_length 가 0 이 되어 오류가 난다.
+        if not paths:
+            print("<<< {} 의 {} shard 가 없습니다. stream index 를 확인하세요. >>>".format(self.DB_name, split))
+            print("The program is forcibly terminated.")
+            exit(0)
+
+        # tar 파일 하나를 처음부터 끝까지 읽는 Dataset
+        def tar_dataset(path):
+            return tf.data.Dataset.from_generator(TarMemberReader, output_types=tf.string,
+                                                  output_shapes=tf.TensorShape([]), args=(path, split))
+
+        dataset = tf.data.Dataset.from_tensor_slices(tf.constant(paths))
+        if self.use_TrainDataset:
+            # 학습 시에는 shard 의 순서도 섞고, 먼저 읽힌 shard 의 이미지부터 가져온다.(sloppy=True)
+            dataset = dataset.shuffle(buffer_size=len(paths), seed=self._seed(5))
+            dataset = dataset.apply(tf.contrib.data.parallel_interleave(tar_dataset, cycle_length=len(paths),
+                                                                        sloppy=True))
+        else:
+            # 테스트 시에는 항상 같은 순서로 읽는다.
+            dataset = dataset.apply(tf.contrib.data.parallel_interleave(tar_dataset, cycle_length=len(paths),
+                                                                        block_length=1, sloppy=False))
+        # 복원(decode) 하기 전에 섞는다. -> shuffle buffer 에는 jpg 바이트가 들어간다.
+        dataset = self._input_pipeline(dataset, self._image_decodingOfStream, resize=True)
+        iterator = dataset.make_initializable_iterator()
+        return iterator, iterator.get_next(), length
 
     # tf.data.TFRecordDataset를 사용하는 방법 - TRRecord(이진 파일, 직렬화된 입력 데이터)라는 텐서플로우 표준 파일형식으로 저장된 파일을 불러와서 처리하기
     def Using_TFRecordDataset(self):
 
-        # TFRecordDataset()사용해서 읽어오기
-        dataset = tf.data.TFRecordDataset(self.TFRecord_path)
-        dataset = dataset.map(self._image_preprocessingOfTFRecord)
+        # TFRecordDataset()사용해서 읽어오기 - 여러개의 shard 를 동시에 읽는다.(parallel_interleave)
+        dataset = tf.data.Dataset.from_tensor_slices(tf.constant(self.TFRecord_path))
         if self.use_TrainDataset:
-            dataset = dataset.shuffle(buffer_size=1000).repeat().batch(self.batch_size)
+            # 학습 시에는 shard 의 순서도 섞고, 먼저 읽힌 shard 의 레코드부터 가져온다.(sloppy=True)
+            dataset = dataset.shuffle(buffer_size=self.num_shards, seed=self._seed(5))
+            dataset = dataset.apply(tf.contrib.data.parallel_interleave(tf.data.TFRecordDataset,
+                                                                        cycle_length=self.num_shards, sloppy=True))
         else:
-            dataset = dataset.repeat().batch(self.batch_size)
+            # 테스트 시에는 shard 를 하나씩 번갈아 읽어서 매번 같은 순서로 읽는다.(sloppy=False)
+            # -> 파일은 이름의 해시값으로 shard 에 나뉘므로, 원래 파일 순서와는 다르다.
+            dataset = dataset.apply(tf.contrib.data.parallel_interleave(tf.data.TFRecordDataset,
+                                                                        cycle_length=self.num_shards,
+                                                                        block_length=1, sloppy=False))
+        # 복원(decode) 하기 전에 섞는다. -> shuffle buffer 에는 float32 이미지가 아닌 uint8 / 압축된 바이트가 들어간다.
+        dataset = self._input_pipeline(dataset, self._image_decodingOfTFRecord, resize=False)
         # 사실 여기서 dataset.make_one_shot_iterator()을 사용해도 된다.
         iterator = dataset.make_initializable_iterator()
         # tf.python_io.tf_record_iterator는 무엇인가 ? TFRecord 파일에서 레코드를 읽을 수 있는 iterator이다.
-        return iterator, iterator.get_next(), sum(1 for _ in tf.python_io.tf_record_iterator(self.TFRecord_path))
+        # 레코드 개수는 manifest 에서 바로 읽는다. - TFRecord 를 처음부터 끝까지 읽어서 셀 필요가 없다.
+        return iterator, iterator.get_next(), self.TFRecordManifest()["length"]
 
     # tf.data.Dataset.from_tensor_slices 을 사용하는 방법 - 파일명 리스트에서 이미지를 불러와서 처리하기
     def Using_TFBasicDataset(self):
@@ -404,12 +886,12 @@ class Dataset(object):
         length = len(self.file_path_list)
 
         if self.use_TrainDataset:
-            random_file_path_list_Tensor = tf.random_shuffle(tf.constant(self.file_path_list))  # tensor에 데이터셋 리스트를 담기
+            # tensor에 데이터셋 리스트를 담기
+            random_file_path_list_Tensor = tf.random_shuffle(tf.constant(self.file_path_list), seed=self._seed(5))
             dataset = tf.data.Dataset.from_tensor_slices(random_file_path_list_Tensor)
         else:
             dataset = tf.data.Dataset.from_tensor_slices(tf.constant(self.file_path_list))
 
-        dataset = dataset.map(self._image_preprocessingOfBasic)
         '''
         buffer_size: A `tf.int64` scalar `tf.Tensor`, representing the
         number of elements from this dataset from which the new
@@ -426,10 +908,8 @@ class Dataset(object):
         문제점2 -> 한번 섞고 말아버린다. -> buffer_size를 자기 컴퓨터의 메모리에 맞게 최대한으로 써보자.
         '''
         # dataset = dataset.shuffle(buffer_size=1).repeat().batch(self.batch_size)
-        if self.use_TrainDataset:
-            dataset = dataset.shuffle(buffer_size=1000).repeat().batch(self.batch_size)
-        else:
-            dataset = dataset.repeat().batch(self.batch_size)
+        # 파일명을 섞은 뒤 병렬로 읽고 전처리한다. - self._input_pipeline 참고
+        dataset = self._input_pipeline(dataset, self._image_decodingOfBasic, resize=True)
         '''
         위에서 tf.random_shuffle을 쓰고 아래의 make_one_shot_iterator()을 쓰면 오류가 발생한다. - stateful 관련 오류가 뜨는데, 추 후 해결 되겠지...
         이유가 궁금하다면 아래의 웹사이트를 참고하자.
@@ -441,7 +921,256 @@ class Dataset(object):
         return iterator, iterator.get_next(), length
 
 
-''' 
+'''
+데이터셋 압축 파일 받기 / 확인 / 풀기
+1. download -> 1MB 씩 나눠서 받는다. 중간에 끊기면 HTTP Range 를 사용해서 받은 곳부터 이어 받는다.(.part 파일)
+   mirror 로 file:// 경로나 내부 HTTP 서버를 지정할 수 있다.
+2. sha256sum -> 받은 파일의 SHA-256 을 구해서 손상 여부를 확인한다.
+3. extract_tar, extract_zip -> 여러 스레드를 사용해서 압축을 푼다.
+'''
+
+
+def sha256sum(path, chunk_size=1 << 20):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+# 서버(mirror)에 "{파일}.sha256" 이 있으면 읽어온다. 없으면 None
+def fetch_sha256(url):
+    try:
+        with urllib.request.urlopen(url + ".sha256", timeout=30) as response:
+            return response.read().decode().split()[0].lower()
+    except (urllib.error.URLError, OSError, ValueError, IndexError):
+        return None
+
+
+def download(url, path, file_size=None, chunk_size=1 << 20, retries=5):
+    part_path = path + ".part"
+    for retry in range(retries):
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        if file_size and offset > file_size:  # 잘못 받은 파일
+            os.remove(part_path)
+            offset = 0
+        # 다 받은 뒤 이름을 바꾸기 전에 멈춘 경우 -> 더 받을 것이 없으므로(서버는 416 을 돌려준다.) 이름만 바꾼다.
+        # -> 받은 파일은 download 를 부른 쪽에서 SHA-256 으로 확인한다.
+        if file_size and offset == file_size:
+            os.replace(part_path, path)
+            return path
+        try:
+            if url.startswith("file://"):
+                # 로컬 mirror - 파일을 열어서 받은 곳부터 복사한다.
+                response = open(urllib.request.url2pathname(urllib.parse.urlparse(url).path), 'rb')
+                response.seek(offset)
+                total = os.fstat(response.fileno()).st_size
+            else:
+                request = urllib.request.Request(url)
+                if offset > 0:
+                    request.add_header("Range", "bytes={}-".format(offset))
+                response = urllib.request.urlopen(request, timeout=60)
+                # 206 -> 이어받기, 200 -> 서버가 Range 를 지원하지 않으므로 처음부터 다시 받는다.
+                if offset > 0 and response.getcode() != 206:
+                    offset = 0
+                content_length = response.headers.get("Content-Length")
+                total = offset + int(content_length) if content_length else file_size
+
+            with response, open(part_path, 'ab' if offset > 0 else 'wb') as f, \
+                    tqdm(total=total, initial=offset, unit='B', unit_scale=True) as progress:
+                for chunk in iter(lambda: response.read(chunk_size), b''):
+                    f.write(chunk)
+                    progress.update(len(chunk))
+            os.replace(part_path, path)
+            return path
+        except urllib.error.HTTPError as e:
+            # 416 -> 요청한 위치(offset)가 파일의 끝이거나 그 뒤이다.(file_size 를 모르는 경우)
+            # Content-Range 의 "bytes */{전체 크기}" 와 받은 크기가 같으면 다 받은 것이고, 아니면 처음부터 다시 받는다.
+            if e.code == 416 and offset > 0:
+                content_range = e.headers.get("Content-Range", "") if e.headers else ""
+                if content_range.startswith("bytes */") and content_range[len("bytes */"):].strip() == str(offset):
+                    os.replace(part_path, path)
+                    return path
+                os.remove(part_path)
+            print("<<< Download interrupted({}), resume {}/{} >>>".format(e, retry + 1, retries))
+        except (urllib.error.URLError, ConnectionError, OSError) as e:
+            print("<<< Download interrupted({}), resume {}/{} >>>".format(e, retry + 1, retries))
+    raise IOError("<<< {} Download failed >>>".format(url))
+
+
+def _write_file(path, data):
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+# tar.gz 는 압축 해제 자체는 순서대로만 가능하므로, 압축 해제는 하나의 스레드에서 하고 파일 쓰기를 여러 스레드로 나눈다.
+# 아직 쓰지 않은 파일은 worker 개수의 4배까지만 메모리에 들고 있는다. -> 그 이상이면 가장 먼저 넘긴 파일이 다 쓰일 때까지 기다린다.
+def extract_tar(path, target, num_workers=None):
+    num_workers = num_workers if num_workers else os.cpu_count()
+    target = os.path.realpath(target)
+    with tarfile.open(path, 'r:*') as tar, ThreadPoolExecutor(max_workers=num_workers) as executor:
+        futures = collections.deque()
+        for member in tar:
+            destination = os.path.realpath(os.path.join(target, member.name))
+            if not destination.startswith(target + os.sep):  # 압축 파일 밖의 경로에 쓰는 것을 막는다.
+                continue
+            if member.isdir():
+                os.makedirs(destination, exist_ok=True)
+            elif member.isfile():
+                os.makedirs(os.path.dirname(destination), exist_ok=True)
+                if len(futures) >= 4 * num_workers:
+                    futures.popleft().result()
+                futures.append(executor.submit(_write_file, destination, tar.extractfile(member).read()))
+        for future in futures:
+            future.result()
+
+
+# zip 은 파일마다 따로 압축되어 있으므로, 스레드마다 ZipFile 을 따로 열어서 동시에 푼다.
+def extract_zip(path, target, num_workers=None):
+    num_workers = num_workers if num_workers else os.cpu_count()
+    with zipfile.ZipFile(path, 'r') as zf:
+        names = zf.namelist()
+    # 여러 스레드가 같은 폴더를 동시에 만들지 않도록 폴더를 먼저 만든다.
+    for name in names:
+        os.makedirs(os.path.dirname(os.path.join(target, name)), exist_ok=True)
+
+    def extract(chunk):
+        with zipfile.ZipFile(path, 'r') as zf:
+            for name in chunk:
+                zf.extract(name, path=target)
+
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        for future in [executor.submit(extract, names[index::num_workers]) for index in range(num_workers)]:
+            future.result()
+
+
+# tar 파일 안의 경로(ex) facades/train/1.jpg)에서 train / val / test 를 찾는다. 이미지가 아니면 None
+def tar_member_split(member):
+    parts = [part for part in member.name.split('/') if part not in ('', '.')]
+    if not member.isfile() or len(parts) < 2:
+        return None
+    return parts[-2]
+
+
+# tar 파일(.tar.gz 혹은 shard .tar)을 처음부터 끝까지 순서대로 읽으면서 split 에 해당하는 이미지의 바이트를 내보낸다.
+def TarMemberReader(path, split):
+    split = tf.compat.as_str(split)
+    # 'r|*' -> 앞뒤로 이동하지 않고 순서대로만 읽는다.(stream mode)
+    with tarfile.open(tf.compat.as_str(path), 'r|*') as tar:
+        for member in tar:
+            if tar_member_split(member) == split:
+                yield tar.extractfile(member).read()
+
+
+# TFRecord를 만들기위해 이미지를 불러올때 쓴다. - 여러 프로세스에서 호출해야 하므로 class 밖에 둔다.
+def load_image(address, resize=None):
+
+    img = cv2.imread(address)
+
+    # TEST = True 일 때 - resize = (height, width)
+    if resize is not None:
+        img = cv2.resize(img, (resize[1] * 2, resize[0]), interpolation=cv2.INTER_CUBIC)
+
+    # RGB로 바꾸기 - float32 로 바꾸지 않고 uint8 그대로 둔다.(float 변환은 _image_preprocessingOfTFRecord 에서)
+    img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    middle_point = int(img.shape[1] / 2)
+    img_left = img[:, :middle_point, :]
+    img_right = img[:, middle_point:, :]
+    return img_left, img_right
+
+
+# RGB uint8 이미지를 encoding("raw", "png", "jpeg") 형식의 바이트 스트링으로 바꾼다.
+def encode_image(img, encoding="png", jpeg_quality=95):
+
+    if encoding == "raw":
+        return tf.compat.as_bytes(img.tostring())
+
+    # cv2.imencode 는 BGR 순서를 기대하므로 다시 바꿔준다.
+    img = cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
+    if encoding == "png":
+        _, encoded = cv2.imencode(".png", img)
+    else:  # encoding == "jpeg"
+        _, encoded = cv2.imencode(".jpg", img, [int(cv2.IMWRITE_JPEG_QUALITY), jpeg_quality])
+    return encoded.tostring()
+
+
+# shard 에 들어가는 파일들의 (경로, 크기, 수정 시간) 과 전처리 설정으로 cache key 를 만든다.
+def TFRecordCacheKey(file_path_list, params):
+
+    sources = []
+    for image_address in file_path_list:
+        stat = os.stat(image_address)
+        sources.append([image_address, stat.st_size, stat.st_mtime_ns])
+    return hashlib.sha1(json.dumps([sources, params], sort_keys=True).encode()).hexdigest()
+
+
+# memmap 파일의 indices 위치에 이미지들을 쓴다. - ProcessPoolExecutor 의 각 프로세스에서 실행된다.
+def MemmapChunkWriter(job):
+
+    memmap_path, indices, file_path_list, resize = job
+    images = np.load(memmap_path, mmap_mode='r+')
+    for index, image_address in zip(indices, file_path_list):
+        img_left, img_right = load_image(image_address, resize=resize)
+        if img_left.shape != images.shape[2:]:
+            raise ValueError("Memmap 을 사용하려면 모든 이미지의 크기가 같아야 합니다. ({} : {})".format(image_address,
+                                                                                       img_left.shape))
+        images[index, 0] = img_left
+        images[index, 1] = img_right
+    images.flush()
+    return len(indices)
+
+
+# shard 파일 하나를 쓴다. - ProcessPoolExecutor 의 각 프로세스에서 실행된다.
+def TFRecordShardWriter(job):
+
+    shard_path, file_path_list, resize, encoding, jpeg_quality = job
+    records = []
+    offset = 0
+    # 임시 파일에 다 쓴 다음 이름을 바꾼다. -> 쓰다가 중단되어도 반쯤 쓰여진 shard 가 남지 않는다.
+    with tf.python_io.TFRecordWriter(shard_path + ".tmp") as writer:  # TFRecord로 쓰자
+        for image_address in file_path_list:
+            img_left, img_right = load_image(image_address, resize=resize)
+            '''넘파이 배열의 값을 바이트 스트링으로 변환한다.
+            tf.train.BytesList, tf.train.Int64List, tf.train.FloatList 을 지원한다.
+            '''
+            feature = \
+                {
+                    'image_left': tf.train.Feature(
+                        bytes_list=tf.train.BytesList(value=[encode_image(img_left, encoding, jpeg_quality)])),
+                    'image_right': tf.train.Feature(
+                        bytes_list=tf.train.BytesList(value=[encode_image(img_right, encoding, jpeg_quality)])),
+                    'height': tf.train.Feature(
+                        int64_list=tf.train.Int64List(value=[img_left.shape[0]])),
+                    'width': tf.train.Feature(
+                        int64_list=tf.train.Int64List(value=[img_left.shape[1]])),
+                    'depth': tf.train.Feature(
+                        int64_list=tf.train.Int64List(value=[img_left.shape[-1]])),
+                    'encoding': tf.train.Feature(
+                        bytes_list=tf.train.BytesList(value=[tf.compat.as_bytes(encoding)])),
+                }
+            example = tf.train.Example(features=tf.train.Features(feature=feature))
+            serialized = example.SerializeToString()
+            # 파일로 쓰자.
+            writer.write(serialized)
+
+            with open(image_address, 'rb') as f:
+                sha1 = hashlib.sha1(f.read()).hexdigest()
+            records.append({"offset": offset, "shape": list(img_left.shape), "source": image_address, "sha1": sha1})
+            # 레코드 하나의 크기 = 8(length) + 4(length crc) + 데이터 + 4(data crc)
+            offset += 16 + len(serialized)
+    os.replace(shard_path + ".tmp", shard_path)
+    return shard_path, records
+
+
+# benchmark 용 - 데이터셋을 받지 않고, 메모리 안의 랜덤 이미지(-1 ~ 1) 한 쌍(입력, 타깃)을 계속 반복해서 내보낸다.
+def synthetic_iterator(batch_size=1, image_size=(256, 256), data_length=100, seed=0):
+    images = np.random.RandomState(seed).uniform(-1, 1, size=(2, batch_size) + tuple(image_size) + (3,))
+    dataset = tf.data.Dataset.from_tensors((images[0].astype(np.float32), images[1].astype(np.float32))).repeat()
+    iterator = dataset.make_initializable_iterator()
+    return iterator, iterator.get_next(), data_length
+
+
+'''
 to reduce model oscillation [14], we follow
 Shrivastava et al’s strategy [45] and update the discriminators
 using a history of generated images rather than the ones
@@ -455,11 +1184,17 @@ imagePool 클래스
 
 class ImagePool(object):
 
-    def __init__(self, image_pool_size=50):
+    def __init__(self, image_pool_size=50, seed=None):
 
         self.image_pool_size = image_pool_size
         self.image_count = 0
-        self.image_appender = []
+        '''
+        이미지를 list 에 하나씩 추가하는 대신, 처음 호출될 때 (image_pool_size, height, width, depth) 크기의 float32 배열을 만들어 두고
+        batch 안의 이미지 하나하나를 이 배열에 넣고 뺀다. -> batch_size 가 1보다 커도 사용할 수 있다.
+        '''
+        self.image_pool = None
+        self.output = None
+        self.random = np.random.RandomState(seed)
 
     def __repr__(self):
         return "Image Pool class"
@@ -470,21 +1205,28 @@ class ImagePool(object):
         if self.image_pool_size <= 0:
             return image
 
-        '''2. self.num_img 이 self.image_pool_size 보다 작으면, self.image_count을 하나씩 늘려주면서
-        self.images_appender에 images를 추가해준다.
-        self.image_pool_size 개 self.images_appender에 이전 images를 저장한다.'''
-        if self.image_count < self.image_pool_size:
-            self.image_appender.append(image)
-            self.image_count += 1
-            return image
+        batch_size = image.shape[0]
+        if self.image_pool is None:
+            self.image_pool = np.zeros((self.image_pool_size,) + image.shape[1:], dtype=np.float32)
+        # 반환할 batch 를 담을 배열 - batch 크기가 바뀔 때만 다시 만든다.(반환된 배열은 다음 호출 때 덮어 쓰인다.)
+        if self.output is None or self.output.shape != image.shape:
+            self.output = np.zeros(image.shape, dtype=np.float32)
+        np.copyto(self.output, image)
 
-        if np.random.rand() > 0.5:
-            index = np.random.randint(low=0, high=self.image_pool_size, size=None)
-            past_image = self.image_appender[index]
-            self.image_appender[index] = image
-            return past_image
-        else:
-            return image
+        '''2. self.image_count 이 self.image_pool_size 보다 작으면, self.image_pool 의 빈 자리에 이미지를 채워 넣는다.
+        pool 이 다 찰때까지는 입력된 이미지를 그대로 반환한다.'''
+        if self.image_count < self.image_pool_size:
+            count = min(self.image_pool_size - self.image_count, batch_size)
+            self.image_pool[self.image_count:self.image_count + count] = image[:count]
+            self.image_count += count
+            return self.output
+
+        # 3. 이미지마다 50% 의 확률로 pool 의 이미지(과거에 생성된 이미지)와 바꾼다. - batch 당 한번만 난수를 뽑는다.
+        selected = np.flatnonzero(self.random.rand(batch_size) > 0.5)
+        index = self.random.randint(low=0, high=self.image_pool_size, size=selected.shape[0])
+        self.output[selected] = self.image_pool[index]
+        self.image_pool[index] = image[selected]
+        return self.output
 
 
 if __name__ == "__main__":
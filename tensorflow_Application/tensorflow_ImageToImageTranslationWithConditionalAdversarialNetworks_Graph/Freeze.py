@@ -0,0 +1,136 @@
+import time
+
+import numpy as np
+import tensorflow as tf
+
+'''
+학습된 generator 를 inference 전용의 하나의 그래프 파일(.pb)로 만든다.
+
+1. convert_variables_to_constants -> 변수를 상수로 바꾸고, 출력에 필요 없는 노드(optimizer, discriminator 등)를 버린다.
+2. fold_batch_norms -> conv(또는 conv_transpose) -> bias_add -> batch_norm(moving average 사용) 을
+   w' = w * gamma / sqrt(var + eps), b' = (b - mean) * gamma / sqrt(var + eps) + beta 로 계산해서 conv -> bias_add 로 합친다.
+   -> fused_norm=True 로 학습해서 bias 가 없는 conv -> batch_norm 은 b = 0 으로 보고, batch_norm 노드를 bias_add 로 바꾼다.
+3. remove_training_nodes -> Identity 노드를 지운다.(keep_prob=1 인 dropout 은 그래프를 만들 때 이미 지워진다.)
+4. load_frozen_graph -> meta graph 를 읽고 checkpoint 를 복원하는 과정 없이 .pb 파일 하나만 읽어서 바로 사용한다.
+'''
+
+FUSED_BATCH_NORM = ("FusedBatchNorm", "FusedBatchNormV2", "FusedBatchNormV3")
+
+
+def _node_name(input_name):
+    return input_name.lstrip("^").split(":")[0]
+
+
+def fold_batch_norms(graph_def):
+
+    nodes = {node.name: node for node in graph_def.node}
+
+    # Identity 를 따라가서 실제로 값을 만드는 노드를 찾는다.
+    def source(input_name):
+        node = nodes[_node_name(input_name)]
+        while node.op == "Identity":
+            node = nodes[_node_name(node.input[0])]
+        return node
+
+    folded = 0
+    # 새로 만드는 bias 상수 노드는 검사할 필요가 없으므로 원래 노드들만 본다.
+    for node in list(graph_def.node):
+        # training=True 인 batch_norm 은 batch 의 평균, 분산을 사용하므로 합칠 수 없다.
+        if node.op not in FUSED_BATCH_NORM or node.attr["is_training"].b:
+            continue
+        bias_add = source(node.input[0])
+        if bias_add.op == "BiasAdd":
+            conv = source(bias_add.input[0])
+            bias_names = [bias_add.input[1]]
+        else:
+            conv, bias_add = bias_add, None
+            bias_names = []
+        if conv.op not in ("Conv2D", "Conv2DBackpropInput"):
+            continue
+        # Conv2D(input, filter), Conv2DBackpropInput(input_sizes, filter, out_backprop) -> filter 는 모두 1번
+        constants = [source(name) for name in [conv.input[1]] + bias_names + list(node.input[1:5])]
+        if any(constant.op != "Const" for constant in constants):
+            continue
+
+        values = [tf.make_ndarray(constant.attr["value"].tensor) for constant in constants]
+        w, (gamma, beta, mean, variance) = values[0], values[-4:]
+        b = values[1] if bias_add else 0
+        multiplier = gamma / np.sqrt(variance + node.attr["epsilon"].f)
+        # conv2d 의 filter 는 (h, w, in, out), conv2d_transpose 의 filter 는 (h, w, out, in)
+        if conv.op == "Conv2D":
+            w = w * multiplier
+        else:
+            w = w * multiplier[:, np.newaxis]
+        b = (b - mean) * multiplier + beta
+        constants[0].attr["value"].CopyFrom(tf.AttrValue(tensor=tf.make_tensor_proto(w.astype(np.float32))))
+
+        dtype = node.attr["T"].type
+        data_format = node.attr["data_format"].s
+        conv_output = node.input[0]
+        node.attr.clear()
+        del node.input[:]
+        if bias_add:
+            constants[1].attr["value"].CopyFrom(tf.AttrValue(tensor=tf.make_tensor_proto(b.astype(np.float32))))
+            # batch_norm 노드는 bias_add 를 그대로 넘겨주는 Identity 로 바꾼다. -> remove_training_nodes 에서 지워진다.
+            node.op = "Identity"
+            node.input.append(bias_add.name)
+        else:
+            # bias 상수를 새로 만들고, batch_norm 노드는 conv 의 출력에 bias 를 더하는 BiasAdd 로 바꾼다.
+            bias = graph_def.node.add()
+            bias.op = "Const"
+            bias.name = node.name + "/folded_bias"
+            bias.attr["dtype"].type = dtype
+            bias.attr["value"].CopyFrom(tf.AttrValue(tensor=tf.make_tensor_proto(b.astype(np.float32))))
+            node.op = "BiasAdd"
+            node.input.extend([conv_output, bias.name])
+            node.attr["data_format"].s = data_format if data_format else b"NHWC"
+        node.attr["T"].type = dtype
+        folded += 1
+    return graph_def, folded
+
+
+def freeze_graph(sess, output_names, fold_batch_norm=True):
+
+    graph_def = tf.graph_util.convert_variables_to_constants(sess, sess.graph.as_graph_def(), output_names)
+    folded = 0
+    if fold_batch_norm:
+        graph_def, folded = fold_batch_norms(graph_def)
+    graph_def = tf.graph_util.remove_training_nodes(graph_def, protected_nodes=output_names)
+    # 합치고 남은 gamma, beta, moving_mean, moving_variance 상수를 버린다.
+    graph_def = tf.graph_util.extract_sub_graph(graph_def, output_names)
+    return graph_def, folded
+
+
+def write_frozen_graph(sess, output_names, path, fold_batch_norm=True):
+
+    graph_def, folded = freeze_graph(sess, output_names, fold_batch_norm=fold_batch_norm)
+    serialized = graph_def.SerializeToString()
+    with tf.gfile.GFile(path, mode='wb') as f:
+        f.write(serialized)
+    print("<<< {} saved - {} nodes, {} batch norm folded, {:.2f}MB >>>".format(
+        path, len(graph_def.node), folded, len(serialized) / (1 << 20)))
+    return path
+
+
+def load_frozen_graph(path, input_name="input", output_name="output"):
+
+    graph_def = tf.GraphDef()
+    with tf.gfile.GFile(path, mode='rb') as f:
+        graph_def.ParseFromString(f.read())
+    graph = tf.Graph()
+    with graph.as_default():
+        tf.import_graph_def(graph_def, name="")
+    return graph, graph.get_tensor_by_name(input_name + ":0"), graph.get_tensor_by_name(output_name + ":0")
+
+
+# 첫 번째 실행은 그래프 최적화, 메모리 할당이 포함되므로 따로 잰다. -> (첫 번째 이미지 ms, 나머지 이미지 평균 ms)
+def measure_latency(sess, x, G, images, feed_dict=None):
+
+    feed_dict = dict(feed_dict or {})
+    latency = []
+    for image in images:
+        feed_dict[x] = image
+        start = time.time()
+        sess.run(G, feed_dict=feed_dict)
+        latency.append((time.time() - start) * 1000)
+    return latency[0], np.mean(latency[1:]) if len(latency) > 1 else latency[0]
@@ -1,28 +1,58 @@
 import shutil
+import time
 
+from Checkpoint import *
+from DataFormat import *
 from Dataset import *
+from ImageWriter import *
+from Freeze import *
+from Profiler import *
+from Server import *
+from ThreadConfig import *
+from Tiling import *
+from XLA import *
 
 
-def visualize(model_name="Pix2PixConditionalGAN", named_images=None, save_path=None):
-    if not os.path.exists(save_path):
-        os.makedirs(save_path)
+def stack_images(images):
     # 이미지 y축 방향으로 붙이기
-    image = np.hstack(named_images[1:])
+    image = np.hstack(images)
     # 이미지 스케일 바꾸기(~1 ~ 1 -> 0~ 255)
     image = ((image + 1) * 127.5).astype(np.uint8)
     # RGB로 바꾸기
-    image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
-    cv2.imwrite(os.path.join(save_path, '{}_{}.png'.format(model_name, named_images[0])), image)
-    print("<<< {}_{}.png saved in {} folder >>>".format(model_name, named_images[0], save_path))
+    return cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+
+
+# writer 가 주어지면 붙이기, 스케일 바꾸기, 인코딩, 쓰기를 writer 의 pool 에서 한다.
+def visualize(model_name="Pix2PixConditionalGAN", named_images=None, save_path=None, writer=None):
+    if not os.path.exists(save_path):
+        os.makedirs(save_path)
+    path = os.path.join(save_path, '{}_{}'.format(model_name, named_images[0]))
+    if writer:
+        path = writer.write(path, named_images[1:], transform=stack_images)
+    else:
+        path = path + ".png"
+        cv2.imwrite(path, stack_images(named_images[1:]))
+    print("<<< {} saved in {} folder >>>".format(os.path.basename(path), save_path))
 
 
 def model(DB_name="facades",
           TEST=False,
           TFRecord=True,
+          TFRecord_encoding="png",
+          num_parallel_calls=None,
+          prefetch_size=None,
+          cache=None,
+          Memmap=False,
+          Stream=False,
+          batch_jitter=False,
+          jitter_seed=None,
+          mirror=None,
           AtoB=False,
           Inputsize_limit=(256, 256),
           filter_size=32,
           norm_selection="BN",
+          fused_norm=False,
+          data_format="NHWC",
           regularizer="L1",
           scale=0.0001,
           Dropout_rate=0.5,
@@ -33,12 +63,39 @@ def model(DB_name="facades",
           decay=0.999, momentum=0.9,
           image_pool=False,
           image_pool_size=50,
+          fused_step=False,
+          accumulation_steps=1,
+          metrics_step=None,
+          checkpoint_steps=None,
+          checkpoint_secs=None,
+          keep_checkpoint_every_n_hours=10000.0,
           learning_rate=0.0002, training_epochs=2, batch_size=2, display_step=1,
           inference_size=(512, 512),
           using_moving_variable=False,
           only_draw_graph=False,
           show_translated_image=True,
           weights_to_numpy=False,
+          image_format="png",
+          png_compression=3,
+          jpeg_quality=95,
+          writer_workers=None,
+          writer_queue_size=16,
+          writer_use_process=False,
+          tile_size=None,
+          tile_overlap=32,
+          tile_batch_size=4,
+          export_frozen=False,
+          export_dropout=True,
+          serve=False,
+          serve_address=("127.0.0.1", 8000),
+          max_batch_size=8,
+          max_wait_ms=10,
+          synthetic_size=None,
+          synthetic_length=100,
+          profile_steps=None,
+          recompute_segments=None,
+          xla=None,
+          threads=None,
           save_path="translated_image"):
     model_name = str(filter_size)
 
@@ -69,10 +126,54 @@ def model(DB_name="facades",
     if regularizer == "L1" or regularizer =="L2":
         model_name =  model_name + "reg" + regularizer
 
+    if not isinstance(accumulation_steps, int) or accumulation_steps < 1:
+        print("<<< accumulation_steps 는 1 이상의 정수입니다. >>>")
+        exit(0)
+
     if TEST == False:
         if os.path.exists("tensorboard/{}".format(model_name)):
             shutil.rmtree("tensorboard/{}".format(model_name))
 
+    # data_format="NCHW" -> 그래프 안에서는 (N, C, H, W) 로 계산하고, generator, discriminator 의 입력과 출력에서만 transpose 한다.
+    # -> placeholder, 데이터 파이프라인, 저장되는 이미지는 그대로 (N, H, W, C) 이고, 변수의 모양도 같아서 checkpoint 를 같이 쓸 수 있다.
+    # -> CPU 에서는 MKL(oneDNN) 로 빌드된 tensorflow 만 NCHW convolution 을 지원한다.(지원하지 않으면 NHWC 로 바꾼다.)
+    data_format = check_data_format(data_format)
+    channel_axis = 1 if data_format == "NCHW" else -1
+
+    # NHWC 순서로 쓴 strides, paddings, shape 를 data_format 순서로 바꾼다.
+    def layout(nhwc):
+        nhwc = list(nhwc)
+        if data_format == "NCHW":
+            return [nhwc[0], nhwc[3], nhwc[1], nhwc[2]]
+        return nhwc
+
+    # (N, H, W, C) -> data_format
+    def to_layout(input):
+        return tf.transpose(input, [0, 3, 1, 2]) if data_format == "NCHW" else input
+
+    # data_format -> (N, H, W, C)
+    def from_layout(input):
+        return tf.transpose(input, [0, 2, 3, 1]) if data_format == "NCHW" else input
+
+    # fused_norm=True 일 때의 instance norm
+    # -> tf.contrib.layers.instance_norm 과 같은 계산(epsilon=1e-6)을 transpose 없이 data_format 그대로 한다.
+    # -> FusedBatchNorm 은 epsilon 을 1.001e-5 보다 작게 할 수 없어서(cuDNN 제한) 기존 checkpoint 와 결과가 달라지므로 쓰지 않고,
+    #    batch 를 채널 방향으로 접으려면 NHWC 에서는 층마다 transpose 가 두번 들어가서 오히려 메모리를 더 읽고 쓴다.
+    def instance_norm(input):
+
+        with tf.variable_scope("InstanceNorm"):
+            # tf.contrib.layers.instance_norm 과 같은 이름의 변수를 쓴다. -> checkpoint 를 그대로 불러올 수 있다.
+            channels = input.get_shape()[channel_axis].value
+            beta = tf.get_variable("beta", [channels], initializer=tf.zeros_initializer())
+            gamma = tf.get_variable("gamma", [channels], initializer=tf.ones_initializer())
+
+            # 이미지마다, 채널마다의 평균과 분산
+            mean, variance = tf.nn.moments(input, [2, 3] if data_format == "NCHW" else [1, 2], keep_dims=True)
+            params_shape = layout([1, 1, 1, channels])
+            # 정규화와 gamma, beta 를 곱셈 하나와 덧셈 하나로 계산한다.
+            return tf.nn.batch_normalization(input, mean, variance, offset=tf.reshape(beta, params_shape),
+                                             scale=tf.reshape(gamma, params_shape), variance_epsilon=1e-6)
+
     # stride? -> [1, 2, 2, 1] = [one image, width, height, one channel]
     def conv2d(input, weight_shape=None, bias_shape=None, norm_selection=None,
                strides=[1, 1, 1, 1], padding="VALID"):
@@ -91,16 +192,23 @@ def model(DB_name="facades",
         else:
             w = tf.get_variable("w", weight_shape, initializer=weight_init)
 
-        b = tf.get_variable("b", bias_shape, initializer=bias_init)
-        conv_out = tf.nn.conv2d(input, w, strides=strides, padding=padding)
+        conv_out = tf.nn.conv2d(input, w, strides=layout(strides), padding=padding, data_format=data_format)
+
+        # fused_norm=True -> normalization 이 평균을 빼면서 bias 도 같이 없어지므로 bias 를 만들지 않는다.
+        if fused_norm and norm_selection == "BN":
+            return tf.layers.batch_normalization(conv_out, axis=channel_axis, training=BN_FLAG, fused=True)
+        elif fused_norm and norm_selection == "IN":
+            return instance_norm(conv_out)
 
         # batch_norm을 적용하면 bias를 안써도 된다곤 하지만, 나는 썼다.
+        b = tf.get_variable("b", bias_shape, initializer=bias_init)
+        bias_out = tf.nn.bias_add(conv_out, b, data_format=data_format)
         if norm_selection == "BN":
-            return tf.layers.batch_normalization(tf.nn.bias_add(conv_out, b), training=BN_FLAG)
+            return tf.layers.batch_normalization(bias_out, axis=channel_axis, training=BN_FLAG)
         elif norm_selection == "IN":
-            return tf.contrib.layers.instance_norm(tf.nn.bias_add(conv_out, b))
+            return tf.contrib.layers.instance_norm(bias_out, data_format=data_format)
         else:
-            return tf.nn.bias_add(conv_out, b)
+            return bias_out
 
     def conv2d_transpose(input, output_shape=None, weight_shape=None, bias_shape=None, norm_selection=None,
                          strides=[1, 1, 1, 1], padding="VALID"):
@@ -118,145 +226,253 @@ def model(DB_name="facades",
         else:
             w = tf.get_variable("w", weight_shape, initializer=weight_init)
 
-        b = tf.get_variable("b", bias_shape, initializer=bias_init)
-        conv_out = tf.nn.conv2d_transpose(input, w, output_shape=output_shape, strides=strides, padding=padding)
+        conv_out = tf.nn.conv2d_transpose(input, w, output_shape=output_shape, strides=layout(strides), padding=padding,
+                                          data_format=data_format)
+
+        # fused_norm=True -> normalization 이 평균을 빼면서 bias 도 같이 없어지므로 bias 를 만들지 않는다.
+        if fused_norm and norm_selection == "BN":
+            return tf.layers.batch_normalization(conv_out, axis=channel_axis, training=BN_FLAG, fused=True)
+        elif fused_norm and norm_selection == "IN":
+            return instance_norm(conv_out)
 
         # batch_norm을 적용하면 bias를 안써도 된다곤 하지만, 나는 썼다.
+        b = tf.get_variable("b", bias_shape, initializer=bias_init)
+        bias_out = tf.nn.bias_add(conv_out, b, data_format=data_format)
         if norm_selection == "BN":
-            return tf.layers.batch_normalization(tf.nn.bias_add(conv_out, b), training=BN_FLAG)
+            return tf.layers.batch_normalization(bias_out, axis=channel_axis, training=BN_FLAG)
         elif norm_selection == "IN":
-            return tf.contrib.layers.instance_norm(tf.nn.bias_add(conv_out, b))
+            return tf.contrib.layers.instance_norm(bias_out, data_format=data_format)
         else:
-            return tf.nn.bias_add(conv_out, b)
+            return bias_out
 
     # 유넷 - U-NET
-    def generator(images=None):
+    def generator(images=None, keep_prob=Dropout_rate, recompute_segments=None):
 
         '''encoder의 활성화 함수는 모두 leaky_relu이며, decoder의 활성화 함수는 모두 relu이다.
         encoder의 첫번째 층에는 batch_norm이 적용 안된다.
 
         총 16개의 층이다.
+        각 층은 앞의 층들의 출력(tensors)을 받아서 자신의 출력을 돌려주는 함수이다.
+
+        recompute_segments 가 주어지면 16개의 층을 recompute_segments 개의 구간으로 나눈다.(gradient checkpointing)
+        -> 구간의 입력과 구간 밖에서 쓰이는 출력(skip connection 으로 쓰이는 encoder 출력 등)만 저장하고,
+           구간 안의 나머지 활성화 값(leaky_relu, bias_add, normalization, concat 의 출력)은 역전파 할 때 다시 계산한다.
+        -> 계산량은 늘어나지만 메모리를 덜 쓰므로, 더 큰 batch_size 나 이미지 크기로 학습할 수 있다.
         '''
-        with tf.variable_scope("Generator"):
-            with tf.variable_scope("encoder"):
-                with tf.variable_scope("conv1"):
-                    conv1 = conv2d(images, weight_shape=(4, 4, 3, filter_size), bias_shape=(filter_size),
-                                   strides=[1, 2, 2, 1], padding="SAME")
-                    # result shape = (batch_size, 128, 128, 64)
-                with tf.variable_scope("conv2"):
-                    conv2 = conv2d(tf.nn.leaky_relu(conv1, alpha=0.2),
-                                   weight_shape=(4, 4, filter_size, filter_size * 2), bias_shape=(filter_size * 2),
-                                   norm_selection=norm_selection,
-                                   strides=[1, 2, 2, 1], padding="SAME")
-                    # result shape = (batch_size, 64, 64, 128)
-                with tf.variable_scope("conv3"):
-                    conv3 = conv2d(tf.nn.leaky_relu(conv2, alpha=0.2),
-                                   weight_shape=(4, 4, filter_size * 2, filter_size * 4), bias_shape=(filter_size * 4),
-                                   norm_selection=norm_selection,
-                                   strides=[1, 2, 2, 1], padding="SAME")
-                    # result shape = (batch_size, 32, 32, 256)
-                with tf.variable_scope("conv4"):
-                    conv4 = conv2d(tf.nn.leaky_relu(conv3, alpha=0.2),
-                                   weight_shape=(4, 4, filter_size * 4, filter_size * 8), bias_shape=(filter_size * 8),
-                                   norm_selection=norm_selection,
-                                   strides=[1, 2, 2, 1], padding="SAME")
-                    # result shape = (batch_size, 16, 16, 512)
-                with tf.variable_scope("conv5"):
-                    conv5 = conv2d(tf.nn.leaky_relu(conv4, alpha=0.2),
-                                   weight_shape=(4, 4, filter_size * 8, filter_size * 8), bias_shape=(filter_size * 8),
-                                   norm_selection=norm_selection,
-                                   strides=[1, 2, 2, 1], padding="SAME")
-                    # result shape = (batch_size, 8, 8, 512)
-                with tf.variable_scope("conv6"):
-                    conv6 = conv2d(tf.nn.leaky_relu(conv5, alpha=0.2),
-                                   weight_shape=(4, 4, filter_size * 8, filter_size * 8), bias_shape=(filter_size * 8),
-                                   norm_selection=norm_selection,
-                                   strides=[1, 2, 2, 1], padding="SAME")
-                    # result shape = (batch_size, 4, 4, 512)
-                with tf.variable_scope("conv7"):
-                    conv7 = conv2d(tf.nn.leaky_relu(conv6, alpha=0.2),
-                                   weight_shape=(4, 4, filter_size * 8, filter_size * 8), bias_shape=(filter_size * 8),
-                                   norm_selection=norm_selection,
-                                   strides=[1, 2, 2, 1], padding="SAME")
-                    # result shape = (batch_size, 2, 2, 512)
-                with tf.variable_scope("conv8"):
-                    conv8 = conv2d(tf.nn.leaky_relu(conv7, alpha=0.2),
-                                   weight_shape=(4, 4, filter_size * 8, filter_size * 8), bias_shape=(filter_size * 8),
-                                   strides=[1, 2, 2, 1], padding="SAME")
-                    # result shape = (batch_size, 1, 1, 512)
-
-            with tf.variable_scope("decoder"):
-                with tf.variable_scope("trans_conv1"):
-                    '''output_shape = tf.shape(conv2) ???
-                    output_shape 을 직접 지정 해주는 경우 예를 들어 (batch_size, 2, 2, 512) 이런식으로 지정해준다면,
-                    trans_conv1 의 결과는 무조건 (batch_size, 2, 2, 512) 이어야 한다. 그러나 tf.shape(conv2)로 쓸 경우
-                    나중에 session에서 실행될 때 입력이 되므로, batch_size에 종속되지 않는다. 
-                    어쨌든 output_shape = tf.shape(conv2) 처럼 코딩하는게 무조건 좋다. 
-                    '''
-                    trans_conv1 = tf.nn.dropout(
-                        conv2d_transpose(tf.nn.relu(conv8), output_shape=tf.shape(conv7),
-                                         weight_shape=(4, 4, filter_size * 8, filter_size * 8),
-                                         bias_shape=(filter_size * 8), norm_selection=norm_selection,
-                                         strides=[1, 2, 2, 1], padding="SAME"), keep_prob=Dropout_rate)
-                    # result shape = (batch_size, 2, 2, 512)
-                    # 주의 : 활성화 함수 들어가기전의 encoder 요소를 concat 해줘야함
-                    trans_conv1 = tf.concat([trans_conv1, conv7], axis=-1)
-                    # result shape = (batch_size, 2, 2, 1024)
-
-                with tf.variable_scope("trans_conv2"):
-                    trans_conv2 = tf.nn.dropout(
-                        conv2d_transpose(tf.nn.relu(trans_conv1), output_shape=tf.shape(conv6),
-                                         weight_shape=(4, 4, filter_size * 8, filter_size * 16),
-                                         bias_shape=(filter_size * 8), norm_selection=norm_selection,
-                                         strides=[1, 2, 2, 1], padding="SAME"), keep_prob=Dropout_rate)
-                    trans_conv2 = tf.concat([trans_conv2, conv6], axis=-1)
-                    # result shape = (batch_size, 4, 4, 1024)
-
-                with tf.variable_scope("trans_conv3"):
-                    trans_conv3 = tf.nn.dropout(
-                        conv2d_transpose(tf.nn.relu(trans_conv2), output_shape=tf.shape(conv5),
-                                         weight_shape=(4, 4, filter_size * 8, filter_size * 16),
-                                         bias_shape=(filter_size * 8), norm_selection=norm_selection,
-                                         strides=[1, 2, 2, 1], padding="SAME"), keep_prob=Dropout_rate)
-                    trans_conv3 = tf.concat([trans_conv3, conv5], axis=-1)
-                    # result shape = (batch_size, 8, 8, 1024)
-
-                with tf.variable_scope("trans_conv4"):
-                    trans_conv4 = conv2d_transpose(tf.nn.relu(trans_conv3), output_shape=tf.shape(conv4),
-                                                   weight_shape=(4, 4, filter_size * 8, filter_size * 16),
-                                                   bias_shape=(filter_size * 8), norm_selection=norm_selection,
-                                                   strides=[1, 2, 2, 1], padding="SAME")
-                    trans_conv4 = tf.concat([trans_conv4, conv4], axis=-1)
-                    # result shape = (batch_size, 16, 16, 1024)
-                with tf.variable_scope("trans_conv5"):
-                    trans_conv5 = conv2d_transpose(tf.nn.relu(trans_conv4), output_shape=tf.shape(conv3),
-                                                   weight_shape=(4, 4, filter_size * 4, filter_size * 16),
-                                                   bias_shape=(filter_size * 4), norm_selection=norm_selection,
-                                                   strides=[1, 2, 2, 1], padding="SAME")
-                    trans_conv5 = tf.concat([trans_conv5, conv3], axis=-1)
-                    # result shape = (batch_size, 32, 32, 512)
-                with tf.variable_scope("trans_conv6"):
-                    trans_conv6 = conv2d_transpose(tf.nn.relu(trans_conv5), output_shape=tf.shape(conv2),
-                                                   weight_shape=(4, 4, filter_size * 2, filter_size * 8),
-                                                   bias_shape=(filter_size * 2), norm_selection=norm_selection,
-                                                   strides=[1, 2, 2, 1], padding="SAME")
-                    trans_conv6 = tf.concat([trans_conv6, conv2], axis=-1)
-                    # result shape = (batch_size, 64, 64, 256)
-                with tf.variable_scope("trans_conv7"):
-                    trans_conv7 = conv2d_transpose(tf.nn.relu(trans_conv6), output_shape=tf.shape(conv1),
-                                                   weight_shape=(4, 4, filter_size, filter_size * 4),
-                                                   bias_shape=(filter_size), norm_selection=norm_selection,
-                                                   strides=[1, 2, 2, 1], padding="SAME")
-                    trans_conv7 = tf.concat([trans_conv7, conv1], axis=-1)
-                    # result shape = (batch_size, 128, 128, 128)
-                with tf.variable_scope("trans_conv8"):
-                    output = tf.nn.tanh(
-                        conv2d_transpose(tf.nn.relu(trans_conv7), output_shape=tf.shape(images),
-                                         weight_shape=(4, 4, 3, filter_size * 2),
-                                         bias_shape=(3),
-                                         strides=[1, 2, 2, 1], padding="SAME"))
-                    # result shape = (batch_size, 256, 256, 3)
-        return output
+
+        def conv1(tensors):
+            # result shape = (batch_size, 128, 128, 64)
+            return conv2d(tensors["images"], weight_shape=(4, 4, 3, filter_size), bias_shape=(filter_size),
+                          strides=[1, 2, 2, 1], padding="SAME")
+
+        def conv2(tensors):
+            # result shape = (batch_size, 64, 64, 128)
+            return conv2d(tf.nn.leaky_relu(tensors["conv1"], alpha=0.2),
+                          weight_shape=(4, 4, filter_size, filter_size * 2), bias_shape=(filter_size * 2),
+                          norm_selection=norm_selection,
+                          strides=[1, 2, 2, 1], padding="SAME")
+
+        def conv3(tensors):
+            # result shape = (batch_size, 32, 32, 256)
+            return conv2d(tf.nn.leaky_relu(tensors["conv2"], alpha=0.2),
+                          weight_shape=(4, 4, filter_size * 2, filter_size * 4), bias_shape=(filter_size * 4),
+                          norm_selection=norm_selection,
+                          strides=[1, 2, 2, 1], padding="SAME")
+
+        def conv4(tensors):
+            # result shape = (batch_size, 16, 16, 512)
+            return conv2d(tf.nn.leaky_relu(tensors["conv3"], alpha=0.2),
+                          weight_shape=(4, 4, filter_size * 4, filter_size * 8), bias_shape=(filter_size * 8),
+                          norm_selection=norm_selection,
+                          strides=[1, 2, 2, 1], padding="SAME")
+
+        def conv5(tensors):
+            # result shape = (batch_size, 8, 8, 512)
+            return conv2d(tf.nn.leaky_relu(tensors["conv4"], alpha=0.2),
+                          weight_shape=(4, 4, filter_size * 8, filter_size * 8), bias_shape=(filter_size * 8),
+                          norm_selection=norm_selection,
+                          strides=[1, 2, 2, 1], padding="SAME")
+
+        def conv6(tensors):
+            # result shape = (batch_size, 4, 4, 512)
+            return conv2d(tf.nn.leaky_relu(tensors["conv5"], alpha=0.2),
+                          weight_shape=(4, 4, filter_size * 8, filter_size * 8), bias_shape=(filter_size * 8),
+                          norm_selection=norm_selection,
+                          strides=[1, 2, 2, 1], padding="SAME")
+
+        def conv7(tensors):
+            # result shape = (batch_size, 2, 2, 512)
+            return conv2d(tf.nn.leaky_relu(tensors["conv6"], alpha=0.2),
+                          weight_shape=(4, 4, filter_size * 8, filter_size * 8), bias_shape=(filter_size * 8),
+                          norm_selection=norm_selection,
+                          strides=[1, 2, 2, 1], padding="SAME")
+
+        def conv8(tensors):
+            # result shape = (batch_size, 1, 1, 512)
+            return conv2d(tf.nn.leaky_relu(tensors["conv7"], alpha=0.2),
+                          weight_shape=(4, 4, filter_size * 8, filter_size * 8), bias_shape=(filter_size * 8),
+                          strides=[1, 2, 2, 1], padding="SAME")
+
+        '''output_shape = tf.shape(conv2) ???
+        output_shape 을 직접 지정 해주는 경우 예를 들어 (batch_size, 2, 2, 512) 이런식으로 지정해준다면,
+        trans_conv1 의 결과는 무조건 (batch_size, 2, 2, 512) 이어야 한다. 그러나 tf.shape(conv2)로 쓸 경우
+        나중에 session에서 실행될 때 입력이 되므로, batch_size에 종속되지 않는다. 
+        어쨌든 output_shape = tf.shape(conv2) 처럼 코딩하는게 무조건 좋다. 
+
+        dropout 의 mask 는 층 밖에서 미리 만들어서 넘겨준다. -> 역전파 할 때 다시 계산해도 같은 mask 가 쓰인다.
+        '''
+        def trans_conv1(tensors):
+            trans_conv1 = conv2d_transpose(tf.nn.relu(tensors["conv8"]), output_shape=tf.shape(tensors["conv7"]),
+                                           weight_shape=(4, 4, filter_size * 8, filter_size * 8),
+                                           bias_shape=(filter_size * 8), norm_selection=norm_selection,
+                                           strides=[1, 2, 2, 1], padding="SAME") * tensors["mask1"]
+            # result shape = (batch_size, 2, 2, 512)
+            # 주의 : 활성화 함수 들어가기전의 encoder 요소를 concat 해줘야함
+            # result shape = (batch_size, 2, 2, 1024)
+            return tf.concat([trans_conv1, tensors["conv7"]], axis=channel_axis)
+
+        def trans_conv2(tensors):
+            trans_conv2 = conv2d_transpose(tf.nn.relu(tensors["trans_conv1"]), output_shape=tf.shape(tensors["conv6"]),
+                                           weight_shape=(4, 4, filter_size * 8, filter_size * 16),
+                                           bias_shape=(filter_size * 8), norm_selection=norm_selection,
+                                           strides=[1, 2, 2, 1], padding="SAME") * tensors["mask2"]
+            # result shape = (batch_size, 4, 4, 1024)
+            return tf.concat([trans_conv2, tensors["conv6"]], axis=channel_axis)
+
+        def trans_conv3(tensors):
+            trans_conv3 = conv2d_transpose(tf.nn.relu(tensors["trans_conv2"]), output_shape=tf.shape(tensors["conv5"]),
+                                           weight_shape=(4, 4, filter_size * 8, filter_size * 16),
+                                           bias_shape=(filter_size * 8), norm_selection=norm_selection,
+                                           strides=[1, 2, 2, 1], padding="SAME") * tensors["mask3"]
+            # result shape = (batch_size, 8, 8, 1024)
+            return tf.concat([trans_conv3, tensors["conv5"]], axis=channel_axis)
+
+        def trans_conv4(tensors):
+            trans_conv4 = conv2d_transpose(tf.nn.relu(tensors["trans_conv3"]), output_shape=tf.shape(tensors["conv4"]),
+                                           weight_shape=(4, 4, filter_size * 8, filter_size * 16),
+                                           bias_shape=(filter_size * 8), norm_selection=norm_selection,
+                                           strides=[1, 2, 2, 1], padding="SAME")
+            # result shape = (batch_size, 16, 16, 1024)
+            return tf.concat([trans_conv4, tensors["conv4"]], axis=channel_axis)
+
+        def trans_conv5(tensors):
+            trans_conv5 = conv2d_transpose(tf.nn.relu(tensors["trans_conv4"]), output_shape=tf.shape(tensors["conv3"]),
+                                           weight_shape=(4, 4, filter_size * 4, filter_size * 16),
+                                           bias_shape=(filter_size * 4), norm_selection=norm_selection,
+                                           strides=[1, 2, 2, 1], padding="SAME")
+            # result shape = (batch_size, 32, 32, 512)
+            return tf.concat([trans_conv5, tensors["conv3"]], axis=channel_axis)
+
+        def trans_conv6(tensors):
+            trans_conv6 = conv2d_transpose(tf.nn.relu(tensors["trans_conv5"]), output_shape=tf.shape(tensors["conv2"]),
+                                           weight_shape=(4, 4, filter_size * 2, filter_size * 8),
+                                           bias_shape=(filter_size * 2), norm_selection=norm_selection,
+                                           strides=[1, 2, 2, 1], padding="SAME")
+            # result shape = (batch_size, 64, 64, 256)
+            return tf.concat([trans_conv6, tensors["conv2"]], axis=channel_axis)
+
+        def trans_conv7(tensors):
+            trans_conv7 = conv2d_transpose(tf.nn.relu(tensors["trans_conv6"]), output_shape=tf.shape(tensors["conv1"]),
+                                           weight_shape=(4, 4, filter_size, filter_size * 4),
+                                           bias_shape=(filter_size), norm_selection=norm_selection,
+                                           strides=[1, 2, 2, 1], padding="SAME")
+            # result shape = (batch_size, 128, 128, 128)
+            return tf.concat([trans_conv7, tensors["conv1"]], axis=channel_axis)
+
+        def trans_conv8(tensors):
+            # result shape = (batch_size, 256, 256, 3)
+            return tf.nn.tanh(
+                conv2d_transpose(tf.nn.relu(tensors["trans_conv7"]), output_shape=tf.shape(tensors["images"]),
+                                 weight_shape=(4, 4, 3, filter_size * 2),
+                                 bias_shape=(3),
+                                 strides=[1, 2, 2, 1], padding="SAME"))
+
+        # (variable_scope, 층, 층이 읽는 tensor 이름들)
+        layers = [("encoder/conv1", conv1, ["images"]),
+                  ("encoder/conv2", conv2, ["conv1"]),
+                  ("encoder/conv3", conv3, ["conv2"]),
+                  ("encoder/conv4", conv4, ["conv3"]),
+                  ("encoder/conv5", conv5, ["conv4"]),
+                  ("encoder/conv6", conv6, ["conv5"]),
+                  ("encoder/conv7", conv7, ["conv6"]),
+                  ("encoder/conv8", conv8, ["conv7"]),
+                  ("decoder/trans_conv1", trans_conv1, ["conv8", "conv7", "mask1"]),
+                  ("decoder/trans_conv2", trans_conv2, ["trans_conv1", "conv6", "mask2"]),
+                  ("decoder/trans_conv3", trans_conv3, ["trans_conv2", "conv5", "mask3"]),
+                  ("decoder/trans_conv4", trans_conv4, ["trans_conv3", "conv4"]),
+                  ("decoder/trans_conv5", trans_conv5, ["trans_conv4", "conv3"]),
+                  ("decoder/trans_conv6", trans_conv6, ["trans_conv5", "conv2"]),
+                  ("decoder/trans_conv7", trans_conv7, ["trans_conv6", "conv1"]),
+                  ("decoder/trans_conv8", trans_conv8, ["trans_conv7", "images"])]
+
+        def run_layers(layers, tensors):
+            for scope, layer, _ in layers:
+                with tf.variable_scope(scope):
+                    tensors[scope.split("/")[-1]] = layer(tensors)
+            return tensors
+
+        def recompute_segment(segment, tensors):
+
+            # 구간의 입력 -> 구간의 층들이 읽는 tensor 중 구간 밖에서 만들어진 것
+            names = [scope.split("/")[-1] for scope, _, _ in segment]
+            inputs = sorted({name for _, _, reads in segment for name in reads if name not in names})
+            # 구간의 출력 -> 구간 뒤의 층들이 읽는 tensor 와 generator 의 출력
+            later_reads = {name for _, _, reads in layers[layers.index(segment[-1]) + 1:] for name in reads}
+            outputs = [name for name in names if name in later_reads or name == "trans_conv8"]
+            built = []
+
+            def segment_function(*input_tensors):
+                update_ops = tf.get_collection_ref(tf.GraphKeys.UPDATE_OPS)
+                update_count = len(update_ops)
+                op_count = len(tf.get_default_graph().get_operations())
+                segment_tensors = run_layers(segment, dict(zip(inputs, input_tensors)))
+                results = [segment_tensors[name] for name in outputs]
+                if built:
+                    # 역전파 할 때 다시 만들어진 batch norm 의 moving average update 는 지운다. -> 한 step 에 두번 update 되지 않는다.
+                    del update_ops[update_count:]
+                else:
+                    # 구간 안에서만 쓰이고 저장하지 않는 활성화 값(구간의 입력으로부터 계산되는 tensor) -> 줄어든 메모리를 계산할 때 쓴다.
+                    # batch norm 의 tf.cond 안(Switch ~ Merge 사이)의 연산은 실행되지 않는 쪽이 있으므로 뺀다.
+                    activation_ops = {tensor.op for tensor in input_tensors}
+                    in_branch = set()
+                    for op in tf.get_default_graph().get_operations()[op_count:]:
+                        if not any(tensor.op in activation_ops for tensor in op.inputs):
+                            continue
+                        activation_ops.add(op)
+                        if op.type == "Switch" or (op.type != "Merge" and any(
+                                tensor.op in in_branch for tensor in op.inputs)):
+                            in_branch.add(op)
+                            continue
+                        for tensor in op.outputs:
+                            if tensor.dtype == tf.float32 and not any(tensor is result for result in results):
+                                tf.add_to_collection("recomputed_activations", tensor)
+                built.append(True)
+                return results
+
+            results = tf.contrib.layers.recompute_grad(segment_function)(*[tensors[name] for name in inputs])
+            return dict(zip(outputs, results))
+
+        # custom gradient 는 ResourceVariable 만 지원하므로 recompute 할 때는 use_resource=True 로 변수를 만든다.
+        with tf.variable_scope("Generator", use_resource=True if recompute_segments else None):
+            tensors = {"images": to_layout(images)}
+            # trans_conv1, 2, 3 의 dropout mask -> 모양은 conv7, conv6, conv5 와 같다.(SAME, stride 2 -> 크기가 올림으로 반씩 준다.)
+            with tf.name_scope("dropout_mask"):
+                shape = tf.shape(images)
+                for index in range(1, 4):
+                    scale = 2 ** (8 - index)
+                    tensors["mask{}".format(index)] = tf.nn.dropout(
+                        tf.ones(layout([shape[0], (shape[1] + scale - 1) // scale, (shape[2] + scale - 1) // scale,
+                                        filter_size * 8])), keep_prob=keep_prob)
+
+            if recompute_segments:
+                recompute_segments = min(recompute_segments, len(layers))
+                for index in range(recompute_segments):
+                    segment = layers[index * len(layers) // recompute_segments:
+                                     (index + 1) * len(layers) // recompute_segments]
+                    tensors.update(recompute_segment(segment, tensors))
+            else:
+                tensors = run_layers(layers, tensors)
+        return from_layout(tensors["trans_conv8"])
 
     # PatchGAN
     def discriminator(images=None, condition=None):
@@ -265,7 +481,7 @@ def model(DB_name="facades",
         genertor와 마찬가지로 첫번째 층에는 batch_norm을 적용 안한다.
 
         왜 이런 구조를 사용? 아래의 구조 출력단의 ReceptiveField 크기를 구해보면 70이다.(ReceptiveFieldArithmetic/rf.py 에서 구해볼 수 있다.)'''
-        conditional_input = tf.concat([images, condition], axis=-1)
+        conditional_input = to_layout(tf.concat([images, condition], axis=-1))
         with tf.variable_scope("Discriminator"):
             with tf.variable_scope("conv1"):
                 conv1 = tf.nn.leaky_relu(
@@ -285,7 +501,7 @@ def model(DB_name="facades",
                                strides=[1, 2, 2, 1], padding="SAME")
                 # result shape = (batch_size, 32, 32, 256)
                 conv3 = tf.nn.leaky_relu(
-                    tf.pad(conv3, [[0, 0], [1, 1], [1, 1], [0, 0]], mode="CONSTANT", constant_values=0), alpha=0.2)
+                    tf.pad(conv3, layout([[0, 0], [1, 1], [1, 1], [0, 0]]), mode="CONSTANT", constant_values=0), alpha=0.2)
                 # result shape = (batch_size, 34, 34, 256)
             with tf.variable_scope("conv4"):
                 conv4 = conv2d(conv3, weight_shape=(4, 4, filter_size * 4, filter_size * 8),
@@ -293,15 +509,16 @@ def model(DB_name="facades",
                                strides=[1, 1, 1, 1], padding="VALID")
                 # result shape = (batch_size, 31, 31, 256)
                 conv4 = tf.nn.leaky_relu(
-                    tf.pad(conv4, [[0, 0], [1, 1], [1, 1], [0, 0]], mode="CONSTANT", constant_values=0), alpha=0.2)
+                    tf.pad(conv4, layout([[0, 0], [1, 1], [1, 1], [0, 0]]), mode="CONSTANT", constant_values=0), alpha=0.2)
                 # result shape = (batch_size, 33, 33, 512)
             with tf.variable_scope("output"):
                 output = conv2d(conv4, weight_shape=(4, 4, filter_size * 8, 1), bias_shape=(1),
                                 strides=[1, 1, 1, 1], padding="VALID")
                 # result shape = (batch_size, 30, 30, 1)
+                output = from_layout(output)
             return output, tf.nn.sigmoid(output)
 
-    def training(cost, var_list, scope=None):
+    def gradients(cost, var_list, scope=None):
 
         if regularizer=="L1" or regularizer=="L2":
             cost = tf.add_n([cost] + tf.get_collection(tf.GraphKeys.REGULARIZATION_LOSSES, scope=scope))
@@ -312,14 +529,77 @@ def model(DB_name="facades",
                 optimizer = tf.train.RMSPropOptimizer(learning_rate=learning_rate, decay=decay, momentum=momentum)
             elif optimizer_selection == "SGD":
                 optimizer = tf.train.GradientDescentOptimizer(learning_rate=learning_rate)
-            train_operation = optimizer.minimize(cost, var_list=var_list)
-        return train_operation
+            grads_and_vars = optimizer.compute_gradients(cost, var_list=var_list)
+        return optimizer, grads_and_vars
+
+    '''
+    accumulation_steps=K (K > 1) -> K 개의 micro-batch(batch_size) 의 gradient 를 학습하지 않는(trainable=False) 변수에
+    더해두었다가, K 번째 micro-batch 에서 평균 gradient 로 한번만 update 한다.
+    -> 메모리는 batch_size 만큼만 쓰면서 batch_size x K 크기의 batch 로 학습하는 것과 같은 gradient 를 얻는다.
+    -> batch norm 의 moving_mean, moving_variance 는 micro-batch 마다 갱신된다.
+    학습 연산은 (accumulate, apply) 두 개를 돌려준다.
+    accumulate -> gradient 를 더하기만 한다. apply -> gradient 를 더한 뒤 update 하고 누적 변수를 0 으로 되돌린다.
+    -> K=1 이면 두 연산은 같은 연산이다.
+    '''
+    def accumulate_training(optimizers_and_grads, dependencies):
+
+        optimizers_and_grads = [(optimizer, [(grad, var) for grad, var in grads_and_vars if grad is not None])
+                                for optimizer, grads_and_vars in optimizers_and_grads]
+        # 누적 변수는 saver 를 만든 뒤에 선언되므로 checkpoint 에 저장되지 않는다.
+        # -> "accumulators" collection 에도 넣어두고, 이어서 학습할 때 0 으로 되돌린다.
+        with tf.name_scope("accumulator"):
+            accumulators = [[tf.Variable(tf.zeros(var.get_shape(), dtype=var.dtype.base_dtype), trainable=False,
+                                         collections=[tf.GraphKeys.GLOBAL_VARIABLES, "accumulators"])
+                             for _, var in grads_and_vars] for _, grads_and_vars in optimizers_and_grads]
+        with tf.control_dependencies(dependencies):
+            accumulate_operation = tf.group(*[accumulator.assign_add(tf.convert_to_tensor(grad))
+                                              for (_, grads_and_vars), variables in
+                                              zip(optimizers_and_grads, accumulators)
+                                              for accumulator, (grad, _) in zip(variables, grads_and_vars)])
+        # read_value() -> 더한 뒤의 값을 읽는다.
+        with tf.control_dependencies([accumulate_operation]):
+            update_operation = tf.group(*[optimizer.apply_gradients(
+                [(accumulator.read_value() / accumulation_steps, var)
+                 for accumulator, (_, var) in zip(variables, grads_and_vars)])
+                for (optimizer, grads_and_vars), variables in zip(optimizers_and_grads, accumulators)])
+        with tf.control_dependencies([update_operation]):
+            apply_operation = tf.group(*[accumulator.assign(tf.zeros_like(accumulator))
+                                         for variables in accumulators for accumulator in variables])
+        return accumulate_operation, apply_operation
+
+    def training(cost, var_list, scope=None):
+
+        optimizer, grads_and_vars = gradients(cost, var_list, scope=scope)
+        if accumulation_steps > 1:
+            return accumulate_training([(optimizer, grads_and_vars)],
+                                       tf.get_collection(tf.GraphKeys.UPDATE_OPS, scope=scope))
+        with tf.control_dependencies(tf.get_collection(tf.GraphKeys.UPDATE_OPS, scope=scope)):
+            train_operation = optimizer.apply_gradients(grads_and_vars)
+        return train_operation, train_operation
+
+    '''
+    generator 와 discriminator 를 한번의 sess.run 으로 같은 batch 에 대해 update 한다.
+    두 네트워크의 gradient 를 모두 구한 뒤에 update 해야 한쪽의 update 가 다른 쪽의 gradient 에 섞이지 않는다.
+    '''
+    def fused_training(costs, var_lists, scopes):
+
+        optimizers_and_grads = [gradients(cost, var_list, scope=scope)
+                                for cost, var_list, scope in zip(costs, var_lists, scopes)]
+        all_grads = [grad for _, grads_and_vars in optimizers_and_grads
+                     for grad, _ in grads_and_vars if grad is not None]
+        if accumulation_steps > 1:
+            return accumulate_training(optimizers_and_grads, all_grads)
+        with tf.control_dependencies(all_grads):
+            train_operation = tf.group(*[optimizer.apply_gradients(grads_and_vars)
+                                         for optimizer, grads_and_vars in optimizers_and_grads])
+        return train_operation, train_operation
 
     def min_max_loss(logits=None, labels=None):
         return tf.reduce_mean(tf.nn.sigmoid_cross_entropy_with_logits(logits=logits, labels=labels))
 
     if not TEST:
         # print(tf.get_default_graph()) #기본그래프이다.
+        graph_build_start = time.time()
         JG_Graph = tf.Graph()  # 내 그래프로 설정한다.- 혹시라도 나중에 여러 그래프를 사용할 경우를 대비
         with JG_Graph.as_default():  # as_default()는 JG_Graph를 기본그래프로 설정한다.
 
@@ -329,22 +609,49 @@ def model(DB_name="facades",
 
             # 데이터 전처리
             with tf.name_scope("Dataset"):
-                dataset = Dataset(DB_name=DB_name, AtoB=AtoB, batch_size=batch_size, use_TrainDataset=not TEST,
-                                  TFRecord=TFRecord)
-                iterator, next_batch, data_length = dataset.iterator()
+                # synthetic_size 가 주어지면 데이터셋 대신 메모리 안의 랜덤 이미지를 사용한다.(benchmark 용)
+                if synthetic_size:
+                    iterator, next_batch, data_length = synthetic_iterator(batch_size=batch_size,
+                                                                           image_size=synthetic_size,
+                                                                           data_length=synthetic_length)
+                else:
+                    dataset = Dataset(DB_name=DB_name, AtoB=AtoB, batch_size=batch_size, use_TrainDataset=not TEST,
+                                      TFRecord=TFRecord, TFRecord_encoding=TFRecord_encoding,
+                                      num_parallel_calls=num_parallel_calls, prefetch_size=prefetch_size, cache=cache,
+                                      Memmap=Memmap, Stream=Stream, mirror=mirror, batch_jitter=batch_jitter,
+                                      jitter_seed=jitter_seed)
+                    iterator, next_batch, data_length = dataset.iterator()
+
+                '''
+                입력 대기 시간 - 학습 연산 안에서 batch 를 꺼내기(get_next) 직전과 직후의 시각을 잰다.
+                -> 학습에 쓰는 batch 를 그대로 재므로, 시간을 재려고 batch 를 따로 꺼내서 버리지 않는다.
+                '''
+                with tf.name_scope("input_wait"):
+                    dequeue_start = tf.timestamp()
+                    with tf.control_dependencies([dequeue_start]):
+                        next_batch = iterator.get_next()
+                    with tf.control_dependencies(list(next_batch)):
+                        input_wait = tf.timestamp() - dequeue_start
+                    input_shape = tf.shape(next_batch[0])
 
                 # 알고리즘
                 x = next_batch[0]
                 target = next_batch[1]
 
             with tf.variable_scope("shared_variables", reuse=tf.AUTO_REUSE) as scope:
-                with tf.name_scope("Generator"):
-                    G = generator(images=x)
-                with tf.name_scope("Discriminator"):
+                with tf.name_scope("Generator"), jit_scope(xla):
+                    G = generator(images=x, recompute_segments=recompute_segments)
+                with tf.name_scope("Discriminator"), jit_scope(xla):
                     D_real, sigmoid_D_real = discriminator(images=target, condition=x)
                     # scope.reuse_variables()
                     D_gene, sigmoid_D_gene = discriminator(images=G, condition=x)
 
+            # recompute 할 때 저장하지 않는 generator 의 활성화 값 크기(byte)
+            if recompute_segments:
+                with tf.name_scope("recompute_memory"):
+                    recompute_bytes = tf.add_n([tf.size(activation, out_type=tf.int64) * activation.dtype.size
+                                                for activation in tf.get_collection("recomputed_activations")])
+
             # 학습할 Discriminator 변수 지정
             var_D = tf.get_collection(tf.GraphKeys.GLOBAL_VARIABLES, scope='shared_variables/Discriminator')
             # 학습할 Generator 변수 지정
@@ -352,7 +659,8 @@ def model(DB_name="facades",
 
             # optimizer의 매개변수들을 저장하고 싶지 않다면 여기에 선언해야한다.
             with tf.name_scope("saver"):
-                saver_all = tf.train.Saver(var_list=tf.global_variables(), max_to_keep=3)
+                var_all = tf.global_variables()
+                saver_all = tf.train.Saver(var_list=var_all, max_to_keep=3)
                 saver_generator = tf.train.Saver(var_list=var_G, max_to_keep=3)
 
             # Algorithjm - 속이고 속이는 과정
@@ -376,13 +684,24 @@ def model(DB_name="facades",
                     dis_loss = tf.losses.mean_squared_error(target, G)
                     Gdis_Loss = G_Loss + tf.multiply(dis_loss, distance_loss_weight)
 
-            with tf.name_scope("Discriminator_trainer"):
-                D_train_op = training(D_Loss, var_D, scope='shared_variables/Discriminator')
-            with tf.name_scope("Generator_trainer"):
-                if distance_loss == "L1" or distance_loss == "L2":
-                    G_train_op = training(Gdis_Loss, var_G, scope='shared_variables/Generator')
-                else:
-                    G_train_op = training(G_Loss, var_G, scope='shared_variables/Generator')
+            if distance_loss == "L1" or distance_loss == "L2":
+                G_cost = Gdis_Loss
+            else:
+                G_cost = G_Loss
+
+            if fused_step:
+                # generator 와 discriminator 를 한번에 update
+                with tf.name_scope("Fused_trainer"):
+                    train_op, apply_op = fused_training([D_Loss, G_cost], [var_D, var_G],
+                                                        ['shared_variables/Discriminator',
+                                                         'shared_variables/Generator'])
+            else:
+                with tf.name_scope("Discriminator_trainer"):
+                    D_train_op, D_apply_op = training(D_Loss, var_D, scope='shared_variables/Discriminator')
+                with tf.name_scope("Generator_trainer"):
+                    G_train_op, G_apply_op = training(G_cost, var_G, scope='shared_variables/Generator')
+            # 누적 변수를 0 으로 되돌리는 연산 - accumulation_steps=1 이면 아무것도 하지 않는다.
+            accumulator_reset = tf.variables_initializer(tf.get_collection("accumulators"))
 
             with tf.name_scope("Visualizer_each"):
                 tf.summary.image("x", x, max_outputs=1)
@@ -403,6 +722,22 @@ def model(DB_name="facades",
 
             summary_operation = tf.summary.merge_all()
 
+            '''
+            학습 중의 loss 와 discriminator 출력의 평균을 그래프 안에서 누적한다.(tf.metrics.mean)
+            매 step 마다 loss 와 discriminator 출력(30 x 30 patch)을 python 으로 가져오지 않고,
+            update 연산만 학습 연산과 같이 실행한 뒤 epoch 이 끝날 때(혹은 metrics_step 마다) 평균값만 읽는다.
+            '''
+            with tf.variable_scope("Metrics"):
+                D_metrics = {"D_Loss": tf.metrics.mean(D_Loss), "sigmoid_D": tf.metrics.mean(sigmoid_D_real)}
+                G_metrics = {"G_Loss": tf.metrics.mean(G_Loss), "sigmoid_G": tf.metrics.mean(sigmoid_D_gene)}
+                if distance_loss == "L1" or distance_loss == "L2":
+                    G_metrics["dis_loss"] = tf.metrics.mean(dis_loss)
+                metrics = {name: value for name, (value, _) in list(D_metrics.items()) + list(G_metrics.items())}
+                D_metrics_update = tf.group(*[update for _, update in D_metrics.values()])
+                G_metrics_update = tf.group(*[update for _, update in G_metrics.values()])
+                metrics_reset = tf.variables_initializer(
+                    tf.get_collection(tf.GraphKeys.LOCAL_VARIABLES, scope="Metrics"))
+
             '''
             WHY? 아래 6줄의 코드를 적어 주지 않고, 학습을 하게되면, TEST부분에서 tf.train.import_meta_graph를 사용할 때 오류가 발생한다. 
             -> 단순히 그래프를 가져오고 가중치를 복원하는 것만으로는 안된다. 세션을 실행할때 인수로 사용할 변수에 대한 
@@ -430,12 +765,26 @@ def model(DB_name="facades",
                 print('<<< Generator_Graph.meta 파일만 저장하고 종료합니다. >>>')
                 exit(0)
 
-            if image_pool and batch_size == 1:
+            # fused_step=True 이면 discriminator 에 과거의 이미지를 넣어줄 수 없다.(generator 와 같은 G 를 사용하므로)
+            if image_pool and fused_step:
+                print("<<< fused_step=True 에서는 image_pool 을 사용하지 않습니다. >>>")
+                image_pool = False
+            if image_pool:
                 imagepool = ImagePool(image_pool_size=image_pool_size)
 
             config = tf.ConfigProto(log_device_placement=False, allow_soft_placement=True)
+            config = xla_config(config, xla)
+            config = apply_thread_config(config, "pix2pix", threads)
             config.gpu_options.allow_growth = True
             # config.gpu_options.per_process_gpu_memory_fraction = 0.1
+            graph_build_time = time.time() - graph_build_start
+            # 매 step 에 걸린 시간 - 첫 step 은 그래프 최적화, 메모리 할당이 포함되므로 따로 본다.
+            step_times = []
+            # profile_steps 에 있는 step 만 연산별 시간, 메모리를 기록한다.
+            profiler = StepProfiler(profile_steps=profile_steps, save_path=os.path.join("profile", model_name),
+                                    scopes=["encoder", "decoder", "Discriminator", "DiscriminatorLoss",
+                                            "Generator_Loss", "Fused_trainer", "Discriminator_trainer",
+                                            "Generator_trainer"])
 
             with tf.Session(graph=JG_Graph, config=config) as sess:
                 print("<<< initializing!!! >>>")
@@ -447,104 +796,214 @@ def model(DB_name="facades",
                     print("<<< Restore {} checkpoint!!! >>>".format(os.path.basename(ckpt_all.model_checkpoint_path)))
                     saver_all.restore(sess, ckpt_all.model_checkpoint_path)
 
+                # checkpoint 와 같이 저장된 학습 위치(progress.json)가 있으면 그 위치부터 이어서 학습한다.
+                start_epoch, start_batch = 1, 0
+                save_all_model_path = os.path.join(model_name, 'All')
+                save_generator_model_path = os.path.join(model_name, 'Generator')
+                progress = load_progress(save_all_model_path)
+                if ckpt_all and progress and ckpt_all.model_checkpoint_path.endswith("-{}".format(progress["step"])):
+                    start_epoch, start_batch = progress["epoch"], progress["batch"]
+                    print("<<< Resume from {} epoch : {} batch >>>".format(start_epoch, start_batch))
+
+                # checkpoint_steps step 마다 혹은 checkpoint_secs 초마다 백그라운드 스레드에서 저장한다.
+                if checkpoint_steps or checkpoint_secs:
+                    checkpoint_manager = CheckpointManager(sess, [var_all, var_G],
+                                                           [save_all_model_path, save_generator_model_path],
+                                                           save_steps=checkpoint_steps, save_secs=checkpoint_secs,
+                                                           keep_checkpoint_every_n_hours=keep_checkpoint_every_n_hours)
+                else:
+                    checkpoint_manager = None
+
+                # metric 변수들은 local variable 이다.
+                sess.run(tf.local_variables_initializer())
                 summary_writer = tf.summary.FileWriter(os.path.join("tensorboard", model_name), sess.graph)
                 sess.run(iterator.initializer)
-                for epoch in tqdm(range(1, training_epochs + 1)):
 
-                    Loss_D = 0
-                    Loss_G = 0
-                    if distance_loss == "L1" or distance_loss == "L2":
-                        Loss_Distance = 0
-                    # 아래의 두 변수가 각각 0.5 씩의 값을 갖는게 가장 이상적이다.
-                    sigmoid_D = 0
-                    sigmoid_G = 0
-
-                    total_batch = int(data_length / batch_size)
-                    for i in range(total_batch):
-                        # 입력 이미지가 Inputsize_limit[0] x Inputsize_limit[1] 이하이면, exit()
-                        temp = sess.run(x)
-                        if temp.shape[1] < Inputsize_limit[0] or temp.shape[2] < Inputsize_limit[1]:
-                            print("<<< 입력된 이미지 크기는 {} x {} 입니다. >>>".format(temp.shape[1], temp.shape[2]))
-                            print("<<< 입력되는 이미지 크기는 {} x {} 보다 크거나 같아야 합니다. >>>".format(Inputsize_limit[0],
-                                                                                        Inputsize_limit[1]))
-                            print("<<< 강제 종료 합니다. >>>")
-                            exit(0)
-                        if norm_selection == "BN":
-                            if distance_loss == "L1" or distance_loss == "L2":
-                                _, Generator_Loss, Distance_Loss, D_gene_simgoid = sess.run(
-                                    [G_train_op, G_Loss, dis_loss, sigmoid_D_gene], feed_dict={BN_FLAG: True})
-                            else:
-                                _, Generator_Loss, D_gene_simgoid = sess.run(
-                                    [G_train_op, G_Loss, sigmoid_D_gene], feed_dict={BN_FLAG: True})
-                        else:
-                            if distance_loss == "L1" or distance_loss == "L2":
-                                _, Generator_Loss, Distance_Loss, D_gene_simgoid = sess.run(
-                                    [G_train_op, G_Loss, dis_loss, sigmoid_D_gene])
+                # 입력 이미지가 Inputsize_limit[0] x Inputsize_limit[1] 이하이면, exit()
+                # -> 학습 연산과 같이 가져온 입력의 크기로 확인한다.(크기를 확인하려고 batch 를 따로 꺼내지 않는다.)
+                def check_input_size(shape):
+                    if shape[1] < Inputsize_limit[0] or shape[2] < Inputsize_limit[1]:
+                        print("<<< 입력된 이미지 크기는 {} x {} 입니다. >>>".format(shape[1], shape[2]))
+                        print("<<< 입력되는 이미지 크기는 {} x {} 보다 크거나 같아야 합니다. >>>".format(Inputsize_limit[0],
+                                                                                    Inputsize_limit[1]))
+                        print("<<< 강제 종료 합니다. >>>")
+                        exit(0)
+
+                if norm_selection == "BN":
+                    feed_dict = {BN_FLAG: True}
+                else:
+                    feed_dict = None
+
+                # 줄어든 메모리는 첫 학습 step 에서 학습 연산과 같이 구한다.
+                # -> 따로 sess.run 하면 batch 를 하나 더 읽어서 저장되는 학습 위치(progress)와 입력 위치가 어긋난다.
+                recompute_saved_mb = 0.0
+                recompute_probe = [recompute_bytes] if recompute_segments else []
+
+                def report_recompute(saved_bytes):
+                    print("<<< recompute_segments : {} -> 역전파를 위해 저장하지 않는 generator 활성화 값 {:.1f}MB / step >>>"
+                          .format(recompute_segments, saved_bytes / (1024 * 1024)))
+                    return saved_bytes / (1024 * 1024)
+
+                # accumulation_steps 개의 micro-batch 마다 한번 update 한다.
+                if accumulation_steps > 1:
+                    print("<<< accumulation_steps : {} -> {} batch({} 장) 마다 한번 update, 유효 batch 크기 {} >>>"
+                          .format(accumulation_steps, accumulation_steps, batch_size, batch_size * accumulation_steps))
+                # 누적된 micro-batch 수, update 횟수
+                # -> 누적 변수는 checkpoint 에 없으므로, 이어서 학습할 때도 비어있는 누적 변수로 새 주기를 시작한다.
+                # (checkpoint 가 주기 중간에 저장되었어도 일부만 더한 gradient 로 update 하지 않는다.)
+                sess.run(accumulator_reset)
+                accumulated, updates = 0, 0
+
+                total_batch = int(data_length / batch_size)
+                for epoch in tqdm(range(start_epoch, training_epochs + 1)):
+
+                    # 누적된 평균을 0 으로 되돌린다.
+                    sess.run(metrics_reset)
+
+                    # 학습 시간 - 한 step 에 걸리는 시간을 확인하기 위함
+                    step_time = 0
+                    # 입력 파이프라인을 기다린 시간 - 입력 때문에 학습이 얼마나 멈추는지 확인하기 위함
+                    input_wait_time = 0
+                    summary_str = None
+                    epoch_updates = updates
+
+                    for i in range(start_batch if epoch == start_epoch else 0, total_batch):
+                        step = (epoch - 1) * total_batch + i + 1
+                        step_start = time.time()
+                        accumulated += 1
+                        # accumulation_steps 번째 micro-batch 에서만 update 한다.
+                        apply_step = accumulated % accumulation_steps == 0
+                        if apply_step:
+                            updates += 1
+                        if fused_step:
+                            # 하나의 batch 로 generator 와 discriminator 를 한번에 update 한다.
+                            # 입력 대기 시간과 입력 이미지 크기도 같이 가져온다.
+                            # 첫 step 에서는 recompute 로 줄어든 메모리도 같이 가져온다.(맨 앞)
+                            fetches = recompute_probe + [apply_op if apply_step else train_op, D_metrics_update,
+                                                         G_metrics_update, input_wait, input_shape]
+                            # summary 도 마지막 batch 에서 같이 구한다. -> summary 만을 위해 batch 를 하나 더 읽지 않는다.
+                            if epoch % display_step == 0 and i == total_batch - 1:
+                                results = profiler.run(sess, fetches + [summary_operation], feed_dict=feed_dict,
+                                                       step=step, name="fused")
+                                wait, shape, summary_str = results[-3:]
                             else:
-                                _, Generator_Loss, D_gene_simgoid = sess.run(
-                                    [G_train_op, G_Loss, sigmoid_D_gene])
-
-                        # image_pool 변수 사용할 때(단 batch_size=1 일 경우만), Discriminator Update
-                        if image_pool and batch_size == 1:
-                            fake_G = imagepool(image=sess.run(G))
-                            # G 에 과거에 생성된 fake_G를 넣어주자!!!
-                            _, Discriminator_Loss, D_real_simgoid = sess.run([D_train_op, D_Loss, sigmoid_D_real],
-                                                                             feed_dict={G: fake_G})
-                        # image_pool 변수를 사용하지 않을 때, Discriminator Update
+                                results = profiler.run(sess, fetches, feed_dict=feed_dict, step=step, name="fused")
+                                wait, shape = results[-2:]
+                            if recompute_probe:
+                                recompute_saved_mb = report_recompute(results[0])
+                                recompute_probe = []
+                            check_input_size(shape)
+                            input_wait_time += wait
                         else:
-                            if norm_selection == "BN":
-                                _, Discriminator_Loss, D_real_simgoid = sess.run([D_train_op, D_Loss, sigmoid_D_real],
-                                                                                 feed_dict={BN_FLAG: True})
+                            G_op = G_apply_op if apply_step else G_train_op
+                            D_op = D_apply_op if apply_step else D_train_op
+
+                            # Generator Update - 첫 step 에서는 recompute 로 줄어든 메모리도 같이 가져온다.(맨 앞)
+                            results = profiler.run(sess, recompute_probe + [G_op, G_metrics_update, input_wait,
+                                                                            input_shape],
+                                                   feed_dict=feed_dict, step=step, name="generator")
+                            wait, shape = results[-2:]
+                            if recompute_probe:
+                                recompute_saved_mb = report_recompute(results[0])
+                                recompute_probe = []
+                            check_input_size(shape)
+                            input_wait_time += wait
+
+                            # image_pool 변수 사용할 때, Discriminator Update
+                            if image_pool:
+                                # BN 을 쓰면(batch_size > 1) BN_FLAG 도 같이 넣어줘야 한다.
+                                fake_G = imagepool(image=sess.run(G, feed_dict=feed_dict))
+                                # G 에 과거에 생성된 fake_G를 넣어주자!!!
+                                input_wait_time += profiler.run(sess, [D_op, D_metrics_update, input_wait],
+                                                                feed_dict={**(feed_dict or {}), G: fake_G}, step=step,
+                                                                name="discriminator")[-1]
+                            # image_pool 변수를 사용하지 않을 때, Discriminator Update
                             else:
-                                _, Discriminator_Loss, D_real_simgoid = sess.run([D_train_op, D_Loss, sigmoid_D_real])
-
-                        Loss_D += (Discriminator_Loss / total_batch)
-                        Loss_G += (Generator_Loss / total_batch)
-                        if distance_loss == "L1" or distance_loss == "L2":
-                            Loss_Distance += (Distance_Loss / total_batch)
-                        sigmoid_D += np.mean(D_real_simgoid, axis=(1, 2, 3)) / total_batch
-                        sigmoid_G += np.mean(D_gene_simgoid, axis=(1, 2, 3)) / total_batch
+                                input_wait_time += profiler.run(sess, [D_op, D_metrics_update, input_wait],
+                                                                feed_dict=feed_dict, step=step,
+                                                                name="discriminator")[-1]
+
+                        step_times.append(time.time() - step_start)
+                        step_time += step_times[-1]
                         print("<<< {} epoch : {} batch running of {} total batch... >>>".format(epoch, i, total_batch))
 
+                        # 다음에 학습할 위치(epoch, batch)를 같이 저장한다.
+                        progress = {"epoch": epoch + (i + 1) // total_batch, "batch": (i + 1) % total_batch}
+                        # 누적 중인 gradient 는 저장되지 않으므로 update 한 step 에서만 저장한다.
+                        # -> 저장된 위치에서 이어서 학습하면 버려지는 micro-batch 가 없다.
+                        if checkpoint_manager and apply_step:
+                            checkpoint_manager.maybe_save(step, progress)
+                        if metrics_step and (i + 1) % metrics_step == 0:
+                            print("<<< {} epoch : {} batch running mean : {} >>>".format(epoch, i, sess.run(metrics)))
+
+                    print("<<< {:.1f} ms / step >>>".format(1000 * step_time / max(total_batch, 1)))
+                    print("<<< input wait : {:.1f}% of step time ({:.1f} ms / step) >>>".format(
+                        100 * input_wait_time / max(step_time, 1e-8), 1000 * input_wait_time / max(total_batch, 1)))
+                    if accumulation_steps > 1:
+                        print("<<< {} epoch : {} update / {} batch (accumulation_steps : {}) >>>".format(
+                            epoch, updates - epoch_updates, total_batch, accumulation_steps))
+
+                    # 아래의 두 값이 각각 0.5 씩의 값을 갖는게 가장 이상적이다.
+                    epoch_metrics = sess.run(metrics)
                     print(
-                        "<<< Discriminator mean output : {} / Generator mean output : {} >>>".format(np.mean(sigmoid_D),
-                                                                                                     np.mean(
-                                                                                                         sigmoid_G)))
+                        "<<< Discriminator mean output : {} / Generator mean output : {} >>>".format(
+                            epoch_metrics["sigmoid_D"], epoch_metrics["sigmoid_G"]))
 
                     if distance_loss == "L1" or distance_loss == "L2":
                         print(
-                            "<<< Discriminator Loss : {} / Generator Loss  : {} / {} loss : {} >>>".format(Loss_D,
-                                                                                                           Loss_G,
-                                                                                                           distance_loss,
-                                                                                                           Loss_Distance))
+                            "<<< Discriminator Loss : {} / Generator Loss  : {} / {} loss : {} >>>".format(
+                                epoch_metrics["D_Loss"], epoch_metrics["G_Loss"], distance_loss,
+                                epoch_metrics["dis_loss"]))
                     else:
                         print(
-                            "<<< Discriminator Loss : {} / Generator Loss  : {} >>>".format(Loss_D, Loss_G))
+                            "<<< Discriminator Loss : {} / Generator Loss  : {} >>>".format(epoch_metrics["D_Loss"],
+                                                                                            epoch_metrics["G_Loss"]))
 
+                    # epoch 끝에서는 누적 중이어도 저장한다. -> 이어서 학습하면 누적 중이던 micro-batch 들은 update 되지 않고 버려진다.
                     if epoch % display_step == 0:
-                        if norm_selection == "BN":
-                            summary_str = sess.run(summary_operation, feed_dict={BN_FLAG: True})
-                        else:
-                            summary_str = sess.run(summary_operation)
+                        if summary_str is None:
+                            summary_str = sess.run(summary_operation, feed_dict=feed_dict)
 
                         summary_writer.add_summary(summary_str, global_step=epoch)
 
-                        save_all_model_path = os.path.join(model_name, 'All')
-                        save_generator_model_path = os.path.join(model_name, 'Generator')
-
-                        if not os.path.exists(save_all_model_path):
-                            os.makedirs(save_all_model_path)
-                        if not os.path.exists(save_generator_model_path):
-                            os.makedirs(save_generator_model_path)
-
-                        saver_all.save(sess, save_all_model_path + "/", global_step=epoch,
-                                       write_meta_graph=False)
-                        saver_generator.save(sess, save_generator_model_path + "/", global_step=epoch,
-                                             write_meta_graph=False)
-
+                        if checkpoint_manager:
+                            checkpoint_manager.save(epoch * total_batch,
+                                                    {"epoch": epoch + 1, "batch": 0}, block=True)
+                        else:
+                            if not os.path.exists(save_all_model_path):
+                                os.makedirs(save_all_model_path)
+                            if not os.path.exists(save_generator_model_path):
+                                os.makedirs(save_generator_model_path)
+
+                            saver_all.save(sess, save_all_model_path + "/", global_step=epoch,
+                                           write_meta_graph=False)
+                            saver_generator.save(sess, save_generator_model_path + "/", global_step=epoch,
+                                                 write_meta_graph=False)
+
+                # 남은 checkpoint 저장이 끝날 때까지 기다린다.
+                if checkpoint_manager:
+                    checkpoint_manager.close()
                 print("<<< Optimization Finished! >>>")
 
+            # 학습 속도 - benchmarks 에서 사용한다.
+            steady_time = sum(step_times[1:])
+            steps_per_sec = (len(step_times) - 1) / steady_time if steady_time > 0 else 0.0
+            return {"graph_build_sec": graph_build_time,
+                    "first_step_ms": step_times[0] * 1000 if step_times else 0.0,
+                    "steps": len(step_times),
+                    "steps_per_sec": steps_per_sec,
+                    "images_per_sec": steps_per_sec * batch_size,
+                    "data_format": data_format,
+                    "recompute_saved_mb": recompute_saved_mb,
+                    "accumulation_steps": accumulation_steps,
+                    "updates": updates}
+
     else:
+        # U-Net 은 크기를 8번 반으로 줄이므로, tile 의 크기는 256의 배수여야 한다.
+        if tile_size and (tile_size[0] % 256 != 0 or tile_size[1] % 256 != 0):
+            print("<<< tile_size 는 256의 배수여야 합니다. >>>")
+            exit(0)
+
         tf.reset_default_graph()
         meta_path = glob.glob(os.path.join(model_name, 'Generator', '*.meta'))
         if len(meta_path) == 0:
@@ -557,7 +1016,9 @@ def model(DB_name="facades",
         JG = tf.Graph()  # 내 그래프로 설정한다.- 혹시라도 나중에 여러 그래프를 사용할 경우를 대비
         with JG.as_default():  # as_default()는 JG를 기본그래프로 설정한다.
 
+            start = time.time()
             saver = tf.train.import_meta_graph(meta_path[0], clear_devices=True)  # meta graph 읽어오기
+            meta_load_time = time.time() - start
             if saver == None:
                 print("<<< meta 파일을 읽을 수 없습니다. >>>")
                 exit(0)
@@ -574,10 +1035,14 @@ def model(DB_name="facades",
 
             # Test Dataset 가져오기
             dataset = Dataset(DB_name=DB_name, AtoB=AtoB, use_TrainDataset=not TEST,
-                              inference_size=inference_size, TFRecord=TFRecord)
+                              inference_size=inference_size, TFRecord=TFRecord, TFRecord_encoding=TFRecord_encoding,
+                              num_parallel_calls=num_parallel_calls, prefetch_size=prefetch_size, cache=cache,
+                              Memmap=Memmap, Stream=Stream, mirror=mirror)
             iterator, next_batch, data_length = dataset.iterator()
 
-            with tf.Session(graph=JG) as sess:
+            start = time.time()
+            # serve=True 이면 CPU 만 사용한다.
+            with tf.Session(graph=JG, config=tf.ConfigProto(device_count={"GPU": 0}) if serve else None) as sess:
                 sess.run(iterator.initializer)
                 ckpt = tf.train.get_checkpoint_state(os.path.join(model_name, 'Generator'))
 
@@ -590,9 +1055,21 @@ def model(DB_name="facades",
                     print("<<< generator variable retored except for optimizer parameter >>>")
                     print("<<< Restore {} checkpoint!!! >>>".format(os.path.basename(ckpt.model_checkpoint_path)))
                     saver.restore(sess, ckpt.model_checkpoint_path)
+                # 그래프 읽기 + 세션 생성 + checkpoint 복원 시간(Dataset 생성 시간 제외)
+                meta_load_time += time.time() - start
+
+                def generate(images):
+                    if norm_selection == "BN":
+                        return sess.run(G, feed_dict={x: images, BN_FLAG: not using_moving_variable})
+                    else:
+                        return sess.run(G, feed_dict={x: images})
 
                 # Generator에서 생성된 이미지 저장
                 if show_translated_image:
+                    # 이미지 인코딩, 쓰기는 백그라운드에서 한다.
+                    writer = ImageWriter(image_format=image_format, png_compression=png_compression,
+                                         jpeg_quality=jpeg_quality, num_workers=writer_workers,
+                                         queue_size=writer_queue_size, use_process=writer_use_process)
                     for i in range(data_length):
                         x_numpy, target_numpy = sess.run(next_batch)
                         # 입력 이미지가 Inputsize_limit[0] xInputsize_limit[1] 이하이면, exit()
@@ -603,15 +1080,20 @@ def model(DB_name="facades",
                             print("<<< 강제 종료 합니다. >>>")
                             exit(0)
 
-                        if norm_selection == "BN":
-                            translated_image = sess.run(G, feed_dict={x: x_numpy, BN_FLAG: not using_moving_variable})
+                        # tile_size 가 주어지면 tile 로 나눠서 변환한 뒤 합친다. -> 메모리 사용량이 tile_size 에 따라 정해진다.
+                        if tile_size:
+                            translated_image = tiled_inference(generate, x_numpy[0], tile_size=tile_size,
+                                                               overlap=tile_overlap,
+                                                               batch_size=tile_batch_size)[np.newaxis]
                         else:
-                            translated_image = sess.run(G, feed_dict={x: x_numpy})
+                            translated_image = generate(x_numpy)
 
                         # 순서 : 입력, 타깃, 생성
                         visualize(model_name=model_name,
                                   named_images=[i, x_numpy[0], target_numpy[0], translated_image[0]],
-                                  save_path=save_path)
+                                  save_path=save_path, writer=writer)
+                    # 모든 이미지가 쓰일 때까지 기다린다.
+                    writer.close()
 
                 # 가중치 저장 - 약간 생소한 API지만 유용.
                 if weights_to_numpy:
@@ -649,6 +1131,65 @@ def model(DB_name="facades",
                             # weight npy로 저장하기
                             np.save(os.path.join(numpy_weight_save_path, joined), reader.get_tensor(name))
 
+                # generator 를 하나의 .pb 파일로 저장하고, 저장 전(meta graph + checkpoint)과 후의 속도를 비교한다.
+                if export_frozen:
+                    sess.run(iterator.initializer)
+                    images = [sess.run(next_batch)[0] for _ in range(min(data_length, 20))]
+                    if norm_selection == "BN":
+                        meta_feed_dict = {BN_FLAG: not using_moving_variable}
+                    else:
+                        meta_feed_dict = None
+                    meta_latency = measure_latency(sess, x, G, images, feed_dict=meta_feed_dict)
+
+                    # inference 전용 그래프를 새로 만든다.
+                    # -> BN_FLAG placeholder 대신 python bool 을 사용해서 batch_norm 의 분기(switch)를 없앤다.
+                    # -> using_moving_variable=True 일 때만 batch_norm 을 conv 에 합칠 수 있다.
+                    # -> export_dropout=False 이면 keep_prob=1 로 dropout 을 없앤다.
+                    BN_FLAG = not using_moving_variable
+                    frozen_graph = tf.Graph()
+                    with frozen_graph.as_default():
+                        frozen_x = tf.placeholder(tf.float32, shape=(None, None, None, 3), name="input")
+                        with tf.variable_scope("shared_variables"):
+                            with tf.name_scope("Generator"):
+                                frozen_G = generator(images=frozen_x, keep_prob=Dropout_rate if export_dropout else 1.0)
+                        tf.identity(frozen_G, name="output")
+                        frozen_saver = tf.train.Saver(var_list=tf.global_variables())
+                    with tf.Session(graph=frozen_graph) as frozen_sess:
+                        frozen_saver.restore(frozen_sess, ckpt.model_checkpoint_path)
+                        frozen_path = write_frozen_graph(frozen_sess, ["output"],
+                                                         os.path.join(model_name, "Generator", "Generator_frozen.pb"))
+
+                    start = time.time()
+                    frozen_graph, frozen_x, frozen_G = load_frozen_graph(frozen_path)
+                    with tf.Session(graph=frozen_graph) as frozen_sess:
+                        frozen_load_time = time.time() - start
+                        frozen_latency = measure_latency(frozen_sess, frozen_x, frozen_G, images)
+
+                    print("<<< meta graph + checkpoint : load {:.3f}s, first image {:.2f}ms, per image {:.2f}ms >>>"
+                          .format(meta_load_time, *meta_latency))
+                    print("<<< frozen graph            : load {:.3f}s, first image {:.2f}ms, per image {:.2f}ms >>>"
+                          .format(frozen_load_time, *frozen_latency))
+
+                # generator 를 한번만 불러놓고, 동시에 들어온 요청들을 batch 로 묶어서 변환해 돌려준다.(Ctrl+C 로 종료)
+                if serve:
+                    frozen_path = os.path.join(model_name, "Generator", "Generator_frozen.pb")
+                    if os.path.exists(frozen_path):
+                        print("<<< {} 를 사용합니다. >>>".format(frozen_path))
+                        serve_graph, serve_x, serve_G = load_frozen_graph(frozen_path)
+                        serve_sess = tf.Session(graph=serve_graph, config=tf.ConfigProto(device_count={"GPU": 0}))
+                        serve_feed_dict = {}
+                    else:
+                        serve_sess, serve_x, serve_G = sess, x, G
+                        serve_feed_dict = {BN_FLAG: not using_moving_variable} if norm_selection == "BN" else {}
+
+                    def translate(batch):
+                        feed_dict = dict(serve_feed_dict)
+                        feed_dict[serve_x] = batch
+                        return serve_sess.run(serve_G, feed_dict=feed_dict)
+
+                    start_server(routes={"translate": translate}, address=serve_address, inference_size=inference_size,
+                                 max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+
 
 if __name__ == "__main__":
     '''
@@ -670,10 +1211,21 @@ if __name__ == "__main__":
           TEST=False,  # TEST=False -> Training or TEST=True -> TEST
           # 대량의 데이터일 경우 TFRecord=True가 더 빠르다.
           TFRecord=True,  # TFRecord=True -> TFRecord파일로 저장한후 사용하는 방식 사용 or TFRecord=False -> 파일에서 읽어오는 방식 사용
+          TFRecord_encoding="png",  # TFRecord 에 이미지를 저장하는 형식 -> "raw"(uint8) or "png" or "jpeg"
+          num_parallel_calls=None,  # 입력 전처리를 동시에 몇개씩 할지 -> None 이면 자동
+          prefetch_size=None,  # 미리 준비해 둘 batch 개수 -> None 이면 자동
+          cache=None,  # 복원된 이미지를 저장해둘지 -> None or "memory" or "파일 경로"
+          Memmap=False,  # Memmap=True -> 모든 이미지를 하나의 numpy memmap 파일로 저장한 후 사용(TFRecord 보다 우선), 매 epoch 전체를 섞는다.
+          Stream=False,  # Stream=True -> 압축을 풀지 않고 "{DB_name}.tar.gz" 를 순서대로 읽으면서 학습(TFRecord 보다 우선)
+          batch_jitter=False,  # batch_jitter=True -> random jitter 를 batch 로 묶은 뒤 한번에 적용(batch_size > 1 일 때 빠르다)
+          jitter_seed=None,  # random jitter 와 shuffle 의 seed -> 같은 값을 주면 같은 순서로 같은 jitter 가 적용된다.
+          mirror=None,  # 데이터셋을 받을 곳 -> None 이면 원래 주소, 예) "http://내부서버/datasets" or "file:///mnt/datasets"
           AtoB=False,  # 데이터 순서 변경(ex) AtoB=True : image -> segmentation / AtoB=False : segmetation -> image)
           Inputsize_limit=(256, 256),  # 입력되어야 하는 최소 사이즈를 내가 지정 - (256,256) 으로 하자
           filter_size=32,  # generator와 discriminator의 처음 layer의 filter 크기
           norm_selection="BN",  # IN - instance normalizaiton , BN -> batch normalization, NOTHING
+          fused_norm=False,  # True -> BN, IN 을 쓰는 층은 bias 를 만들지 않는다.(BN 은 FusedBatchNorm 하나로 정규화)
+          data_format="NHWC",  # NCHW -> generator, discriminator 를 (N, C, H, W) 로 계산한다.(GPU 또는 MKL 빌드 CPU)
           regularizer=" ",  # L1 or L2 정규화 -> 오버피팅 막기 위함
           scale=0.0001,  # L1 or L2 정규화 weight
           Dropout_rate=0.5,  # generator의 Dropout 비율
@@ -684,12 +1236,39 @@ if __name__ == "__main__":
           decay=0.999, momentum=0.9,  # for RMSProp optimizer
           image_pool=False,  # discriminator 업데이트시 이전에 generator로 부터 생성된 이미지의 사용 여부
           image_pool_size=50,  # image_pool=True 라면 몇개를 사용 할지?
+          fused_step=False,  # fused_step=True -> 하나의 batch 로 generator 와 discriminator 를 한번의 sess.run 으로 update(image_pool 사용 불가)
+          accumulation_steps=1,  # 몇 batch 의 gradient 를 더한 뒤 update 할지 -> 유효 batch 크기 = batch_size x accumulation_steps
+          metrics_step=None,  # 몇 step 마다 학습 중의 평균 loss 를 출력할지 -> None 이면 epoch 이 끝날 때만 출력
+          checkpoint_steps=None,  # 몇 step 마다 백그라운드에서 checkpoint 를 저장할지 -> None 이면 display_step epoch 마다 저장
+          checkpoint_secs=None,  # 몇 초마다 백그라운드에서 checkpoint 를 저장할지
+          keep_checkpoint_every_n_hours=10000.0,  # 최근 3개 외에 몇 시간마다의 checkpoint 를 지우지 않고 남길지
           learning_rate=0.0002, training_epochs=1, batch_size=1, display_step=1,
           inference_size=(256, 256),  # TEST=True 일때, inference 할 수 있는 최소의 크기를 256 x 256으로 크기 제한을 뒀다.
           using_moving_variable=False,  # TEST=True 일때, Moving Average를 Inference에 사용할지 말지 결정하는 변수
           only_draw_graph=False,  # TEST=False 일 때 only_draw_graph=True이면 그래프만 그리고 종료한다.
           show_translated_image=True,  # TEST=True 일 때 변환된 이미지를 보여줄지 말지
           weights_to_numpy=False,  # TEST=True 일 때 가중치를 npy 파일로 저장할지 말지
+          image_format="png",  # TEST=True 일 때 변환된 이미지를 저장할 형식 -> "png" or "jpeg"
+          png_compression=3,  # png 압축 정도(0 ~ 9) -> 작을수록 빠르고 파일이 크다.
+          jpeg_quality=95,  # jpeg 품질(0 ~ 100)
+          writer_workers=None,  # 이미지를 인코딩하고 쓰는 worker 개수 -> None 이면 cpu 개수
+          writer_queue_size=16,  # 아직 쓰지 않은 이미지를 최대 몇개까지 쌓아둘지
+          writer_use_process=False,  # writer_use_process=True -> process pool 사용 or False -> thread pool 사용
+          tile_size=None,  # TEST=True 일 때 이미지를 tile_size 크기로 나눠서 변환한 뒤 합친다.(256의 배수) -> None 이면 한번에 변환, 예) (256, 256)
+          tile_overlap=32,  # tile 들이 겹치는 크기 -> 겹치는 부분은 가장자리로 갈수록 작아지는 가중치로 섞는다.
+          tile_batch_size=4,  # 한번에 몇개의 tile 을 변환할지
+          export_frozen=False,  # TEST=True 일 때 generator 를 하나의 .pb 파일로 저장하고 저장 전, 후의 속도를 비교할지 말지
+          export_dropout=True,  # export_frozen=True 일 때 저장되는 generator 에 dropout 을 남길지 말지
+          serve=False,  # TEST=True 일 때 generator 를 한번만 불러놓고 요청을 받아서 변환해주는 서버를 실행할지 말지(CPU 전용)
+          serve_address=("127.0.0.1", 8000),  # 서버 주소 -> (host, port) 이면 HTTP, "/tmp/pix2pix.sock" 처럼 경로이면 Unix socket
+          max_batch_size=8,  # 서버가 동시에 들어온 요청을 최대 몇개까지 하나의 batch 로 묶을지
+          max_wait_ms=10,  # batch 를 채우기 위해 첫 요청이 들어온 뒤 최대 몇 ms 를 기다릴지
+          synthetic_size=None,  # TEST=False 일 때 데이터셋 대신 이 크기의 랜덤 이미지로 학습한다.(benchmark 용) 예) (256, 256)
+          synthetic_length=100,  # synthetic_size 가 주어졌을 때 1 epoch 의 이미지 개수
+          profile_steps=None,  # 예) [10, 11] -> 10, 11 번째 step 의 Chrome trace 와 scope 별 top-N 연산을 profile/{model_name} 에 저장
+          recompute_segments=None,  # 예) 4 -> generator 의 16개 층을 4 구간으로 나눠서 구간 안의 활성화 값은 역전파 때 다시 계산한다.(메모리 절약)
+          xla=None,  # None, global -> 그래프 전체를 XLA 로 JIT 컴파일, scope -> generator, discriminator 만 XLA 로 컴파일
+          threads=None,  # None -> benchmarks/autotune.py 가 저장한 이 host 의 설정(없으면 host 기본 설정), False -> tensorflow 기본값, dict -> 직접 지정, "0" -> autotune 이 slot "0" 으로 저장한 설정
           save_path="translated_image")  # TEST=True 일 때 변환된 이미지가 저장될 폴더
 
 else:
@@ -0,0 +1,237 @@
+import collections
+import http.client
+import http.server
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+
+import cv2
+import numpy as np
+
+'''
+학습된 generator 를 한번만 불러놓고 계속 사용하는 inference 서버(CPU 전용)
+
+1. 요청(POST /{route}) 의 body 는 png 또는 jpeg 로 인코딩된 이미지이고, 응답은 변환된 png 이미지이다.
+2. 입력 이미지는 inference_size 로 크기를 바꿔서 generator 에 넣고, 결과는 원래 크기로 되돌려서 보낸다.
+   -> 모든 요청의 크기가 같아지므로 여러 요청을 하나의 batch 로 묶을 수 있다.
+3. Batcher -> 동시에 들어온 요청들을 max_batch_size 개가 모이거나, 첫 요청이 들어온 뒤 max_wait_ms 가 지나면
+   하나의 batch 로 묶어서 sess.run 한번으로 처리한다.
+4. GET /metrics -> 처리량(images/s), queue 에 쌓여있는 요청 수, 최근 요청들의 p50 / p99 latency(ms) 를 json 으로 보낸다.
+5. address 가 (host, port) 이면 HTTP, 문자열이면 그 경로의 Unix socket 을 사용한다.
+6. client -> request_translation(("127.0.0.1", 8000), open("input.png", "rb").read()) , request_metrics(("127.0.0.1", 8000))
+'''
+
+
+class Batcher(object):
+
+    def __init__(self, run, max_batch_size=8, max_wait_ms=10, latency_window=1000):
+
+        # run : (batch_size, height, width, 3) numpy 배열을 받아서 같은 모양의 결과를 돌려주는 함수
+        self.run = run
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.requests = collections.deque()
+        self.condition = threading.Condition()
+
+        self.start_time = time.time()
+        self.images = 0
+        self.batches = 0
+        self.latency = collections.deque(maxlen=latency_window)
+
+        self.thread = threading.Thread(target=self._worker, daemon=True)
+        self.thread.start()
+
+    def __repr__(self):
+        return "Dynamic Batcher"
+
+    # 요청한 스레드는 결과가 나올 때까지 기다린다.
+    def __call__(self, image):
+
+        request = dict(image=image, time=time.time(), event=threading.Event())
+        with self.condition:
+            self.requests.append(request)
+            self.condition.notify()
+        request["event"].wait()
+        if "error" in request:
+            raise request["error"]
+        return request["output"]
+
+    def _worker(self):
+
+        while True:
+            with self.condition:
+                while not self.requests:
+                    self.condition.wait()
+                deadline = self.requests[0]["time"] + self.max_wait
+                while len(self.requests) < self.max_batch_size:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+                batch = [self.requests.popleft() for _ in range(min(len(self.requests), self.max_batch_size))]
+
+            try:
+                outputs = self.run(np.stack([request["image"] for request in batch]))
+                for request, output in zip(batch, outputs):
+                    request["output"] = output
+            except Exception as e:
+                for request in batch:
+                    request["error"] = e
+
+            end_time = time.time()
+            with self.condition:
+                self.images += len(batch)
+                self.batches += 1
+                self.latency.extend((end_time - request["time"]) * 1000 for request in batch)
+            for request in batch:
+                request["event"].set()
+
+    def metrics(self):
+
+        with self.condition:
+            latency = np.array(self.latency)
+            elapsed_time = time.time() - self.start_time
+            return {"images": self.images,
+                    "batches": self.batches,
+                    "mean_batch_size": self.images / self.batches if self.batches else 0.0,
+                    "queue_depth": len(self.requests),
+                    "throughput": self.images / elapsed_time if elapsed_time > 0 else 0.0,
+                    "p50_ms": float(np.percentile(latency, 50)) if len(latency) else 0.0,
+                    "p99_ms": float(np.percentile(latency, 99)) if len(latency) else 0.0}
+
+
+def encode_png(image):
+    # -1 ~ 1 -> 0 ~ 255, RGB -> BGR
+    image = cv2.cvtColor(((image + 1) * 127.5).clip(0, 255).astype(np.uint8), cv2.COLOR_RGB2BGR)
+    return cv2.imencode(".png", image)[1].tobytes()
+
+
+def decode_image(data):
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError("<<< png 또는 jpeg 이미지가 아닙니다. >>>")
+    # BGR -> RGB, 0 ~ 255 -> -1 ~ 1
+    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB).astype(np.float32) / 127.5 - 1
+
+
+def make_handler(batchers, inference_size):
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+
+        def _send(self, code, body, content_type):
+            self.send_response(code)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.rstrip("/") == "/metrics":
+                metrics = {route: batcher.metrics() for route, batcher in batchers.items()}
+                self._send(200, json.dumps(metrics).encode(), "application/json")
+            else:
+                self._send(404, b"not found", "text/plain")
+
+        def do_POST(self):
+            batcher = batchers.get(self.path.strip("/"))
+            if batcher is None:
+                self._send(404, b"not found", "text/plain")
+                return
+            try:
+                image = decode_image(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            except ValueError as e:
+                self._send(400, str(e).encode(), "text/plain")
+                return
+            height, width = image.shape[:2]
+            # cv2.resize 는 (width, height) 순서
+            try:
+                output = batcher(cv2.resize(image, (inference_size[1], inference_size[0])))
+            except Exception as e:
+                self._send(500, str(e).encode(), "text/plain")
+                return
+            self._send(200, encode_png(cv2.resize(output, (width, height))), "image/png")
+
+        # 요청마다 출력하지 않는다.
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+class ThreadingHTTPServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def start_server(routes, address=("127.0.0.1", 8000), inference_size=(256, 256), max_batch_size=8, max_wait_ms=10):
+
+    # routes : {"경로 이름" : batch 를 받아서 변환된 batch 를 돌려주는 함수}
+    batchers = {route: Batcher(run, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+                for route, run in routes.items()}
+    handler = make_handler(batchers, inference_size)
+
+    if isinstance(address, str):
+        if os.path.exists(address):
+            os.remove(address)
+        server = ThreadingUnixHTTPServer(address, handler)
+        url = "unix://" + address
+    else:
+        server = ThreadingHTTPServer(tuple(address), handler)
+        url = "http://{}:{}".format(*address)
+
+    print("<<< inference server : {} >>>".format(url))
+    for route in routes:
+        print("<<< POST {}/{} -> png >>>".format(url, route))
+    print("<<< GET {}/metrics >>>".format(url))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("<<< inference server stopped >>>")
+    finally:
+        server.server_close()
+        if isinstance(address, str) and os.path.exists(address):
+            os.remove(address)
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+
+    def __init__(self, path, timeout=60):
+        super(UnixHTTPConnection, self).__init__("localhost", timeout=timeout)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+
+def _request(address, method, route, body=None):
+
+    if isinstance(address, str):
+        connection = UnixHTTPConnection(address)
+    else:
+        connection = http.client.HTTPConnection(*address, timeout=60)
+    try:
+        connection.request(method, "/" + route, body=body)
+        response = connection.getresponse()
+        data = response.read()
+        if response.status != 200:
+            raise IOError("<<< {} /{} failed({}) : {} >>>".format(method, route, response.status, data.decode()))
+        return data
+    finally:
+        connection.close()
+
+
+# client - 인코딩된 이미지(bytes)를 보내고 변환된 png(bytes)를 받는다.
+def request_translation(address, data, route="translate"):
+    return _request(address, "POST", route, body=data)
+
+
+def request_metrics(address):
+    return json.loads(_request(address, "GET", "metrics").decode())
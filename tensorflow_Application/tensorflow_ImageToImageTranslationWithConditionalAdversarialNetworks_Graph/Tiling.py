@@ -0,0 +1,57 @@
+import numpy as np
+
+'''
+큰 이미지를 tile_size 크기의 조각(tile)으로 나눠서 generator 에 넣고, 결과를 다시 하나의 이미지로 합친다.
+
+1. tile 들은 overlap 만큼 겹치게 자른다. -> 오른쪽, 아래쪽 끝에 남는 부분은 마지막 tile 을 이미지 끝에 맞춰서 자른다.
+2. tile 들은 batch_size 개씩 묶어서 한번에 generator 에 넣는다.
+3. 겹치는 부분은 가장자리로 갈수록 작아지는 가중치(feathered window)로 더한 뒤 가중치의 합으로 나눈다. -> tile 경계가 보이지 않는다.
+4. generator 에 들어가는 크기는 항상 tile_size 이므로, 메모리 사용량은 이미지 크기가 아니라 tile_size 와 batch_size 에 따라 정해진다.
+   -> pix2pix 의 U-Net 은 tile_size 가 256 의 배수여야 하고, CycleGAN 의 ResNet 은 4 의 배수여야 한다.
+'''
+
+
+# 가장자리에서 overlap 만큼 0 -> 1 로 선형으로 커지는 1차원 가중치
+def _feather(length, overlap):
+    if overlap <= 0:
+        return np.ones(length, dtype=np.float32)
+    position = np.arange(length, dtype=np.float32) + 0.5
+    return np.minimum(1.0, np.minimum(position, length - position) / overlap).astype(np.float32)
+
+
+# tile 이 시작하는 위치 - 마지막 tile 은 끝에 맞춘다.
+def _tile_positions(length, tile, stride):
+    positions = list(range(0, length - tile + 1, stride))
+    if positions[-1] != length - tile:
+        positions.append(length - tile)
+    return positions
+
+
+def tiled_inference(run, image, tile_size=(256, 256), overlap=32, batch_size=4):
+
+    # run : (batch_size, tile_height, tile_width, 3) 를 받아서 같은 모양의 결과를 돌려주는 함수
+    # image : (height, width, 3)
+    height, width = image.shape[:2]
+    tile_height, tile_width = tile_size
+    if overlap >= min(tile_height, tile_width):
+        raise ValueError("<<< overlap({}) 은 tile_size({}) 보다 작아야 합니다. >>>".format(overlap, tile_size))
+
+    # tile 보다 작은 이미지는 대칭으로 늘린 뒤 자르고, 마지막에 원래 크기만큼만 남긴다.
+    if height < tile_height or width < tile_width:
+        image = np.pad(image, [(0, max(tile_height - height, 0)), (0, max(tile_width - width, 0)), (0, 0)],
+                       mode="symmetric")
+    padded_height, padded_width = image.shape[:2]
+
+    window = np.outer(_feather(tile_height, overlap), _feather(tile_width, overlap))[..., np.newaxis]
+    output = np.zeros(image.shape, dtype=np.float32)
+    weight = np.zeros((padded_height, padded_width, 1), dtype=np.float32)
+
+    positions = [(y, x) for y in _tile_positions(padded_height, tile_height, tile_height - overlap)
+                 for x in _tile_positions(padded_width, tile_width, tile_width - overlap)]
+    for index in range(0, len(positions), batch_size):
+        batch_positions = positions[index:index + batch_size]
+        tiles = np.stack([image[y:y + tile_height, x:x + tile_width] for y, x in batch_positions])
+        for (y, x), translated_tile in zip(batch_positions, run(tiles)):
+            output[y:y + tile_height, x:x + tile_width] += translated_tile * window
+            weight[y:y + tile_height, x:x + tile_width] += window
+    return (output / weight)[:height, :width]
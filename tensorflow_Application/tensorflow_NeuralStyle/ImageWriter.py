@@ -0,0 +1,99 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+import cv2
+
+'''
+이미지 변환(스케일, 색 변환 등), 인코딩(png 압축 등), 파일 쓰기를 백그라운드에서 하는 클래스
+
+1. write -> 이미지와 변환 함수(transform)를 pool 에 넘기고 바로 돌아온다. -> generator 가 png 압축을 기다리지 않는다.
+2. 아직 쓰지 않은 이미지는 queue_size 개로 제한한다. -> 꽉 차면 write 는 자리가 날 때까지 기다린다.(메모리가 계속 늘어나지 않는다.)
+3. image_format="png" -> png_compression(0 ~ 9, 작을수록 빠르고 파일이 크다) / image_format="jpeg" -> jpeg_quality(0 ~ 100)
+4. use_process=False -> ThreadPoolExecutor(cv2 는 인코딩 중에 GIL 을 놓는다.)
+   use_process=True -> ProcessPoolExecutor(transform 은 module 에 정의된 함수여야 한다.)
+5. flush -> 지금까지 넘긴 이미지가 모두 쓰일 때까지 기다린다. / close -> flush 한 뒤 pool 을 닫는다.
+'''
+
+
+def _encode_and_write(path, image, transform, params):
+    if transform:
+        image = transform(image)
+    if not cv2.imwrite(path, image, params):
+        raise IOError("<<< {} 를 쓸 수 없습니다. >>>".format(path))
+    return path
+
+
+class ImageWriter(object):
+
+    def __init__(self, image_format="png", png_compression=3, jpeg_quality=95, num_workers=None, queue_size=16,
+                 use_process=False):
+
+        if image_format == "png":
+            self.extension = ".png"
+            self.params = [cv2.IMWRITE_PNG_COMPRESSION, png_compression]
+        elif image_format == "jpeg" or image_format == "jpg":
+            self.extension = ".jpg"
+            self.params = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality]
+        else:
+            raise ValueError("<<< image_format 은 png 또는 jpeg 이어야 합니다. >>>")
+
+        num_workers = num_workers if num_workers else os.cpu_count()
+        if use_process:
+            self.executor = ProcessPoolExecutor(max_workers=num_workers)
+        else:
+            self.executor = ThreadPoolExecutor(max_workers=num_workers)
+        self.slots = threading.BoundedSemaphore(queue_size)
+        self.lock = threading.Lock()
+        self.futures = set()
+        self.errors = []
+
+    def __repr__(self):
+        return "Image Writer"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    # path 에는 확장자를 붙이지 않는다. -> image_format 에 따라 붙는다.
+    def write(self, path, image, transform=None):
+
+        path = path + self.extension
+        self.slots.acquire()
+        try:
+            future = self.executor.submit(_encode_and_write, path, image, transform, self.params)
+        except Exception:
+            self.slots.release()
+            raise
+        with self.lock:
+            self.futures.add(future)
+        future.add_done_callback(self._done)
+        return path
+
+    def _done(self, future):
+
+        with self.lock:
+            self.futures.discard(future)
+            if future.exception() is not None:
+                self.errors.append(future.exception())
+        self.slots.release()
+
+    def flush(self):
+
+        with self.lock:
+            futures = list(self.futures)
+        wait(futures)
+        # wait 는 callback(_done) 이 끝나기 전에 돌아올 수 있으므로 future 의 예외도 같이 확인한다.
+        with self.lock:
+            errors, self.errors = self.errors, []
+        errors += [future.exception() for future in futures if future.exception() is not None]
+        if errors:
+            raise errors[0]
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self.executor.shutdown(wait=True)
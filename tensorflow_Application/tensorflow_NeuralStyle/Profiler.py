@@ -0,0 +1,97 @@
+import collections
+import json
+import os
+
+import tensorflow as tf
+from tensorflow.python.client import timeline
+
+'''
+학습 step 중 원하는 step 만 연산(op) 단위로 시간과 메모리를 기록하는 클래스
+
+1. profile_steps 에 있는 step 만 RunOptions(trace_level=FULL_TRACE) 로 실행한다. -> 나머지 step 은 sess.run 과 같다.
+2. {save_path}/{name}_step{step}.json -> Chrome trace 파일(chrome://tracing 에서 Load 로 열어본다.)
+3. scope 별로 시간(ms), 메모리(연산 출력의 크기, MB)를 가장 많이 쓴 연산 top_n 개를 출력하고,
+   {save_path}/summary.json 에 step 별로 모아서 저장한다.
+   -> 연산 이름에 scopes 의 이름이 들어있으면 그 scope(여러 개면 가장 안쪽)로, 없으면 가장 바깥쪽 scope 로 묶는다.
+   -> 역전파(gradients) 연산은 "{scope}/gradients" 로 따로 묶는다.
+'''
+
+
+class StepProfiler(object):
+
+    def __init__(self, profile_steps=None, scopes=None, save_path="profile", top_n=10):
+
+        self.profile_steps = set(profile_steps) if profile_steps else set()
+        self.scopes = scopes if scopes else []
+        self.save_path = save_path
+        self.top_n = top_n
+        self.summary = collections.OrderedDict()
+
+    def __repr__(self):
+        return "Step Profiler"
+
+    def run(self, sess, fetches, feed_dict=None, step=None, name="step"):
+
+        if step not in self.profile_steps:
+            return sess.run(fetches, feed_dict=feed_dict)
+
+        run_metadata = tf.RunMetadata()
+        result = sess.run(fetches, feed_dict=feed_dict,
+                          options=tf.RunOptions(trace_level=tf.RunOptions.FULL_TRACE),
+                          run_metadata=run_metadata)
+        self._save(run_metadata.step_stats, "{}_step{}".format(name, step))
+        return result
+
+    def _scope(self, node_name):
+
+        names = node_name.split("/")
+        # scopes 의 이름이 여러 개 들어있으면 가장 안쪽 scope 로 묶는다.
+        matches = [index for index, name in enumerate(names[:-1]) if name in self.scopes]
+        index = matches[-1] if matches else 0
+        scope = names[index] if len(names) > 1 else "(root)"
+        # 예) trainer/gradients/shared_variables/Generator/... , gradients_1/...
+        if any(name.startswith("gradients") for name in names[:index]):
+            scope += "/gradients"
+        return scope
+
+    def _save(self, step_stats, tag):
+
+        if not os.path.exists(self.save_path):
+            os.makedirs(self.save_path)
+        trace = timeline.Timeline(step_stats).generate_chrome_trace_format(show_memory=True)
+        with open(os.path.join(self.save_path, tag + ".json"), mode='w') as f:
+            f.write(trace)
+
+        op_time = collections.defaultdict(collections.Counter)
+        op_memory = collections.defaultdict(collections.Counter)
+        for device in step_stats.dev_stats:
+            # GPU 의 "/stream:숫자" 는 "/stream:all" 과 같은 연산을 다시 기록한 것이고, memcpy 는 연산이 아니다.
+            if ("/stream:" in device.device and not device.device.endswith("/stream:all")) \
+                    or "/memcpy" in device.device:
+                continue
+            for node in device.node_stats:
+                if node.node_name in ("_SOURCE", "_SINK"):
+                    continue
+                node_name = node.node_name.split(":")[0]
+                scope = self._scope(node_name)
+                op_time[scope][node_name] += node.all_end_rel_micros / 1000
+                op_memory[scope][node_name] += sum(output.tensor_description.allocation_description.requested_bytes
+                                                   for output in node.output) / (1024 * 1024)
+
+        summary = collections.OrderedDict()
+        print("<<< profile : {} >>>".format(tag))
+        for scope in sorted(op_time, key=lambda scope: -sum(op_time[scope].values())):
+            summary[scope] = {"time_ms": sum(op_time[scope].values()),
+                              "memory_mb": sum(op_memory[scope].values()),
+                              "top_time_ms": op_time[scope].most_common(self.top_n),
+                              "top_memory_mb": op_memory[scope].most_common(self.top_n)}
+            print("<<< {} : {:.3f}ms, {:.3f}MB >>>".format(scope, summary[scope]["time_ms"],
+                                                           summary[scope]["memory_mb"]))
+            for (time_name, time_ms), (memory_name, memory_mb) in zip(summary[scope]["top_time_ms"],
+                                                                      summary[scope]["top_memory_mb"]):
+                print("    {:>9.3f}ms {:<60} {:>9.3f}MB {}".format(time_ms, time_name, memory_mb, memory_name))
+
+        self.summary[tag] = summary
+        with open(os.path.join(self.save_path, "summary.json"), mode='w') as f:
+            json.dump(self.summary, f, indent=2)
+        print("<<< {} saved >>>".format(os.path.join(self.save_path, tag + ".json")))
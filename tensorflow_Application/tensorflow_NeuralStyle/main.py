@@ -17,4 +17,8 @@ model.neuralstyle(model_file_path=model_file_path, epoch=500, show_period=100, o
                   learning_rate=0.1,
                   image_size=(380, 683), \
                   content_image=content_image, style_image=style_image, content_a=1, style_b=1000, \
-                  initial_noise_image=initial_noise_image)
+                  initial_noise_image=initial_noise_image, \
+                  image_format="png", png_compression=3, jpeg_quality=95, \
+                  profile_steps=None,  # 중간 결과 이미지 형식 -> "png" or "jpeg" / profile_steps 예) [10, 11] -> 10, 11 번째 epoch 를 profile 에 저장
+                  xla=None,  # None, global -> 그래프 전체를 XLA 로 JIT 컴파일, scope -> VGG19, gram matrix, loss 만 XLA 로 컴파일
+                  threads=None)  # None -> benchmarks/autotune.py 가 저장한 이 host 의 설정(없으면 host 기본 설정), False -> tensorflow 기본값, dict -> 직접 지정
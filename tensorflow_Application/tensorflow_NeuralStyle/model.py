@@ -6,12 +6,30 @@ import cv2
 from tqdm import *
 
 import data_preprocessing as dp
+from ImageWriter import *
+from Profiler import *
+from ThreadConfig import *
 from VGG import *
+from XLA import *
+
+
+def to_image(image):
+
+    mean = np.array([0.485, 0.456, 0.406]).reshape((1, 1, 3))
+    std = np.array([0.229, 0.224, 0.225]).reshape((1, 1, 3))
+
+    image = image[0]
+    image = (image * std) + mean
+    image = np.clip(image, a_min=0, a_max=1) * 255
+    r, g, b = cv2.split(image)
+    image = cv2.merge([b, g, r])
+    return np.clip(image, a_min=0, a_max=255).astype('uint8')
 
 
 def neuralstyle(model_file_path="", epoch=None, show_period=None, optimizer_selection="adam", learning_rate=None, \
                 image_size=None, \
-                content_image=None, style_image=None, content_a=None, style_b=None, initial_noise_image=None):
+                content_image=None, style_image=None, content_a=None, style_b=None, initial_noise_image=None, \
+                image_format="png", png_compression=3, jpeg_quality=95, profile_steps=None, xla=None, threads=None):
     if os.path.exists("tensorboard"):
         shutil.rmtree("tensorboard");
 
@@ -20,27 +38,23 @@ def neuralstyle(model_file_path="", epoch=None, show_period=None, optimizer_sele
     STYLE_LAYERS = ['relu1_1', 'relu2_1', 'relu3_1', 'relu4_1', 'relu5_1']
     weighting_factors = np.divide(np.ones(shape=np.shape(STYLE_LAYERS)), len(STYLE_LAYERS))
 
-    def artistic_Image(image, count=None, show=False):
-
-        mean = np.array([0.485, 0.456, 0.406]).reshape((1, 1, 3))
-        std = np.array([0.229, 0.224, 0.225]).reshape((1, 1, 3))
+    # 중간 이미지의 변환, 인코딩, 쓰기는 백그라운드에서 한다. -> 학습이 이미지 쓰기를 기다리지 않는다.
+    writer = ImageWriter(image_format=image_format, png_compression=png_compression, jpeg_quality=jpeg_quality,
+                         num_workers=1, queue_size=2)
 
-        image = image[0]
-        image = (image * std) + mean
-        image = np.clip(image, a_min=0, a_max=1) * 255
-        r, g, b = cv2.split(image)
-        image = cv2.merge([b, g, r])
-        image = np.clip(image, a_min=0, a_max=255).astype('uint8')
+    def artistic_Image(image, count=None, show=False):
 
         if not os.path.exists("article"):
             os.makedirs("article")
 
         if count != None:
-            cv2.imwrite("article/artistic_Image_{}.png".format(count), image)
+            writer.write("article/artistic_Image_{}".format(count), image, transform=to_image)
 
         if show:
-            cv2.imwrite("article/artistic_Image_final.png", image)
-            img = cv2.imread("article/artistic_Image_final.png", cv2.IMREAD_COLOR)
+            path = writer.write("article/artistic_Image_final", image, transform=to_image)
+            # 모든 이미지가 쓰일 때까지 기다린다.
+            writer.close()
+            img = cv2.imread(path, cv2.IMREAD_COLOR)
             cv2.imshow("artistic_Image", img)
             esc = cv2.waitKey(0)
             if esc == 27:  # esc key
@@ -72,8 +86,9 @@ def neuralstyle(model_file_path="", epoch=None, show_period=None, optimizer_sele
             n = tf.reshape(n, shape=(-1, M))
             s = tf.reshape(s, shape=(-1, M))
             # gram_matrix
-            gram_n = tf.matmul(n, n, transpose_a=False, transpose_b=True)  # (filter, filter)
-            gram_s = tf.matmul(s, s, transpose_a=False, transpose_b=True)  # (filter, filter)
+            with tf.name_scope("gram_matrix"):
+                gram_n = tf.matmul(n, n, transpose_a=False, transpose_b=True)  # (filter, filter)
+                gram_s = tf.matmul(s, s, transpose_a=False, transpose_b=True)  # (filter, filter)
             s_loss = s_loss + tf.reduce_mean(
                 tf.multiply(tf.divide(tf.square(gram_n - gram_s), 4 * M * N), weighting_factors[i] * 2))
 
@@ -132,13 +147,13 @@ def neuralstyle(model_file_path="", epoch=None, show_period=None, optimizer_sele
         vgg19 = VGG19(model_file_path)
 
         # 2. Algorithm
-        with tf.name_scope("content_inference"):
+        with tf.name_scope("content_inference"), jit_scope(xla):
             vgg_content = vgg19(content_placeholder)
-        with tf.name_scope("style_inference"):
+        with tf.name_scope("style_inference"), jit_scope(xla):
             vgg_style = vgg19(style_placeholder)
-        with tf.name_scope("noise_inference"):
+        with tf.name_scope("noise_inference"), jit_scope(xla):
             vgg_noise = vgg19(noise_variable)
-        with tf.name_scope("Neural_Style_loss"):
+        with tf.name_scope("Neural_Style_loss"), jit_scope(xla):
             loss, c_loss, s_loss = Algorithm(vgg_content, vgg_style, vgg_noise)
 
         # 3. optimizer
@@ -153,14 +168,21 @@ def neuralstyle(model_file_path="", epoch=None, show_period=None, optimizer_sele
             summary_operation = tf.summary.merge_all()
 
     config = tf.ConfigProto(log_device_placement=False, allow_soft_placement=True)
+    config = xla_config(config, xla)
+    config = apply_thread_config(config, "NeuralStyle", threads)
     config.gpu_options.allow_growth = True
+    # profile_steps 에 있는 epoch 만 연산별 시간, 메모리를 기록한다.
+    profiler = StepProfiler(profile_steps=profile_steps, save_path="profile",
+                            scopes=["content_inference", "style_inference", "noise_inference", "gram_matrix",
+                                    "Neural_Style_loss", "trainer"])
     with tf.Session(graph=JG_Graph, config=config) as sess:
         sess.run(tf.global_variables_initializer())
         summary_writer = tf.summary.FileWriter("tensorboard", sess.graph)
 
         for i in tqdm(range(1, epoch + 1, 1)):
             feed_dict = {content_placeholder: content_img, style_placeholder: style_img}
-            _, tl, cl, sl = sess.run([train_operation, loss, c_loss, s_loss], feed_dict=feed_dict)
+            _, tl, cl, sl = profiler.run(sess, [train_operation, loss, c_loss, s_loss], feed_dict=feed_dict, step=i,
+                                         name="neuralstyle")
             print("epoch : {} / total cost : {}, content loss : {}, style loss : {}".format(i, tl, cl, sl))
             summary_str = sess.run(summary_operation, feed_dict=feed_dict)
             summary_writer.add_summary(summary_str, global_step=sess.run(global_step))
@@ -192,6 +214,10 @@ if __name__ == "__main__":
                 learning_rate=0.1,
                 image_size=(380, 683), \
                 content_image=content_image, style_image=style_image, content_a=1, style_b=1000, \
-                initial_noise_image=initial_noise_image)
+                initial_noise_image=initial_noise_image, \
+                image_format="png", png_compression=3, jpeg_quality=95, \
+                profile_steps=None,  # 중간 결과 이미지 형식 -> "png" or "jpeg" / profile_steps 예) [10, 11] -> 10, 11 번째 epoch 를 profile 에 저장
+                xla=None,  # None, global -> 그래프 전체를 XLA 로 JIT 컴파일, scope -> VGG19, gram matrix, loss 만 XLA 로 컴파일
+                threads=None)  # None -> benchmarks/autotune.py 가 저장한 이 host 의 설정(없으면 host 기본 설정), False -> tensorflow 기본값, dict -> 직접 지정
 else:
     print("Neural Style imported")
@@ -0,0 +1,130 @@
+import json
+import os
+import queue
+import threading
+import time
+
+import tensorflow as tf
+
+'''
+학습 도중에 N step 마다 혹은 T 초마다 checkpoint 를 저장하는 클래스
+
+1. 학습 스레드에서는 변수들의 값만 numpy 로 복사(snapshot)한다. - sess.run 한번
+2. 저장은 백그라운드 스레드에서 한다.
+   -> 학습 그래프와 같은 이름, 같은 모양의 변수를 가진 별도의 그래프(shadow graph)에 snapshot 을 넣고 tf.train.Saver 로 저장한다.
+   -> 저장된 checkpoint 는 학습 그래프의 saver 로 그대로 복원할 수 있다.
+3. max_to_keep 개의 최근 checkpoint 를 남기고, keep_checkpoint_every_n_hours 시간마다의 checkpoint 는 지우지 않는다.
+4. 저장할 때 epoch, batch(다음에 학습할 위치), step 을 progress.json 에 같이 쓴다. -> 다시 시작할 때 이어서 학습한다.
+'''
+
+
+class CheckpointManager(object):
+
+    def __init__(self, sess, var_lists, save_paths, save_steps=None, save_secs=None, max_to_keep=3,
+                 keep_checkpoint_every_n_hours=10000.0):
+
+        self.sess = sess
+        self.save_paths = save_paths
+        self.save_steps = save_steps
+        self.save_secs = save_secs
+        self.last_save_step = None
+        self.last_save_time = time.time()
+
+        # 여러 saver 에서 같이 쓰는 변수는 한번만 복사한다.
+        self.variables = []
+        for var_list in var_lists:
+            for var in var_list:
+                if var not in self.variables:
+                    self.variables.append(var)
+
+        # 학습 그래프와 같은 이름, 같은 모양의 변수를 가진 shadow graph - CPU 에서만 사용한다.
+        self.shadow_graph = tf.Graph()
+        with self.shadow_graph.as_default(), tf.device("/cpu:0"):
+            shadow = {var: tf.Variable(tf.zeros(var.get_shape(), dtype=var.dtype.base_dtype), name=var.op.name,
+                                       trainable=False) for var in self.variables}
+            self.shadow_variables = [shadow[var] for var in self.variables]
+            self.savers = [tf.train.Saver(var_list={var.op.name: shadow[var] for var in var_list},
+                                          max_to_keep=max_to_keep,
+                                          keep_checkpoint_every_n_hours=keep_checkpoint_every_n_hours)
+                           for var_list in var_lists]
+        self.shadow_sess = tf.Session(graph=self.shadow_graph, config=tf.ConfigProto(device_count={"GPU": 0}))
+
+        for saver, save_path in zip(self.savers, self.save_paths):
+            if not os.path.exists(save_path):
+                os.makedirs(save_path)
+            # 다시 시작했을 때도 이전 checkpoint 들을 max_to_keep 개수에 포함시킨다.
+            ckpt = tf.train.get_checkpoint_state(save_path)
+            if ckpt:
+                saver.recover_last_checkpoints(ckpt.all_model_checkpoint_paths)
+
+        # 저장이 끝나지 않았는데 다음 저장 요청이 오면 기다리지 않고 건너뛴다.(maxsize=1)
+        self.queue = queue.Queue(maxsize=1)
+        self.thread = threading.Thread(target=self._worker, daemon=True)
+        self.thread.start()
+
+    def __repr__(self):
+        return "Checkpoint Manager"
+
+    # save_steps step 마다 혹은 save_secs 초마다 저장한다.
+    def maybe_save(self, step, progress):
+
+        if self.save_steps and (self.last_save_step is None or step - self.last_save_step >= self.save_steps):
+            return self.save(step, progress)
+        if self.save_secs and time.time() - self.last_save_time >= self.save_secs:
+            return self.save(step, progress)
+        return False
+
+    def save(self, step, progress, block=False):
+
+        # 이미 저장한 step
+        if step == self.last_save_step:
+            return False
+        if not block and self.queue.full():
+            print("<<< previous checkpoint is still being written, skip step {} >>>".format(step))
+            return False
+        # 학습 스레드에서 하는 일은 여기까지 - 변수들의 값을 복사한다.
+        snapshot = self.sess.run(self.variables)
+        self.queue.put((step, dict(progress, step=step), snapshot))
+        self.last_save_step = step
+        self.last_save_time = time.time()
+        return True
+
+    def _worker(self):
+
+        while True:
+            job = self.queue.get()
+            if job is None:
+                self.queue.task_done()
+                break
+            step, progress, snapshot = job
+            try:
+                for var, value in zip(self.shadow_variables, snapshot):
+                    var.load(value, self.shadow_sess)
+                for saver, save_path in zip(self.savers, self.save_paths):
+                    saver.save(self.shadow_sess, save_path + "/", global_step=step, write_meta_graph=False)
+                    # 임시 파일에 쓴 다음 이름을 바꾼다.
+                    progress_path = os.path.join(save_path, "progress.json")
+                    with open(progress_path + ".tmp", mode='w') as f:
+                        json.dump(progress, f)
+                    os.replace(progress_path + ".tmp", progress_path)
+                print("<<< step {} checkpoint saved >>>".format(step))
+            except Exception as e:
+                print("<<< step {} checkpoint failed : {} >>>".format(step, e))
+            finally:
+                self.queue.task_done()
+
+    # 남은 저장이 끝날 때까지 기다린 뒤 종료한다.
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+        self.shadow_sess.close()
+
+
+# 마지막으로 저장된 학습 위치 - 없으면 None
+def load_progress(save_path):
+
+    progress_path = os.path.join(save_path, "progress.json")
+    if not os.path.isfile(progress_path):
+        return None
+    with open(progress_path, mode='r') as f:
+        return json.load(f)
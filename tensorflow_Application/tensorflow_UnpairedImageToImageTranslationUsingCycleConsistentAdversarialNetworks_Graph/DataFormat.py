@@ -0,0 +1,36 @@
+import tensorflow as tf
+from tensorflow.python.client import device_lib
+
+'''
+data_format 확인
+
+1. data_format="NCHW" 는 GPU 나, CPU 에서는 MKL(oneDNN) 로 빌드된 tensorflow 에서만 convolution 을 할 수 있다.
+   -> 보통의(MKL 이 아닌) CPU tensorflow 에서 NCHW 로 학습하면 첫 step 에서 Conv2D 오류로 죽는다.
+2. check_data_format 은 NCHW 를 쓸 수 없으면 알려주고 NHWC 로 바꾼다.
+'''
+
+DATA_FORMATS = ("NHWC", "NCHW")
+
+
+def nchw_supported():
+    # MKL(oneDNN) 빌드인지 -> 버전에 따라 함수가 없으면 MKL 빌드가 아닌 것으로 본다.
+    try:
+        from tensorflow.python import pywrap_tensorflow
+        if getattr(pywrap_tensorflow, "IsMklEnabled", lambda: False)():
+            return True
+    except ImportError:
+        pass
+    # GPU 가 있는지 -> GPU 메모리를 미리 잡지 않도록 allow_growth 로 확인한다.
+    config = tf.ConfigProto()
+    config.gpu_options.allow_growth = True
+    return any(device.device_type == "GPU" for device in device_lib.list_local_devices(session_config=config))
+
+
+def check_data_format(data_format):
+    if data_format not in DATA_FORMATS:
+        print("<<< data_format 은 NHWC 또는 NCHW 입니다. >>>")
+        exit(0)
+    if data_format == "NCHW" and not nchw_supported():
+        print("<<< 이 tensorflow 는 CPU 에서 NCHW convolution 을 지원하지 않아서(MKL 빌드가 아님) NHWC 로 바꿉니다. >>>")
+        return "NHWC"
+    return data_format
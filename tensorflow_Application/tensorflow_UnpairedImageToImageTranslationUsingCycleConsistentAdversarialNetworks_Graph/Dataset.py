@@ -1,8 +1,15 @@
+import collections
 import glob
+import hashlib
 import os
 import random
+import shutil
+import tarfile
+import urllib.error
+import urllib.parse
 import urllib.request
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
 
 import cv2
 import numpy as np
@@ -52,7 +59,8 @@ https://people.eecs.berkeley.edu/~taesung_park/CycleGAN/datasets/horse2zebra.zip
 class Dataset(object):
 
     def __init__(self, DB_name="horse2zebra",
-                 batch_size=1, TFRecord=False, use_TrainDataset=False, inference_size=(512, 512)):
+                 batch_size=1, TFRecord=False, use_TrainDataset=False, inference_size=(512, 512), mirror=None,
+                 sha256=None):
 
         self.Dataset_Path = "Dataset"
         self.DB_name = DB_name
@@ -81,7 +89,15 @@ class Dataset(object):
         if not os.path.exists(self.Dataset_Path):
             os.makedirs(self.Dataset_Path)
 
-        self.url = "https://people.eecs.berkeley.edu/~taesung_park/CycleGAN/datasets/{}.zip".format(self.DB_name)
+        '''
+        mirror -> 원래 주소 대신 받을 곳, 예) "http://내부서버/CycleGAN" 또는 "file:///mnt/datasets" -> "{mirror}/{DB_name}.zip"
+        sha256 -> 압축 파일의 SHA-256, None 이면 mirror 의 "{DB_name}.zip.sha256" 이나 처음 받았을 때 기록해둔 값으로 확인한다.
+        '''
+        self.sha256 = sha256
+        if mirror:
+            self.url = "{}/{}.zip".format(mirror.rstrip("/"), self.DB_name)
+        else:
+            self.url = "https://people.eecs.berkeley.edu/~taesung_park/CycleGAN/datasets/{}.zip".format(self.DB_name)
         self.dataset_folder = os.path.join(self.Dataset_Path, self.DB_name)
         self.dataset_zip = self.dataset_folder + ".zip"
 
@@ -143,33 +159,67 @@ class Dataset(object):
 
     def Preparing_Learning_Dataset(self):
 
+        if not os.path.exists(self.Dataset_Path):
+            os.makedirs(self.Dataset_Path)
+
         # 1. 데이터셋 폴더가 존재하지 않으면 다운로드
         if not os.path.exists(self.dataset_folder):
-            if not os.path.exists(self.dataset_zip):  # 데이터셋 압축 파일이 존재하지 않는 다면, 다운로드
-                print("<<< {} Dataset Download required >>>".format(self.DB_name))
-                urllib.request.urlretrieve(self.url, self.dataset_zip)
-                print("<<< {} Dataset Download Completed >>>".format(self.DB_name))
-
-            # "{self.DB_name}.tar.gz"의 파일의 크기는 미리 구해놓음. (미리 확인이 필요함.)
-            elif os.path.exists(self.dataset_zip) and os.path.getsize(
-                    self.dataset_zip) == self.file_size:  # 완전한 데이터셋 압축 파일이 존재한다면, 존재한다고 print를 띄워주자.
-                print("<<< ALL {} Dataset Exists >>>".format(self.DB_name))
-
-            else:  # 데이터셋 압축파일이 존재하긴 하는데, 제대로 다운로드 되지 않은 상태라면, 삭제하고 다시 다운로드
+            # "{self.DB_name}.zip"의 파일의 크기는 미리 구해놓음. (미리 확인이 필요함.) - mirror 를 사용하는 경우에도 같은 파일이어야 한다.
+            if os.path.exists(self.dataset_zip) and os.path.getsize(self.dataset_zip) != self.file_size:
+                # 데이터셋 압축파일이 존재하긴 하는데, 제대로 다운로드 되지 않은 상태라면, 삭제하고 다시 다운로드
                 print(
                     "<<< {} Dataset size must be : {}, but now size is {} >>>".format(self.DB_name, self.file_size,
                                                                                       os.path.getsize(
                                                                                           self.dataset_zip)))
                 os.remove(self.dataset_zip)  # 완전하게 다운로드 되지 않은 기존의 데이터셋 압축 파일을 삭제
                 print("<<< Deleting incomplete {} Dataset Completed >>>".format(self.DB_name))
-                print("<<< we need to download {} Dataset again >>>".format(self.DB_name))
-                urllib.request.urlretrieve(self.url, self.dataset_zip)
-                print("<<< {} Dataset Download Completed >>>".format(self.DB_name))
 
-            # 2. 완전한 압축파일이 다운로드 된 상태이므로 압축을 푼다
-            with zipfile.ZipFile(self.dataset_zip, 'r') as zf:
-                zf.extractall(path=self.Dataset_Path)
+            if not os.path.exists(self.dataset_zip):  # 데이터셋 압축 파일이 존재하지 않는 다면, 다운로드(.part 파일이 있으면 이어받기)
+                print("<<< {} Dataset Download required : {} >>>".format(self.DB_name, self.url))
+                try:
+                    download(self.url, self.dataset_zip, file_size=self.file_size)
+                except IOError as e:
+                    print(e)
+                    exit(0)
+                print("<<< {} Dataset Download Completed >>>".format(self.DB_name))
+            else:  # 완전한 데이터셋 압축 파일이 존재한다면, 존재한다고 print를 띄워주자.
+                print("<<< ALL {} Dataset Exists >>>".format(self.DB_name))
 
+            '''
+            2. SHA-256 확인
+            기대값 우선순위 -> sha256 인자 > 로컬의 "{파일}.sha256" > 서버(mirror)의 "{파일}.sha256"
+            -> 서버에서 받은 값도 로컬의 "{파일}.sha256" 에 기록해두므로, 데이터셋을 준비할 때마다 서버에 묻지 않는다.
+            셋다 없으면 처음 받은 파일의 SHA-256 을 로컬의 "{파일}.sha256" 에 기록해두고 다음부터 비교한다.
+            '''
+            sha256_path = self.dataset_zip + ".sha256"
+            expected = self.sha256
+            if not expected and os.path.exists(sha256_path):
+                with open(sha256_path, 'r') as f:
+                    expected = f.read().split()[0].lower()
+            if not expected:
+                expected = fetch_sha256(self.url)
+            if expected:
+                with open(sha256_path, 'w') as f:
+                    f.write("{}  {}\n".format(expected.lower(), os.path.basename(self.dataset_zip)))
+            actual = sha256sum(self.dataset_zip)
+            if expected and expected.lower() != actual:
+                print("<<< {} SHA-256 must be : {}, but now is {} >>>".format(self.DB_name, expected, actual))
+                os.remove(self.dataset_zip)  # 손상된 압축 파일을 삭제 -> 다시 실행하면 새로 받는다.
+                print("<<< Deleting corrupted {} Dataset Completed >>>".format(self.DB_name))
+                exit(0)
+            if not expected:
+                with open(sha256_path, 'w') as f:
+                    f.write("{}  {}\n".format(actual, os.path.basename(self.dataset_zip)))
+            print("<<< {} SHA-256 Verified >>>".format(os.path.basename(self.dataset_zip)))
+
+            # 3. 완전한 압축파일이 다운로드 된 상태이므로 압축을 푼다
+            # 임시 폴더에 다 푼 다음 옮긴다. -> 중간에 멈춰도 반쯤 풀린 폴더를 완전한 데이터셋으로 착각하지 않는다.
+            extract_path = os.path.join(self.Dataset_Path, ".{}.extract".format(self.DB_name))
+            if os.path.exists(extract_path):
+                shutil.rmtree(extract_path)
+            extract_zip(self.dataset_zip, extract_path)
+            os.replace(os.path.join(extract_path, self.DB_name), self.dataset_folder)
+            shutil.rmtree(extract_path)
             print("<<< {} Unzip Completed >>>".format(os.path.basename(self.dataset_zip)))
             print("<<< {} Dataset now exists >>>".format(self.DB_name))
         else:
@@ -388,6 +438,137 @@ class Dataset(object):
         return A_iterator, A_iterator.get_next(), A_length, B_iterator, B_iterator.get_next(), B_length
 
 
+'''
+데이터셋 압축 파일 받기 / 확인 / 풀기
+1. download -> 1MB 씩 나눠서 받는다. 중간에 끊기면 HTTP Range 를 사용해서 받은 곳부터 이어 받는다.(.part 파일)
+   mirror 로 file:// 경로나 내부 HTTP 서버를 지정할 수 있다.
+2. sha256sum -> 받은 파일의 SHA-256 을 구해서 손상 여부를 확인한다.
+3. extract_tar, extract_zip -> 여러 스레드를 사용해서 압축을 푼다.
+'''
+
+
+def sha256sum(path, chunk_size=1 << 20):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+# 서버(mirror)에 "{파일}.sha256" 이 있으면 읽어온다. 없으면 None
+def fetch_sha256(url):
+    try:
+        with urllib.request.urlopen(url + ".sha256", timeout=30) as response:
+            return response.read().decode().split()[0].lower()
+    except (urllib.error.URLError, OSError, ValueError, IndexError):
+        return None
+
+
+def download(url, path, file_size=None, chunk_size=1 << 20, retries=5):
+    part_path = path + ".part"
+    for retry in range(retries):
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        if file_size and offset > file_size:  # 잘못 받은 파일
+            os.remove(part_path)
+            offset = 0
+        # 다 받은 뒤 이름을 바꾸기 전에 멈춘 경우 -> 더 받을 것이 없으므로(서버는 416 을 돌려준다.) 이름만 바꾼다.
+        # -> 받은 파일은 download 를 부른 쪽에서 SHA-256 으로 확인한다.
+        if file_size and offset == file_size:
+            os.replace(part_path, path)
+            return path
+        try:
+            if url.startswith("file://"):
+                # 로컬 mirror - 파일을 열어서 받은 곳부터 복사한다.
+                response = open(urllib.request.url2pathname(urllib.parse.urlparse(url).path), 'rb')
+                response.seek(offset)
+                total = os.fstat(response.fileno()).st_size
+            else:
+                request = urllib.request.Request(url)
+                if offset > 0:
+                    request.add_header("Range", "bytes={}-".format(offset))
+                response = urllib.request.urlopen(request, timeout=60)
+                # 206 -> 이어받기, 200 -> 서버가 Range 를 지원하지 않으므로 처음부터 다시 받는다.
+                if offset > 0 and response.getcode() != 206:
+                    offset = 0
+                content_length = response.headers.get("Content-Length")
+                total = offset + int(content_length) if content_length else file_size
+
+            with response, open(part_path, 'ab' if offset > 0 else 'wb') as f, \
+                    tqdm(total=total, initial=offset, unit='B', unit_scale=True) as progress:
+                for chunk in iter(lambda: response.read(chunk_size), b''):
+                    f.write(chunk)
+                    progress.update(len(chunk))
+            os.replace(part_path, path)
+            return path
+        except urllib.error.HTTPError as e:
+            # 416 -> 요청한 위치(offset)가 파일의 끝이거나 그 뒤이다.(file_size 를 모르는 경우)
+            # Content-Range 의 "bytes */{전체 크기}" 와 받은 크기가 같으면 다 받은 것이고, 아니면 처음부터 다시 받는다.
+            if e.code == 416 and offset > 0:
+                content_range = e.headers.get("Content-Range", "") if e.headers else ""
+                if content_range.startswith("bytes */") and content_range[len("bytes */"):].strip() == str(offset):
+                    os.replace(part_path, path)
+                    return path
+                os.remove(part_path)
+            print("<<< Download interrupted({}), resume {}/{} >>>".format(e, retry + 1, retries))
+        except (urllib.error.URLError, ConnectionError, OSError) as e:
+            print("<<< Download interrupted({}), resume {}/{} >>>".format(e, retry + 1, retries))
+    raise IOError("<<< {} Download failed >>>".format(url))
+
+
+def _write_file(path, data):
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+# tar.gz 는 압축 해제 자체는 순서대로만 가능하므로, 압축 해제는 하나의 스레드에서 하고 파일 쓰기를 여러 스레드로 나눈다.
+# 아직 쓰지 않은 파일은 worker 개수의 4배까지만 메모리에 들고 있는다. -> 그 이상이면 가장 먼저 넘긴 파일이 다 쓰일 때까지 기다린다.
+def extract_tar(path, target, num_workers=None):
+    num_workers = num_workers if num_workers else os.cpu_count()
+    target = os.path.realpath(target)
+    with tarfile.open(path, 'r:*') as tar, ThreadPoolExecutor(max_workers=num_workers) as executor:
+        futures = collections.deque()
+        for member in tar:
+            destination = os.path.realpath(os.path.join(target, member.name))
+            if not destination.startswith(target + os.sep):  # 압축 파일 밖의 경로에 쓰는 것을 막는다.
+                continue
+            if member.isdir():
+                os.makedirs(destination, exist_ok=True)
+            elif member.isfile():
+                os.makedirs(os.path.dirname(destination), exist_ok=True)
+                if len(futures) >= 4 * num_workers:
+                    futures.popleft().result()
+                futures.append(executor.submit(_write_file, destination, tar.extractfile(member).read()))
+        for future in futures:
+            future.result()
+
+
+# zip 은 파일마다 따로 압축되어 있으므로, 스레드마다 ZipFile 을 따로 열어서 동시에 푼다.
+def extract_zip(path, target, num_workers=None):
+    num_workers = num_workers if num_workers else os.cpu_count()
+    with zipfile.ZipFile(path, 'r') as zf:
+        names = zf.namelist()
+    # 여러 스레드가 같은 폴더를 동시에 만들지 않도록 폴더를 먼저 만든다.
+    for name in names:
+        os.makedirs(os.path.dirname(os.path.join(target, name)), exist_ok=True)
+
+    def extract(chunk):
+        with zipfile.ZipFile(path, 'r') as zf:
+            for name in chunk:
+                zf.extract(name, path=target)
+
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        for future in [executor.submit(extract, names[index::num_workers]) for index in range(num_workers)]:
+            future.result()
+
+
+# benchmark 용 - 데이터셋을 받지 않고, 메모리 안의 랜덤 이미지(-1 ~ 1)를 계속 반복해서 내보낸다.
+def synthetic_iterator(batch_size=1, image_size=(256, 256), data_length=100, seed=0):
+    images = np.random.RandomState(seed).uniform(-1, 1, size=(batch_size,) + tuple(image_size) + (3,))
+    dataset = tf.data.Dataset.from_tensors(images.astype(np.float32)).repeat()
+    iterator = dataset.make_initializable_iterator()
+    return iterator, iterator.get_next(), data_length
+
+
 ''' 
 to reduce model oscillation [14], we follow
 Shrivastava et al’s strategy [45] and update the discriminators
@@ -1,28 +1,49 @@
 import shutil
+import time
 
+from Checkpoint import *
+from DataFormat import *
 from Dataset import *
+from ImageWriter import *
+from Profiler import *
+from Server import *
+from ThreadConfig import *
+from Tiling import *
+from XLA import *
 
 
-def visualize(model_name="CycleGAN", named_images=None, save_path=None):
-    if not os.path.exists(save_path):
-        os.makedirs(save_path)
+def stack_images(images):
     # 이미지 y축 방향으로 붙이기
-    image = np.hstack(named_images[1:])
+    image = np.hstack(images)
     # 이미지 스케일 바꾸기(~1 ~ 1 -> 0~ 255)
     image = ((image + 1) * 127.5).astype(np.uint8)
     # RGB로 바꾸기
-    image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
-    cv2.imwrite(os.path.join(save_path, '{}_{}.png'.format(model_name, named_images[0])), image)
-    print("<<< {}_{}.png saved in {} folder >>>".format(model_name, named_images[0], save_path))
+    return cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+
+
+# writer 가 주어지면 붙이기, 스케일 바꾸기, 인코딩, 쓰기를 writer 의 pool 에서 한다.
+def visualize(model_name="CycleGAN", named_images=None, save_path=None, writer=None):
+    if not os.path.exists(save_path):
+        os.makedirs(save_path)
+    path = os.path.join(save_path, '{}_{}'.format(model_name, named_images[0]))
+    if writer:
+        path = writer.write(path, named_images[1:], transform=stack_images)
+    else:
+        path = path + ".png"
+        cv2.imwrite(path, stack_images(named_images[1:]))
+    print("<<< {} saved in {} folder >>>".format(os.path.basename(path), save_path))
 
 
 def model(
         DB_name="horse2zebra",
         TEST=False,
         TFRecord=True,
+        mirror=None,
         Inputsize_limit=(256, 256),
         filter_size=8,
         norm_selection="BN",
+        fused_norm=False,
+        data_format="NHWC",
         regularizer=" ",
         scale=0.0001,
         cycle_consistency_loss="L1",
@@ -33,6 +54,11 @@ def model(
         use_identity_mapping=False,
         image_pool=True,
         image_pool_size=50,
+        accumulation_steps=1,
+        metrics_step=None,
+        checkpoint_steps=None,
+        checkpoint_secs=None,
+        keep_checkpoint_every_n_hours=10000.0,
         learning_rate=0.0002, training_epochs=1, batch_size=1, display_step=1,
         weight_decay_epoch=100,
         learning_rate_decay=0.99,
@@ -41,7 +67,23 @@ def model(
         only_draw_graph=False,
         show_translated_image=True,
         save_path="translated_image",
-        weights_to_numpy=False):
+        weights_to_numpy=False,
+        image_format="png",
+        png_compression=3,
+        jpeg_quality=95,
+        writer_workers=None,
+        writer_queue_size=16,
+        writer_use_process=False,
+        tile_size=None,
+        tile_overlap=32,
+        tile_batch_size=4,
+        serve=False,
+        serve_address=("127.0.0.1", 8000),
+        max_batch_size=8,
+        max_wait_ms=10,
+        synthetic_size=None,
+        synthetic_length=100,
+        profile_steps=None, xla=None, threads=None):
     print("<<< CycleGAN >>>")
 
     model_name = str(filter_size)
@@ -67,10 +109,54 @@ def model(
     if regularizer == "L1" or regularizer =="L2":
         model_name =  model_name + "reg" + regularizer
 
+    if not isinstance(accumulation_steps, int) or accumulation_steps < 1:
+        print("<<< accumulation_steps 는 1 이상의 정수입니다. >>>")
+        exit(0)
+
     if TEST == False:
         if os.path.exists("tensorboard/{}".format(model_name)):
             shutil.rmtree("tensorboard/{}".format(model_name))
 
+    # data_format="NCHW" -> 그래프 안에서는 (N, C, H, W) 로 계산하고, generator, discriminator 의 입력과 출력에서만 transpose 한다.
+    # -> placeholder, 데이터 파이프라인, 저장되는 이미지는 그대로 (N, H, W, C) 이고, 변수의 모양도 같아서 checkpoint 를 같이 쓸 수 있다.
+    # -> CPU 에서는 MKL(oneDNN) 로 빌드된 tensorflow 만 NCHW convolution 을 지원한다.(지원하지 않으면 NHWC 로 바꾼다.)
+    data_format = check_data_format(data_format)
+    channel_axis = 1 if data_format == "NCHW" else -1
+
+    # NHWC 순서로 쓴 strides, paddings, shape 를 data_format 순서로 바꾼다.
+    def layout(nhwc):
+        nhwc = list(nhwc)
+        if data_format == "NCHW":
+            return [nhwc[0], nhwc[3], nhwc[1], nhwc[2]]
+        return nhwc
+
+    # (N, H, W, C) -> data_format
+    def to_layout(input):
+        return tf.transpose(input, [0, 3, 1, 2]) if data_format == "NCHW" else input
+
+    # data_format -> (N, H, W, C)
+    def from_layout(input):
+        return tf.transpose(input, [0, 2, 3, 1]) if data_format == "NCHW" else input
+
+    # fused_norm=True 일 때의 instance norm
+    # -> tf.contrib.layers.instance_norm 과 같은 계산(epsilon=1e-6)을 transpose 없이 data_format 그대로 한다.
+    # -> FusedBatchNorm 은 epsilon 을 1.001e-5 보다 작게 할 수 없어서(cuDNN 제한) 기존 checkpoint 와 결과가 달라지므로 쓰지 않고,
+    #    batch 를 채널 방향으로 접으려면 NHWC 에서는 층마다 transpose 가 두번 들어가서 오히려 메모리를 더 읽고 쓴다.
+    def instance_norm(input):
+
+        with tf.variable_scope("InstanceNorm"):
+            # tf.contrib.layers.instance_norm 과 같은 이름의 변수를 쓴다. -> checkpoint 를 그대로 불러올 수 있다.
+            channels = input.get_shape()[channel_axis].value
+            beta = tf.get_variable("beta", [channels], initializer=tf.zeros_initializer())
+            gamma = tf.get_variable("gamma", [channels], initializer=tf.ones_initializer())
+
+            # 이미지마다, 채널마다의 평균과 분산
+            mean, variance = tf.nn.moments(input, [2, 3] if data_format == "NCHW" else [1, 2], keep_dims=True)
+            params_shape = layout([1, 1, 1, channels])
+            # 정규화와 gamma, beta 를 곱셈 하나와 덧셈 하나로 계산한다.
+            return tf.nn.batch_normalization(input, mean, variance, offset=tf.reshape(beta, params_shape),
+                                             scale=tf.reshape(gamma, params_shape), variance_epsilon=1e-6)
+
     # stride? -> [1, 2, 2, 1] = [one image, width, height, one channel]
     def conv2d(input, weight_shape=None, bias_shape=None, norm_selection=None,
                strides=[1, 1, 1, 1], padding="VALID"):
@@ -89,16 +175,23 @@ def model(
         else:
             w = tf.get_variable("w", weight_shape, initializer=weight_init)
 
-        b = tf.get_variable("b", bias_shape, initializer=bias_init)
-        conv_out = tf.nn.conv2d(input, w, strides=strides, padding=padding)
+        conv_out = tf.nn.conv2d(input, w, strides=layout(strides), padding=padding, data_format=data_format)
+
+        # fused_norm=True -> normalization 이 평균을 빼면서 bias 도 같이 없어지므로 bias 를 만들지 않는다.
+        if fused_norm and norm_selection == "BN":
+            return tf.layers.batch_normalization(conv_out, axis=channel_axis, training=BN_FLAG, fused=True)
+        elif fused_norm and norm_selection == "IN":
+            return instance_norm(conv_out)
 
         # batch_norm을 적용하면 bias를 안써도 된다곤 하지만, 나는 썼다.
+        b = tf.get_variable("b", bias_shape, initializer=bias_init)
+        bias_out = tf.nn.bias_add(conv_out, b, data_format=data_format)
         if norm_selection == "BN":
-            return tf.layers.batch_normalization(tf.nn.bias_add(conv_out, b), training=BN_FLAG)
+            return tf.layers.batch_normalization(bias_out, axis=channel_axis, training=BN_FLAG)
         elif norm_selection == "IN":
-            return tf.contrib.layers.instance_norm(tf.nn.bias_add(conv_out, b))
+            return tf.contrib.layers.instance_norm(bias_out, data_format=data_format)
         else:
-            return tf.nn.bias_add(conv_out, b)
+            return bias_out
 
     def conv2d_transpose(input, output_shape=None, weight_shape=None, bias_shape=None, norm_selection=None,
                          strides=[1, 1, 1, 1], padding="VALID"):
@@ -116,24 +209,32 @@ def model(
         else:
             w = tf.get_variable("w", weight_shape, initializer=weight_init)
 
-        b = tf.get_variable("b", bias_shape, initializer=bias_init)
-        conv_out = tf.nn.conv2d_transpose(input, w, output_shape=output_shape, strides=strides, padding=padding)
+        conv_out = tf.nn.conv2d_transpose(input, w, output_shape=output_shape, strides=layout(strides), padding=padding,
+                                          data_format=data_format)
+
+        # fused_norm=True -> normalization 이 평균을 빼면서 bias 도 같이 없어지므로 bias 를 만들지 않는다.
+        if fused_norm and norm_selection == "BN":
+            return tf.layers.batch_normalization(conv_out, axis=channel_axis, training=BN_FLAG, fused=True)
+        elif fused_norm and norm_selection == "IN":
+            return instance_norm(conv_out)
 
         # batch_norm을 적용하면 bias를 안써도 된다곤 하지만, 나는 썼다.
+        b = tf.get_variable("b", bias_shape, initializer=bias_init)
+        bias_out = tf.nn.bias_add(conv_out, b, data_format=data_format)
         if norm_selection == "BN":
-            return tf.layers.batch_normalization(tf.nn.bias_add(conv_out, b), training=BN_FLAG)
+            return tf.layers.batch_normalization(bias_out, axis=channel_axis, training=BN_FLAG)
         elif norm_selection == "IN":
-            return tf.contrib.layers.instance_norm(tf.nn.bias_add(conv_out, b))
+            return tf.contrib.layers.instance_norm(bias_out, data_format=data_format)
         else:
-            return tf.nn.bias_add(conv_out, b)
+            return bias_out
 
     def residual_block(x):
 
-        y = tf.pad(x, [[0, 0], [1, 1], [1, 1], [0, 0]], "REFLECT")
+        y = tf.pad(x, layout([[0, 0], [1, 1], [1, 1], [0, 0]]), "REFLECT")
         y = tf.nn.relu(conv2d(y, weight_shape=(3, 3, filter_size * 4, filter_size * 4), bias_shape=(filter_size * 4),
                               norm_selection=norm_selection,
                               strides=[1, 1, 1, 1], padding="VALID"))
-        y = tf.pad(y, [[0, 0], [1, 1], [1, 1], [0, 0]], "REFLECT")
+        y = tf.pad(y, layout([[0, 0], [1, 1], [1, 1], [0, 0]]), "REFLECT")
         y = tf.nn.relu(conv2d(y, weight_shape=(3, 3, filter_size * 4, filter_size * 4), bias_shape=(filter_size * 4),
                               norm_selection=norm_selection,
                               strides=[1, 1, 1, 1], padding="VALID"))
@@ -161,7 +262,7 @@ def model(
         '''
         with tf.variable_scope(name):
             with tf.variable_scope("conv1"):
-                padded_images = tf.pad(images, [[0, 0], [3, 3], [3, 3], [0, 0]], "REFLECT")
+                padded_images = tf.pad(to_layout(images), layout([[0, 0], [3, 3], [3, 3], [0, 0]]), "REFLECT")
                 conv1 = tf.nn.relu(
                     conv2d(padded_images, weight_shape=(7, 7, 3, filter_size), bias_shape=(filter_size),
                            norm_selection=norm_selection,
@@ -213,13 +314,13 @@ def model(
                 # result shape = (batch_size, 256, 256, 32)
 
             with tf.variable_scope("output"):
-                padded_trans_conv2 = tf.pad(trans_conv2, [[0, 0], [3, 3], [3, 3], [0, 0]], "REFLECT")
+                padded_trans_conv2 = tf.pad(trans_conv2, layout([[0, 0], [3, 3], [3, 3], [0, 0]]), "REFLECT")
                 output = tf.nn.tanh(
                     conv2d(padded_trans_conv2, weight_shape=(7, 7, filter_size, 3), bias_shape=(3),
                            strides=[1, 1, 1, 1],
                            padding="VALID"))
             # result shape = (batch_size, 256, 256, 3)
-        return output
+        return from_layout(output)
 
     # PatchGAN
     def discriminator(images=None, name=None):
@@ -232,7 +333,7 @@ def model(
         with tf.variable_scope(name):
             with tf.variable_scope("conv1"):
                 conv1 = tf.nn.leaky_relu(
-                    conv2d(images, weight_shape=(4, 4, 3, filter_size * 2), bias_shape=(filter_size * 2),
+                    conv2d(to_layout(images), weight_shape=(4, 4, 3, filter_size * 2), bias_shape=(filter_size * 2),
                            strides=[1, 2, 2, 1], padding="SAME"), alpha=0.2)
                 # result shape = (batch_size, 128, 128, 64)
             with tf.variable_scope("conv2"):
@@ -247,7 +348,7 @@ def model(
                                strides=[1, 2, 2, 1], padding="SAME")
                 # result shape = (batch_size, 32, 32, 256)
                 conv3 = tf.nn.leaky_relu(
-                    tf.pad(conv3, [[0, 0], [1, 1], [1, 1], [0, 0]], mode="CONSTANT", constant_values=0), alpha=0.2)
+                    tf.pad(conv3, layout([[0, 0], [1, 1], [1, 1], [0, 0]]), mode="CONSTANT", constant_values=0), alpha=0.2)
                 # result shape = (batch_size, 34, 34, 256)
             with tf.variable_scope("conv4"):
                 conv4 = conv2d(conv3, weight_shape=(4, 4, filter_size * 8, filter_size * 16),
@@ -255,13 +356,41 @@ def model(
                                strides=[1, 1, 1, 1], padding="VALID")
                 # result shape = (batch_size, 31, 31, 256)
                 conv4 = tf.nn.leaky_relu(
-                    tf.pad(conv4, [[0, 0], [1, 1], [1, 1], [0, 0]], mode="CONSTANT", constant_values=0), alpha=0.2)
+                    tf.pad(conv4, layout([[0, 0], [1, 1], [1, 1], [0, 0]]), mode="CONSTANT", constant_values=0), alpha=0.2)
                 # result shape = (batch_size, 33, 33, 512)
             with tf.variable_scope("output"):
                 output = conv2d(conv4, weight_shape=(4, 4, filter_size * 16, 1), bias_shape=(1),
                                 strides=[1, 1, 1, 1], padding="VALID")
                 # result shape = (batch_size, 30, 30, 1)
-            return tf.nn.sigmoid(output)
+            return tf.nn.sigmoid(from_layout(output))
+
+    '''
+    accumulation_steps=K (K > 1) -> K 개의 micro-batch(batch_size) 의 gradient 를 학습하지 않는(trainable=False) 변수에
+    더해두었다가, K 번째 micro-batch 에서 평균 gradient 로 한번만 update 한다.
+    -> 메모리는 batch_size 만큼만 쓰면서 batch_size x K 크기의 batch 로 학습하는 것과 같은 gradient 를 얻는다.
+    학습 연산은 (accumulate, apply) 두 개를 돌려준다. K=1 이면 두 연산은 같은 연산이다.
+    '''
+    def accumulate_training(optimizer, grads_and_vars, dependencies):
+
+        grads_and_vars = [(grad, var) for grad, var in grads_and_vars if grad is not None]
+        # 누적 변수는 saver 를 만든 뒤에 선언되므로 checkpoint 에 저장되지 않는다.
+        # -> "accumulators" collection 에도 넣어두고, 이어서 학습할 때 0 으로 되돌린다.
+        with tf.name_scope("accumulator"):
+            accumulators = [tf.Variable(tf.zeros(var.get_shape(), dtype=var.dtype.base_dtype), trainable=False,
+                                        collections=[tf.GraphKeys.GLOBAL_VARIABLES, "accumulators"])
+                            for _, var in grads_and_vars]
+        with tf.control_dependencies(dependencies):
+            accumulate_operation = tf.group(*[accumulator.assign_add(tf.convert_to_tensor(grad))
+                                              for accumulator, (grad, _) in zip(accumulators, grads_and_vars)])
+        # read_value() -> 더한 뒤의 값을 읽는다.
+        with tf.control_dependencies([accumulate_operation]):
+            update_operation = optimizer.apply_gradients(
+                [(accumulator.read_value() / accumulation_steps, var)
+                 for accumulator, (_, var) in zip(accumulators, grads_and_vars)])
+        with tf.control_dependencies([update_operation]):
+            apply_operation = tf.group(*[accumulator.assign(tf.zeros_like(accumulator))
+                                         for accumulator in accumulators])
+        return accumulate_operation, apply_operation
 
     def training(cost, var_list, scope=None):
 
@@ -275,12 +404,19 @@ def model(
                 optimizer = tf.train.RMSPropOptimizer(learning_rate=lr, decay=decay, momentum=momentum)
             elif optimizer_selection == "SGD":
                 optimizer = tf.train.GradientDescentOptimizer(learning_rate=lr)
-            train_operation = optimizer.minimize(cost, var_list=var_list)
-        return train_operation
+            grads_and_vars = optimizer.compute_gradients(cost, var_list=var_list)
+
+        if accumulation_steps > 1:
+            return accumulate_training(optimizer, grads_and_vars,
+                                       tf.get_collection(tf.GraphKeys.UPDATE_OPS, scope=scope))
+        with tf.control_dependencies(tf.get_collection(tf.GraphKeys.UPDATE_OPS, scope=scope)):
+            train_operation = optimizer.apply_gradients(grads_and_vars)
+        return train_operation, train_operation
 
     if not TEST:
 
         # print(tf.get_default_graph()) #기본그래프이다.
+        graph_build_start = time.time()
         JG_Graph = tf.Graph()  # 내 그래프로 설정한다.- 혹시라도 나중에 여러 그래프를 사용할 경우를 대비
         with JG_Graph.as_default():  # as_default()는 JG_Graph를 기본그래프로 설정한다.
 
@@ -310,42 +446,53 @@ def model(
             # lr = tf.placeholder(dtype=tf.float32)
             # 데이터 전처리
             with tf.name_scope("Dataset"):
-                dataset = Dataset(DB_name=DB_name, batch_size=batch_size, TFRecord=TFRecord,
-                                  use_TrainDataset=not TEST)
-                A_iterator, A_next_batch, A_length, B_iterator, B_next_batch, B_length = dataset.iterator()
+                # synthetic_size 가 주어지면 데이터셋 대신 메모리 안의 랜덤 이미지를 사용한다.(benchmark 용)
+                if synthetic_size:
+                    A_iterator, A_next_batch, A_length = synthetic_iterator(batch_size=batch_size,
+                                                                            image_size=synthetic_size,
+                                                                            data_length=synthetic_length, seed=0)
+                    B_iterator, B_next_batch, B_length = synthetic_iterator(batch_size=batch_size,
+                                                                            image_size=synthetic_size,
+                                                                            data_length=synthetic_length, seed=1)
+                else:
+                    dataset = Dataset(DB_name=DB_name, batch_size=batch_size, TFRecord=TFRecord,
+                                      use_TrainDataset=not TEST, mirror=mirror)
+                    A_iterator, A_next_batch, A_length, B_iterator, B_next_batch, B_length = dataset.iterator()
 
                 # 알고리즘
                 A = A_next_batch
                 B = B_next_batch
+                # 입력 이미지의 크기 - 학습 연산과 같이 가져와서 확인한다.(크기를 확인하려고 batch 를 따로 꺼내지 않는다.)
+                input_shape = [tf.shape(A), tf.shape(B)]
 
             with tf.variable_scope("shared_variables", reuse=tf.AUTO_REUSE) as scope:
 
-                with tf.name_scope("AtoB_Generator"):
+                with tf.name_scope("AtoB_Generator"), jit_scope(xla):
                     AtoB_gene = generator(images=A, name="AtoB_generator")
 
-                with tf.name_scope("BtoA_generator"):
+                with tf.name_scope("BtoA_generator"), jit_scope(xla):
                     BtoA_gene = generator(images=B, name="BtoA_generator")
 
                 # A -> B -> A
-                with tf.name_scope("Back_to_A"):
+                with tf.name_scope("Back_to_A"), jit_scope(xla):
                     BackA = generator(images=AtoB_gene, name="BtoA_generator")
 
                 # B -> A -> B
-                with tf.name_scope("Back_to_B"):
+                with tf.name_scope("Back_to_B"), jit_scope(xla):
                     BackB = generator(images=BtoA_gene, name="AtoB_generator")
 
-                with tf.name_scope("AtoB_Discriminator"):
+                with tf.name_scope("AtoB_Discriminator"), jit_scope(xla):
                     AtoB_Dreal = discriminator(images=B, name="AtoB_Discriminator")
                     # scope.reuse_variables()
                     AtoB_Dgene = discriminator(images=AtoB_gene, name="AtoB_Discriminator")
 
-                with tf.name_scope("BtoA_Discriminator"):
+                with tf.name_scope("BtoA_Discriminator"), jit_scope(xla):
                     BtoA_Dreal = discriminator(images=A, name="BtoA_Discriminator")
                     # scope.reuse_variables()
                     BtoA_Dgene = discriminator(images=BtoA_gene, name="BtoA_Discriminator")
 
                 if use_identity_mapping:
-                    with tf.name_scope("identity_generator"):
+                    with tf.name_scope("identity_generator"), jit_scope(xla):
                         im_AtoB_GeneratorWithB = generator(images=B, name="AtoB_generator")
                         im_BtoA_GeneratorWithA = generator(images=A, name="BtoA_generator")
 
@@ -374,7 +521,8 @@ def model(
 
             # optimizer의 매개변수들을 저장하고 싶지 않다면 여기에 선언해야한다.
             with tf.name_scope("saver"):
-                saver_all = tf.train.Saver(var_list=tf.global_variables(), max_to_keep=3)
+                var_all = tf.global_variables()
+                saver_all = tf.train.Saver(var_list=var_all, max_to_keep=3)
                 saver_generator = tf.train.Saver(var_list=AtoB_varG + BtoA_varG, max_to_keep=3)
             '''
             논문에 나와있듯이, log likelihood objective 대신 least-square loss를 사용한다.
@@ -418,13 +566,19 @@ def model(
                     BtoA_GLoss += tf.multiply(Identity_mapping_Loss, 0.5 * cycle_consistency_loss_weight)
 
             with tf.name_scope("AtoB_Discriminator_trainer"):
-                AtoB_D_train_op = training(AtoB_DLoss, AtoB_varD, scope='shared_variables/AtoB_Discriminator')
+                AtoB_D_train_op, AtoB_D_apply_op = training(AtoB_DLoss, AtoB_varD,
+                                                            scope='shared_variables/AtoB_Discriminator')
             with tf.name_scope("AtoB_Generator_trainer"):
-                AtoB_G_train_op = training(AtoB_GLoss, AtoB_varG, scope='shared_variables/AtoB_generator')
+                AtoB_G_train_op, AtoB_G_apply_op = training(AtoB_GLoss, AtoB_varG,
+                                                            scope='shared_variables/AtoB_generator')
             with tf.name_scope("BtoA_Discriminator_trainer"):
-                BtoA_D_train_op = training(BtoA_DLoss, BtoA_varD, scope='shared_variables/BtoA_Discriminator')
+                BtoA_D_train_op, BtoA_D_apply_op = training(BtoA_DLoss, BtoA_varD,
+                                                            scope='shared_variables/BtoA_Discriminator')
             with tf.name_scope("BtoA_Generator_trainer"):
-                BtoA_G_train_op = training(BtoA_GLoss, BtoA_varG, scope='shared_variables/BtoA_generator')
+                BtoA_G_train_op, BtoA_G_apply_op = training(BtoA_GLoss, BtoA_varG,
+                                                            scope='shared_variables/BtoA_generator')
+            # 누적 변수를 0 으로 되돌리는 연산 - accumulation_steps=1 이면 아무것도 하지 않는다.
+            accumulator_reset = tf.variables_initializer(tf.get_collection("accumulators"))
 
             if use_identity_mapping:
                 with tf.name_scope("LOSS"):
@@ -443,6 +597,26 @@ def model(
                     tf.summary.scalar("{}Loss".format(cycle_consistency_loss), cycle_loss)
 
             summary_operation = tf.summary.merge_all()
+
+            '''
+            학습 중의 loss 와 discriminator 출력의 평균을 그래프 안에서 누적한다.(tf.metrics.mean)
+            매 step 마다 loss 와 discriminator 출력을 python 으로 가져오지 않고,
+            update 연산만 학습 연산과 같이 실행한 뒤 epoch 이 끝날 때(혹은 metrics_step 마다) 평균값만 읽는다.
+            '''
+            with tf.variable_scope("Metrics"):
+                AtoB_G_metrics = {"AtoB_GLoss": tf.metrics.mean(AtoB_GLoss), "AtoB_sigmoidG": tf.metrics.mean(AtoB_Dgene)}
+                BtoA_G_metrics = {"BtoA_GLoss": tf.metrics.mean(BtoA_GLoss), "BtoA_sigmoidG": tf.metrics.mean(BtoA_Dgene)}
+                AtoB_D_metrics = {"AtoB_DLoss": tf.metrics.mean(AtoB_DLoss), "AtoB_sigmoidD": tf.metrics.mean(AtoB_Dreal)}
+                BtoA_D_metrics = {"BtoA_DLoss": tf.metrics.mean(BtoA_DLoss), "BtoA_sigmoidD": tf.metrics.mean(BtoA_Dreal)}
+                metrics = {}
+                for metric in (AtoB_G_metrics, BtoA_G_metrics, AtoB_D_metrics, BtoA_D_metrics):
+                    metrics.update({name: value for name, (value, _) in metric.items()})
+                AtoB_G_metrics_update = tf.group(*[update for _, update in AtoB_G_metrics.values()])
+                BtoA_G_metrics_update = tf.group(*[update for _, update in BtoA_G_metrics.values()])
+                AtoB_D_metrics_update = tf.group(*[update for _, update in AtoB_D_metrics.values()])
+                BtoA_D_metrics_update = tf.group(*[update for _, update in BtoA_D_metrics.values()])
+                metrics_reset = tf.variables_initializer(
+                    tf.get_collection(tf.GraphKeys.LOCAL_VARIABLES, scope="Metrics"))
             '''
             WHY? 아래 6줄의 코드를 적어 주지 않고, 학습을 하게되면, TEST부분에서 tf.train.import_meta_graph를 사용할 때 오류가 발생한다. 
             -> 단순히 그래프를 가져오고 가중치를 복원하는 것만으로는 안된다. 세션을 실행할때 인수로 사용할 변수에 대한 
@@ -476,8 +650,19 @@ def model(
                 imagepool = ImagePool(image_pool_size=image_pool_size)
 
             config = tf.ConfigProto(log_device_placement=False, allow_soft_placement=True)
+            config = xla_config(config, xla)
+            config = apply_thread_config(config, "CycleGAN", threads)
             config.gpu_options.allow_growth = True
             # config.gpu_options.per_process_gpu_memory_fraction = 0.1
+            graph_build_time = time.time() - graph_build_start
+            # 매 step 에 걸린 시간 - 첫 step 은 그래프 최적화, 메모리 할당이 포함되므로 따로 본다.
+            step_times = []
+            # profile_steps 에 있는 step 만 연산별 시간, 메모리를 기록한다.
+            profiler = StepProfiler(profile_steps=profile_steps, save_path=os.path.join("profile", model_name),
+                                    scopes=["AtoB_Generator", "BtoA_generator", "Back_to_A", "Back_to_B",
+                                            "AtoB_Discriminator", "BtoA_Discriminator", "identity_generator",
+                                            "AtoB_Discriminator_trainer", "AtoB_Generator_trainer",
+                                            "BtoA_Discriminator_trainer", "BtoA_Generator_trainer"])
 
             with tf.Session(graph=JG_Graph, config=config) as sess:
                 print("<<< initializing!!! >>>")
@@ -489,6 +674,26 @@ def model(
                     print("<<< Restore {} checkpoint!!! >>>".format(os.path.basename(ckpt_all.model_checkpoint_path)))
                     saver_all.restore(sess, ckpt_all.model_checkpoint_path)
 
+                # checkpoint 와 같이 저장된 학습 위치(progress.json)가 있으면 그 위치부터 이어서 학습한다.
+                start_epoch, start_batch = 1, 0
+                save_all_model_path = os.path.join(model_name, 'All')
+                save_generator_model_path = os.path.join(model_name, 'Generator')
+                progress = load_progress(save_all_model_path)
+                if ckpt_all and progress and ckpt_all.model_checkpoint_path.endswith("-{}".format(progress["step"])):
+                    start_epoch, start_batch = progress["epoch"], progress["batch"]
+                    print("<<< Resume from {} epoch : {} batch >>>".format(start_epoch, start_batch))
+
+                # checkpoint_steps step 마다 혹은 checkpoint_secs 초마다 백그라운드 스레드에서 저장한다.
+                if checkpoint_steps or checkpoint_secs:
+                    checkpoint_manager = CheckpointManager(sess, [var_all, AtoB_varG + BtoA_varG],
+                                                           [save_all_model_path, save_generator_model_path],
+                                                           save_steps=checkpoint_steps, save_secs=checkpoint_secs,
+                                                           keep_checkpoint_every_n_hours=keep_checkpoint_every_n_hours)
+                else:
+                    checkpoint_manager = None
+
+                # metric 변수들은 local variable 이다.
+                sess.run(tf.local_variables_initializer())
                 summary_writer = tf.summary.FileWriter(os.path.join('tensorboard', model_name), sess.graph)
                 sess.run(A_iterator.initializer)
                 sess.run(B_iterator.initializer)
@@ -497,122 +702,171 @@ def model(
                 data_length = A_length if A_length > B_length else B_length
                 total_batch = int(data_length / batch_size)
 
-                for epoch in tqdm(range(1, training_epochs + 1)):
-
-                    # 논문에서 100 epoch가 넘으면 선형적으로 학습률(learning rate)을 감소시킨다고 했다. 1 epoch마다 0.99 씩 줄여보자
+                # accumulation_steps 개의 micro-batch 마다 한번 update 한다.
+                if accumulation_steps > 1:
+                    print("<<< accumulation_steps : {} -> {} batch({} 장) 마다 한번 update, 유효 batch 크기 {} >>>"
+                          .format(accumulation_steps, accumulation_steps, batch_size, batch_size * accumulation_steps))
+                # 누적된 micro-batch 수, update 횟수
+                # -> 누적 변수는 checkpoint 에 없으므로, 이어서 학습할 때도 비어있는 누적 변수로 새 주기를 시작한다.
+                # (checkpoint 가 주기 중간에 저장되었어도 일부만 더한 gradient 로 update 하지 않는다.)
+                sess.run(accumulator_reset)
+                accumulated, updates = 0, 0
+
+                # 이어서 학습하는 경우, 지나간 epoch 만큼 학습률을 줄여둔다.
+                for epoch in range(1, start_epoch):
                     if epoch > weight_decay_epoch:
                         learning_rate *= learning_rate_decay
 
-                    AtoB_LossD = 0
-                    AtoB_LossG = 0
-                    BtoA_LossD = 0
-                    BtoA_LossG = 0
-
-                    # 아래의 두 변수가 각각 0.5 씩의 값을 갖는게 가장 이상적이다.
-                    AtoB_sigmoidD = 0
-                    AtoB_sigmoidG = 0
-
-                    # 아래의 두 변수가 각각 0.5 씩의 값을 갖는게 가장 이상적이다.
-                    BtoA_sigmoidD = 0
-                    BtoA_sigmoidG = 0
+                for epoch in tqdm(range(start_epoch, training_epochs + 1)):
 
-                    for i in range(total_batch):
+                    # 논문에서 100 epoch가 넘으면 선형적으로 학습률(learning rate)을 감소시킨다고 했다. 1 epoch마다 0.99 씩 줄여보자
+                    if epoch > weight_decay_epoch:
+                        learning_rate *= learning_rate_decay
 
-                        # 입력 이미지가 256 x 256 이하이면, exit()
-                        temp1, temp2 = sess.run([A, B])
-                        if temp1.shape[1] < Inputsize_limit[0] or temp1.shape[2] < Inputsize_limit[1] or temp2.shape[
-                            1] < Inputsize_limit[0] or temp2.shape[2] < Inputsize_limit[1]:
-                            print("입력된 이미지 크기는 {}x{} 입니다.".format(temp.shape[1], temp.shape[2]))
-                            print("입력되는 이미지 크기는 256x256 보다 크거나 같아야 합니다.")
-                            print("강제 종료 합니다.")
-                            exit(0)
+                    # 누적된 평균을 0 으로 되돌린다.
+                    sess.run(metrics_reset)
+                    epoch_updates = updates
+
+                    for i in range(start_batch if epoch == start_epoch else 0, total_batch):
+
+                        step = (epoch - 1) * total_batch + i + 1
+                        step_start = time.time()
+                        # summary 는 display_step epoch 의 마지막 batch 에서만 BtoA generator 의 학습 연산과 같이 구한다.
+                        # -> 매 step 마다 summary 를 따로 sess.run 해서 가져오지 않는다.
+                        last_batch = epoch % display_step == 0 and i == total_batch - 1
+                        summary_fetch = [summary_operation] if last_batch else []
+
+                        accumulated += 1
+                        # accumulation_steps 번째 micro-batch 에서만 update 한다.
+                        apply_step = accumulated % accumulation_steps == 0
+                        if apply_step:
+                            updates += 1
+                        AtoB_G_op = AtoB_G_apply_op if apply_step else AtoB_G_train_op
+                        BtoA_G_op = BtoA_G_apply_op if apply_step else BtoA_G_train_op
+                        AtoB_D_op = AtoB_D_apply_op if apply_step else AtoB_D_train_op
+                        BtoA_D_op = BtoA_D_apply_op if apply_step else BtoA_D_train_op
 
                         if norm_selection == "BN":
-                            # Generator Update
-                            _, AtoB_G_Loss, AtoB_Dgene_simgoid = sess.run([AtoB_G_train_op, AtoB_GLoss, AtoB_Dgene],
-                                                                          feed_dict={lr: learning_rate, BN_FLAG: True})
-                            _, BtoA_G_Loss, BtoA_Dgene_simgoid = sess.run([BtoA_G_train_op, BtoA_GLoss, BtoA_Dgene],
-                                                                          feed_dict={lr: learning_rate, BN_FLAG: True})
+                            # Generator Update - 입력 이미지의 크기도 같이 가져온다.
+                            shapes = profiler.run(sess, [AtoB_G_op, AtoB_G_metrics_update] + input_shape,
+                                                  feed_dict={lr: learning_rate, BN_FLAG: True}, step=step,
+                                                  name="AtoB_generator")[-2:]
+                            results = profiler.run(sess, [BtoA_G_op, BtoA_G_metrics_update] + summary_fetch,
+                                                   feed_dict={lr: learning_rate, BN_FLAG: True}, step=step,
+                                                   name="BtoA_generator")
                         else:
-                            # Generator Update
-                            _, AtoB_G_Loss, AtoB_Dgene_simgoid = sess.run([AtoB_G_train_op, AtoB_GLoss, AtoB_Dgene],
-                                                                          feed_dict={lr: learning_rate})
-                            _, BtoA_G_Loss, BtoA_Dgene_simgoid = sess.run([BtoA_G_train_op, BtoA_GLoss, BtoA_Dgene],
-                                                                          feed_dict={lr: learning_rate})
+                            # Generator Update - 입력 이미지의 크기도 같이 가져온다.
+                            shapes = profiler.run(sess, [AtoB_G_op, AtoB_G_metrics_update] + input_shape,
+                                                  feed_dict={lr: learning_rate}, step=step, name="AtoB_generator")[-2:]
+                            results = profiler.run(sess, [BtoA_G_op, BtoA_G_metrics_update] + summary_fetch,
+                                                   feed_dict={lr: learning_rate}, step=step, name="BtoA_generator")
+
+                        # 입력 이미지가 256 x 256 이하이면, exit()
+                        for shape in shapes:
+                            if shape[1] < Inputsize_limit[0] or shape[2] < Inputsize_limit[1]:
+                                print("입력된 이미지 크기는 {}x{} 입니다.".format(shape[1], shape[2]))
+                                print("입력되는 이미지 크기는 256x256 보다 크거나 같아야 합니다.")
+                                print("강제 종료 합니다.")
+                                exit(0)
+                        if summary_fetch:
+                            summary_writer.add_summary(results[-1], global_step=epoch)
 
                         # image_pool 변수 사용할 때(단 batch_size=1 일 경우만), Discriminator Update
                         if image_pool and batch_size == 1:
                             fake_AtoB_gene, fake_BtoA_gene = imagepool(images=sess.run([AtoB_gene, BtoA_gene]))
 
                             # AtoB_gene, BtoA_gene 에 과거에 생성된 fake_AtoB_gene, fake_BtoA_gene를 넣어주자!!!
-                            _, AtoB_D_Loss, AtoB_Dreal_simgoid = sess.run([AtoB_D_train_op, AtoB_DLoss, AtoB_Dreal],
-                                                                          feed_dict={lr: learning_rate,
-                                                                                     AtoB_gene: fake_AtoB_gene})
-                            _, BtoA_D_Loss, BtoA_Dreal_simgoid = sess.run([BtoA_D_train_op, BtoA_DLoss, BtoA_Dreal],
-                                                                          feed_dict={lr: learning_rate,
-                                                                                     BtoA_gene: fake_BtoA_gene})
+                            profiler.run(sess, [AtoB_D_op, AtoB_D_metrics_update],
+                                         feed_dict={lr: learning_rate, AtoB_gene: fake_AtoB_gene}, step=step,
+                                         name="AtoB_discriminator")
+                            profiler.run(sess, [BtoA_D_op, BtoA_D_metrics_update],
+                                         feed_dict={lr: learning_rate, BtoA_gene: fake_BtoA_gene}, step=step,
+                                         name="BtoA_discriminator")
                         # image_pool 변수를 사용하지 않을 때, Discriminator Update
                         else:
                             if norm_selection == "BN":
-                                _, AtoB_D_Loss, AtoB_Dreal_simgoid = sess.run([AtoB_D_train_op, AtoB_DLoss, AtoB_Dreal],
-                                                                              feed_dict={lr: learning_rate,
-                                                                                         BN_FLAG: True})
-                                _, BtoA_D_Loss, BtoA_Dreal_simgoid = sess.run([BtoA_D_train_op, BtoA_DLoss, BtoA_Dreal],
-                                                                              feed_dict={lr: learning_rate,
-                                                                                         BN_FLAG: True})
+                                profiler.run(sess, [AtoB_D_op, AtoB_D_metrics_update],
+                                             feed_dict={lr: learning_rate, BN_FLAG: True}, step=step,
+                                             name="AtoB_discriminator")
+                                profiler.run(sess, [BtoA_D_op, BtoA_D_metrics_update],
+                                             feed_dict={lr: learning_rate, BN_FLAG: True}, step=step,
+                                             name="BtoA_discriminator")
                             else:
-                                _, AtoB_D_Loss, AtoB_Dreal_simgoid = sess.run([AtoB_D_train_op, AtoB_DLoss, AtoB_Dreal],
-                                                                              feed_dict={lr: learning_rate})
-                                _, BtoA_D_Loss, BtoA_Dreal_simgoid = sess.run([BtoA_D_train_op, BtoA_DLoss, BtoA_Dreal],
-                                                                              feed_dict={lr: learning_rate})
-
-                        AtoB_LossD += (AtoB_D_Loss / total_batch)
-                        AtoB_LossG += (AtoB_G_Loss / total_batch)
-                        BtoA_LossD += (BtoA_D_Loss / total_batch)
-                        BtoA_LossG += (BtoA_G_Loss / total_batch)
-
-                        AtoB_sigmoidD += (np.mean(AtoB_Dreal_simgoid, axis=(1, 2, 3)) / total_batch)
-                        AtoB_sigmoidG += (np.mean(AtoB_Dgene_simgoid, axis=(1, 2, 3)) / total_batch)
-                        BtoA_sigmoidD += (np.mean(BtoA_Dreal_simgoid, axis=(1, 2, 3)) / total_batch)
-                        BtoA_sigmoidG += (np.mean(BtoA_Dgene_simgoid, axis=(1, 2, 3)) / total_batch)
-
-                        if norm_selection == "BN":
-                            summary_str = sess.run(summary_operation, feed_dict={BN_FLAG: True})
-                        else:
-                            summary_str = sess.run(summary_operation)
+                                profiler.run(sess, [AtoB_D_op, AtoB_D_metrics_update],
+                                             feed_dict={lr: learning_rate}, step=step, name="AtoB_discriminator")
+                                profiler.run(sess, [BtoA_D_op, BtoA_D_metrics_update],
+                                             feed_dict={lr: learning_rate}, step=step, name="BtoA_discriminator")
 
-                        summary_writer.add_summary(summary_str, global_step=epoch)
+                        step_times.append(time.time() - step_start)
 
                         print("<<< {} epoch : {} batch running of {} total batch... >>>".format(epoch, i, total_batch))
 
+                        # 다음에 학습할 위치(epoch, batch)를 같이 저장한다.
+                        progress = {"epoch": epoch + (i + 1) // total_batch, "batch": (i + 1) % total_batch}
+                        # 누적 중인 gradient 는 저장되지 않으므로 update 한 step 에서만 저장한다.
+                        # -> 저장된 위치에서 이어서 학습하면 버려지는 micro-batch 가 없다.
+                        if checkpoint_manager and apply_step:
+                            checkpoint_manager.maybe_save(step, progress)
+                        if metrics_step and (i + 1) % metrics_step == 0:
+                            print("<<< {} epoch : {} batch running mean : {} >>>".format(epoch, i, sess.run(metrics)))
+
+                    if accumulation_steps > 1:
+                        print("<<< {} epoch : {} update / {} batch (accumulation_steps : {}) >>>".format(
+                            epoch, updates - epoch_updates, total_batch, accumulation_steps))
+
+                    # 아래의 mean output 들이 각각 0.5 씩의 값을 갖는게 가장 이상적이다.
+                    epoch_metrics = sess.run(metrics)
                     print("<<< AtoB Discriminator mean output : {} / AtoB Generator mean output : {} >>>".format(
-                        np.mean(AtoB_sigmoidD), np.mean(AtoB_sigmoidG)))
+                        epoch_metrics["AtoB_sigmoidD"], epoch_metrics["AtoB_sigmoidG"]))
                     print("<<< BtoA Discriminator mean output : {} / BtoA Generator mean output : {} >>>".format(
-                        np.mean(AtoB_sigmoidD), np.mean(AtoB_sigmoidG)))
-                    print("<<< AtoB Discriminator Loss : {} / AtoB Generator Loss  : {} >>>".format(AtoB_LossD,
-                                                                                                    AtoB_LossG))
-                    print("<<< BtoA Discriminator Loss : {} / BtoA Generator Loss  : {} >>>".format(BtoA_LossD,
-                                                                                                    BtoA_LossG))
+                        epoch_metrics["BtoA_sigmoidD"], epoch_metrics["BtoA_sigmoidG"]))
+                    print("<<< AtoB Discriminator Loss : {} / AtoB Generator Loss  : {} >>>".format(
+                        epoch_metrics["AtoB_DLoss"], epoch_metrics["AtoB_GLoss"]))
+                    print("<<< BtoA Discriminator Loss : {} / BtoA Generator Loss  : {} >>>".format(
+                        epoch_metrics["BtoA_DLoss"], epoch_metrics["BtoA_GLoss"]))
 
+                    # epoch 끝에서는 누적 중이어도 저장한다. -> 이어서 학습하면 누적 중이던 micro-batch 들은 update 되지 않고 버려진다.
                     if epoch % display_step == 0:
 
-                        save_all_model_path = os.path.join(model_name, 'All')
-                        save_generator_model_path = os.path.join(model_name, 'Generator')
+                        if checkpoint_manager:
+                            checkpoint_manager.save(epoch * total_batch,
+                                                    {"epoch": epoch + 1, "batch": 0}, block=True)
+                        else:
+                            if not os.path.exists(save_all_model_path):
+                                os.makedirs(save_all_model_path)
 
-                        if not os.path.exists(save_all_model_path):
-                            os.makedirs(save_all_model_path)
+                            if not os.path.exists(save_generator_model_path):
+                                os.makedirs(save_generator_model_path)
 
-                        if not os.path.exists(save_generator_model_path):
-                            os.makedirs(save_generator_model_path)
+                            saver_all.save(sess, save_all_model_path + "/", global_step=epoch,
+                                           write_meta_graph=False)
+                            saver_generator.save(sess, save_generator_model_path + "/",
+                                                 global_step=epoch,
+                                                 write_meta_graph=False)
 
-                        saver_all.save(sess, save_all_model_path + "/", global_step=epoch,
-                                       write_meta_graph=False)
-                        saver_generator.save(sess, save_generator_model_path + "/",
-                                             global_step=epoch,
-                                             write_meta_graph=False)
+                # 남은 checkpoint 저장이 끝날 때까지 기다린다.
+                if checkpoint_manager:
+                    checkpoint_manager.close()
                 print("Optimization Finished!")
 
+            # 학습 속도 - benchmarks 에서 사용한다.
+            steady_time = sum(step_times[1:])
+            steps_per_sec = (len(step_times) - 1) / steady_time if steady_time > 0 else 0.0
+            return {"graph_build_sec": graph_build_time,
+                    "first_step_ms": step_times[0] * 1000 if step_times else 0.0,
+                    "steps": len(step_times),
+                    "steps_per_sec": steps_per_sec,
+                    "images_per_sec": steps_per_sec * batch_size,
+                    "data_format": data_format,
+                    "accumulation_steps": accumulation_steps,
+                    "updates": updates}
+
     else:
+        # ResNet generator 는 크기를 2번 반으로 줄이므로, tile 의 크기는 4의 배수여야 한다.
+        if tile_size and (tile_size[0] % 4 != 0 or tile_size[1] % 4 != 0):
+            print("<<< tile_size 는 4의 배수여야 합니다. >>>")
+            exit(0)
+
         tf.reset_default_graph()
         meta_path = glob.glob(os.path.join(model_name, 'Generator', '*.meta'))
         if len(meta_path) == 0:
@@ -642,14 +896,15 @@ def model(
 
             # Test Dataset 가져오기
             dataset = Dataset(DB_name=DB_name, TFRecord=TFRecord,
-                              use_TrainDataset=not TEST, inference_size=inference_size)
+                              use_TrainDataset=not TEST, inference_size=inference_size, mirror=mirror)
             A_iterator, A_next_batch, A_length, B_iterator, B_next_batch, B_length = dataset.iterator()
             A_tensor, B_tensor = A_next_batch, B_next_batch
 
             # A_length 와 B_length 중 짧은 것을 택한다.
             data_length = A_length if A_length < B_length else B_length
 
-            with tf.Session(graph=JG) as sess:
+            # serve=True 이면 CPU 만 사용한다.
+            with tf.Session(graph=JG, config=tf.ConfigProto(device_count={"GPU": 0}) if serve else None) as sess:
                 sess.run(A_iterator.initializer)
                 sess.run(B_iterator.initializer)
                 ckpt = tf.train.get_checkpoint_state(os.path.join(model_name, 'Generator'))
@@ -662,8 +917,21 @@ def model(
                     print("<<< Restore {} checkpoint!!! >>>".format(os.path.basename(ckpt.model_checkpoint_path)))
                     saver.restore(sess, ckpt.model_checkpoint_path)
 
+                # tile 들을 변환하는 함수
+                def generate(x, G):
+                    def run(tiles):
+                        if norm_selection == "BN":
+                            return sess.run(G, feed_dict={x: tiles, BN_FLAG: not using_moving_variable})
+                        else:
+                            return sess.run(G, feed_dict={x: tiles})
+                    return run
+
                 # Generator에서 생성된 이미지 저장
                 if show_translated_image:
+                    # 이미지 인코딩, 쓰기는 백그라운드에서 한다.
+                    writer = ImageWriter(image_format=image_format, png_compression=png_compression,
+                                         jpeg_quality=jpeg_quality, num_workers=writer_workers,
+                                         queue_size=writer_queue_size, use_process=writer_use_process)
                     # A_length 와 B_length 중 짧은 길이만큼만 생성
                     for i in range(data_length):
                         A_numpy, B_numpy = sess.run(
@@ -677,10 +945,18 @@ def model(
                             print("<<< 강제 종료 합니다. >>>")
                             exit(0)
 
-                        if norm_selection == "BN":
+                        # tile_size 가 주어지면 tile 로 나눠서 변환한 뒤 합친다. -> 메모리 사용량이 tile_size 에 따라 정해진다.
+                        if tile_size:
+                            AtoB_translated_image = tiled_inference(generate(A, AtoB_gene), A_numpy[0],
+                                                                    tile_size=tile_size, overlap=tile_overlap,
+                                                                    batch_size=tile_batch_size)[np.newaxis]
+                            BtoA_translated_image = tiled_inference(generate(B, BtoA_gene), B_numpy[0],
+                                                                    tile_size=tile_size, overlap=tile_overlap,
+                                                                    batch_size=tile_batch_size)[np.newaxis]
+                        elif norm_selection == "BN":
                             AtoB_translated_image, BtoA_translated_image = sess.run([AtoB_gene, BtoA_gene],
                                                                                     feed_dict={A: A_numpy, B: B_numpy,
-                                                                                               BN_FLAG: not not using_moving_variable})
+                                                                                               BN_FLAG: not using_moving_variable})
                         else:
                             AtoB_translated_image, BtoA_translated_image = sess.run([AtoB_gene, BtoA_gene],
                                                                                     feed_dict={A: A_numpy, B: B_numpy})
@@ -688,10 +964,12 @@ def model(
                         # 순서 : 입력, 생성
                         visualize(model_name="AtoB" + model_name,
                                   named_images=[i, A_numpy[0], AtoB_translated_image[0]],
-                                  save_path="AtoB" + save_path)
+                                  save_path="AtoB" + save_path, writer=writer)
                         visualize(model_name="BtoA" + model_name,
                                   named_images=[i, B_numpy[0], BtoA_translated_image[0]],
-                                  save_path="BtoA" + save_path)
+                                  save_path="BtoA" + save_path, writer=writer)
+                    # 모든 이미지가 쓰일 때까지 기다린다.
+                    writer.close()
 
                 # 가중치 저장 - 약간 생소한 API지만 유용.
                 if weights_to_numpy:
@@ -730,6 +1008,22 @@ def model(
                             # weight npy로 저장하기
                             np.save(os.path.join(numpy_weight_save_path, joined), reader.get_tensor(name))
 
+                # generator 들을 한번만 불러놓고, 동시에 들어온 요청들을 batch 로 묶어서 변환해 돌려준다.(Ctrl+C 로 종료)
+                # POST /AtoB -> A 이미지를 B 로, POST /BtoA -> B 이미지를 A 로
+                if serve:
+                    serve_feed_dict = {BN_FLAG: not using_moving_variable} if norm_selection == "BN" else {}
+
+                    def translator(x, G):
+                        def translate(batch):
+                            feed_dict = dict(serve_feed_dict)
+                            feed_dict[x] = batch
+                            return sess.run(G, feed_dict=feed_dict)
+                        return translate
+
+                    start_server(routes={"AtoB": translator(A, AtoB_gene), "BtoA": translator(B, BtoA_gene)},
+                                 address=serve_address, inference_size=inference_size,
+                                 max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+
 
 if __name__ == "__main__":
     # 256x256 크기 이상의 다양한 크기의 이미지를 동시 학습 하는 것이 가능하다.(256 X 256으로 크기 제한을 뒀다.)
@@ -741,9 +1035,12 @@ if __name__ == "__main__":
         DB_name="horse2zebra",  # DB_name 은 "horse2zebra"에만 대비되어 있다.
         TEST=False,  # TEST=False -> Training or TEST=True -> TEST
         TFRecord=True,  # TFRecord=True -> TFRecord파일로 저장한후 사용하는 방식 사용 or TFRecord=False -> 파일에서 읽어오는 방식 사용
+        mirror=None,  # 데이터셋을 받을 곳 -> None 이면 원래 주소, 예) "http://내부서버/datasets" or "file:///mnt/datasets"
         Inputsize_limit=(256, 256),  # 입력되어야 하는 최소 사이즈를 내가 지정 - (256,256) 으로 하자
         filter_size=32,  # generator와 discriminator의 처음 layer의 filter 크기
         norm_selection="BN",  # IN - instance normalizaiton , BN -> batch normalization, NOTHING
+        fused_norm=False,  # True -> BN, IN 을 쓰는 층은 bias 를 만들지 않는다.(BN 은 FusedBatchNorm 하나로 정규화)
+        data_format="NHWC",  # NCHW -> generator, discriminator 를 (N, C, H, W) 로 계산한다.(GPU 또는 MKL 빌드 CPU)
         regularizer=" ",  # L1 or L2 정규화 -> 오버피팅 막기 위함
         scale=0.0001,  # L1 or L2 정규화 weight
         cycle_consistency_loss="L1",  # cycle loss -> L1 or L2
@@ -754,6 +1051,11 @@ if __name__ == "__main__":
         use_identity_mapping=False,  # 논문에서는 painting -> photo DB 로 네트워크를 학습할 때 사용 - 우선은 False
         image_pool=True,  # discriminator 업데이트시 이전에 generator로 부터 생성된 이미지의 사용 여부
         image_pool_size=50,  # image_pool=True 라면 몇개를 사용 할지? 논문에선 50개 사용
+        accumulation_steps=1,  # 몇 batch 의 gradient 를 더한 뒤 update 할지 -> 유효 batch 크기 = batch_size x accumulation_steps
+        metrics_step=None,  # 몇 step 마다 학습 중의 평균 loss 를 출력할지 -> None 이면 epoch 이 끝날 때만 출력
+        checkpoint_steps=None,  # 몇 step 마다 백그라운드에서 checkpoint 를 저장할지 -> None 이면 display_step epoch 마다 저장
+        checkpoint_secs=None,  # 몇 초마다 백그라운드에서 checkpoint 를 저장할지
+        keep_checkpoint_every_n_hours=10000.0,  # 최근 3개 외에 몇 시간마다의 checkpoint 를 지우지 않고 남길지
         learning_rate=0.0002, training_epochs=1, batch_size=1, display_step=1,
         weight_decay_epoch=100,  # 몇 epoch 뒤에 learning_rate를 줄일지
         learning_rate_decay=0.99,  # learning_rate를 얼마나 줄일지
@@ -763,6 +1065,24 @@ if __name__ == "__main__":
         show_translated_image=True,  # TEST=True 일 때변환 된 이미지를 보여줄지 말지
         # 학습 완료 후 변환된 이미지가 저장될 폴더 2개가 생성 된다.(폴더 2개 이름 -> AtoB_translated_image , BtoA_translated_image )
         save_path="translated_image",  # TEST=True 일 때 변환된 이미지가 저장될 폴더
-        weights_to_numpy=False)  # TEST=True 일 때 가중치를 npy 파일로 저장할지 말지
+        weights_to_numpy=False,  # TEST=True 일 때 가중치를 npy 파일로 저장할지 말지
+        image_format="png",  # TEST=True 일 때 변환된 이미지를 저장할 형식 -> "png" or "jpeg"
+        png_compression=3,  # png 압축 정도(0 ~ 9) -> 작을수록 빠르고 파일이 크다.
+        jpeg_quality=95,  # jpeg 품질(0 ~ 100)
+        writer_workers=None,  # 이미지를 인코딩하고 쓰는 worker 개수 -> None 이면 cpu 개수
+        writer_queue_size=16,  # 아직 쓰지 않은 이미지를 최대 몇개까지 쌓아둘지
+        writer_use_process=False,  # writer_use_process=True -> process pool 사용 or False -> thread pool 사용
+        tile_size=None,  # TEST=True 일 때 이미지를 tile_size 크기로 나눠서 변환한 뒤 합친다.(4의 배수) -> None 이면 한번에 변환, 예) (256, 256)
+        tile_overlap=32,  # tile 들이 겹치는 크기 -> 겹치는 부분은 가장자리로 갈수록 작아지는 가중치로 섞는다.
+        tile_batch_size=4,  # 한번에 몇개의 tile 을 변환할지
+        serve=False,  # TEST=True 일 때 generator 를 한번만 불러놓고 요청을 받아서 변환해주는 서버를 실행할지 말지(CPU 전용)
+        serve_address=("127.0.0.1", 8000),  # 서버 주소 -> (host, port) 이면 HTTP, "/tmp/cyclegan.sock" 처럼 경로이면 Unix socket
+        max_batch_size=8,  # 서버가 동시에 들어온 요청을 최대 몇개까지 하나의 batch 로 묶을지
+        max_wait_ms=10,  # batch 를 채우기 위해 첫 요청이 들어온 뒤 최대 몇 ms 를 기다릴지
+        synthetic_size=None,  # TEST=False 일 때 데이터셋 대신 이 크기의 랜덤 이미지로 학습한다.(benchmark 용) 예) (256, 256)
+        synthetic_length=100,  # synthetic_size 가 주어졌을 때 1 epoch 의 이미지 개수
+        profile_steps=None,  # 예) [10, 11] -> 10, 11 번째 step 의 Chrome trace 와 scope 별 top-N 연산을 profile/{model_name} 에 저장
+        xla=None,  # None, global -> 그래프 전체를 XLA 로 JIT 컴파일, scope -> generator, discriminator 만 XLA 로 컴파일
+        threads=None)  # None -> benchmarks/autotune.py 가 저장한 이 host 의 설정(없으면 host 기본 설정), False -> tensorflow 기본값, dict -> 직접 지정, "0" -> autotune 이 slot "0" 으로 저장한 설정
 else:
     print("model imported")
@@ -74,9 +74,12 @@ cycleGAN.model(
     DB_name="horse2zebra",  # DB_name 은 "horse2zebra"에만 대비되어 있다.
     TEST=False,  # TEST=False -> Training or TEST=True -> TEST
     TFRecord=True,  # TFRecord=True -> TFRecord파일로 저장한후 사용하는 방식 사용 or TFRecord=False -> 파일에서 읽어오는 방식 사용
+    mirror=None,  # 데이터셋을 받을 곳 -> None 이면 원래 주소, 예) "http://내부서버/datasets" or "file:///mnt/datasets"
     Inputsize_limit=(256, 256),  # 입력되어야 하는 최소 사이즈를 내가 지정 - (256,256) 으로 하자
     filter_size=32,  # generator와 discriminator의 처음 layer의 filter 크기
     norm_selection="BN",  # IN - instance normalizaiton , BN -> batch normalization, NOTHING
+    fused_norm=False,  # True -> BN, IN 을 쓰는 층은 bias 를 만들지 않는다.(BN 은 FusedBatchNorm 하나로 정규화)
+    data_format="NHWC",  # NCHW -> generator, discriminator 를 (N, C, H, W) 로 계산한다.(GPU 또는 MKL 빌드 CPU)
     regularizer="",  # L1 or L2 정규화  -> 오버피팅 막기 위함
     scale=0.0001,  # L1 or L2 정규화 weight
     cycle_consistency_loss="L1",  # cycle loss -> L1 or L2
@@ -87,6 +90,11 @@ cycleGAN.model(
     use_identity_mapping=False,  # 논문에서는 painting -> photo DB 로 네트워크를 학습할 때 사용 - 우선은 False
     image_pool=True,  # discriminator 업데이트시 이전에 generator로 부터 생성된 이미지의 사용 여부
     image_pool_size=50,  # image_pool=True 라면 몇개를 사용 할지? 논문에선 50개 사용
+    accumulation_steps=1,  # 몇 batch 의 gradient 를 더한 뒤 update 할지 -> 유효 batch 크기 = batch_size x accumulation_steps
+    metrics_step=None,  # 몇 step 마다 학습 중의 평균 loss 를 출력할지 -> None 이면 epoch 이 끝날 때만 출력
+    checkpoint_steps=None,  # 몇 step 마다 백그라운드에서 checkpoint 를 저장할지 -> None 이면 display_step epoch 마다 저장
+    checkpoint_secs=None,  # 몇 초마다 백그라운드에서 checkpoint 를 저장할지
+    keep_checkpoint_every_n_hours=10000.0,  # 최근 3개 외에 몇 시간마다의 checkpoint 를 지우지 않고 남길지
     learning_rate=0.0002, training_epochs=1, batch_size=1, display_step=1,
     weight_decay_epoch=100,  # 몇 epoch 뒤에 learning_rate를 줄일지
     learning_rate_decay=0.99,  # learning_rate를 얼마나 줄일지
@@ -96,4 +104,22 @@ cycleGAN.model(
     show_translated_image=True,  # TEST=True 일 때변환 된 이미지를 보여줄지 말지
     # 학습 완료 후 변환된 이미지가 저장될 폴더 2개가 생성 된다.(폴더 2개 이름 -> AtoB_translated_image , BtoA_translated_image )
     save_path="translated_image",  # TEST=True 일 때 변환된 이미지가 저장될 폴더
-    weights_to_numpy=False)  # TEST=True 일 때 가중치를 npy 파일로 저장할지 말지
+    weights_to_numpy=False,  # TEST=True 일 때 가중치를 npy 파일로 저장할지 말지
+    image_format="png",  # TEST=True 일 때 변환된 이미지를 저장할 형식 -> "png" or "jpeg"
+    png_compression=3,  # png 압축 정도(0 ~ 9) -> 작을수록 빠르고 파일이 크다.
+    jpeg_quality=95,  # jpeg 품질(0 ~ 100)
+    writer_workers=None,  # 이미지를 인코딩하고 쓰는 worker 개수 -> None 이면 cpu 개수
+    writer_queue_size=16,  # 아직 쓰지 않은 이미지를 최대 몇개까지 쌓아둘지
+    writer_use_process=False,  # writer_use_process=True -> process pool 사용 or False -> thread pool 사용
+    tile_size=None,  # TEST=True 일 때 이미지를 tile_size 크기로 나눠서 변환한 뒤 합친다.(4의 배수) -> None 이면 한번에 변환, 예) (256, 256)
+    tile_overlap=32,  # tile 들이 겹치는 크기 -> 겹치는 부분은 가장자리로 갈수록 작아지는 가중치로 섞는다.
+    tile_batch_size=4,  # 한번에 몇개의 tile 을 변환할지
+    serve=False,  # TEST=True 일 때 generator 를 한번만 불러놓고 요청을 받아서 변환해주는 서버를 실행할지 말지(CPU 전용)
+    serve_address=("127.0.0.1", 8000),  # 서버 주소 -> (host, port) 이면 HTTP, "/tmp/cyclegan.sock" 처럼 경로이면 Unix socket
+    max_batch_size=8,  # 서버가 동시에 들어온 요청을 최대 몇개까지 하나의 batch 로 묶을지
+    max_wait_ms=10,  # batch 를 채우기 위해 첫 요청이 들어온 뒤 최대 몇 ms 를 기다릴지
+    synthetic_size=None,  # TEST=False 일 때 데이터셋 대신 이 크기의 랜덤 이미지로 학습한다.(benchmark 용) 예) (256, 256)
+    synthetic_length=100,  # synthetic_size 가 주어졌을 때 1 epoch 의 이미지 개수
+    profile_steps=None,  # 예) [10, 11] -> 10, 11 번째 step 의 Chrome trace 와 scope 별 top-N 연산을 profile/{model_name} 에 저장
+    xla=None,  # None, global -> 그래프 전체를 XLA 로 JIT 컴파일, scope -> generator, discriminator 만 XLA 로 컴파일
+    threads=None)  # None -> benchmarks/autotune.py 가 저장한 이 host 의 설정(없으면 host 기본 설정), False -> tensorflow 기본값, dict -> 직접 지정, "0" -> autotune 이 slot "0" 으로 저장한 설정
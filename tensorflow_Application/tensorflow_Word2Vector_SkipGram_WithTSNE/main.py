@@ -9,4 +9,7 @@ Word2Vec(TEST=False, tSNE=True, model_name="Word2Vec", weight_selection="encoder
          # num_skip : 하나의 문장당 num_skips 개의 데이터를 생성
          validation_number=30, embedding_size=128, batch_size=128, num_skips=2, window_size=1,
          negative_sampling=64, optimizer_selection="SGD", learning_rate=0.1, training_epochs=1000,
-         display_step=1, weight_sharing=False)
+         display_step=1, weight_sharing=False,
+         profile_steps=None,  # 예) [10, 11] -> 10, 11 번째 step 의 Chrome trace 와 scope 별 top-N 연산을 profile/{model_name} 에 저장
+         xla=None,  # None, global -> 그래프 전체를 XLA 로 JIT 컴파일, scope -> embedding 만 XLA 로 컴파일
+         threads=None)  # None -> benchmarks/autotune.py 가 저장한 이 host 의 설정(없으면 host 기본 설정), False -> tensorflow 기본값, dict -> 직접 지정
@@ -8,6 +8,9 @@ import tensorflow as tf
 from sklearn.manifold import TSNE
 from tensorflow.contrib.tensorboard.plugins import projector
 from tqdm import tqdm
+from Profiler import StepProfiler
+from ThreadConfig import apply_thread_config
+from XLA import jit_scope, xla_config
 from data_preprocessing import data_preprocessing
 
 def Word2Vec(TEST=True, tSNE=True, model_name="Word2Vec", weight_selection="encoder",  # encoder or decoder
@@ -16,7 +19,7 @@ def Word2Vec(TEST=True, tSNE=True, model_name="Word2Vec", weight_selection="enco
              # num_skip : 하나의 문장당 num_skips 개의 데이터를 생성
              validation_number=30, embedding_size=192, batch_size=192, num_skips=8, window_size=4,
              negative_sampling=64, optimizer_selection="SGD", learning_rate=0.1, training_epochs=100,
-             display_step=1, weight_sharing=False, *Arg, **kwargs):
+             display_step=1, weight_sharing=False, profile_steps=None, xla=None, threads=None, *Arg, **kwargs):
     if weight_sharing:
         model_name = "ws" + model_name
 
@@ -81,7 +84,7 @@ def Word2Vec(TEST=True, tSNE=True, model_name="Word2Vec", weight_selection="enco
                 train_inputs = tf.placeholder(tf.int32, shape=[batch_size])
                 train_labels = tf.placeholder(tf.int32, shape=[batch_size, 1])
 
-            with tf.name_scope("Skip_Gram"):
+            with tf.name_scope("Skip_Gram"), jit_scope(xla):
                 embed, e_matrix = embedding_layer(embedding_shape=(dp.vocabulary_size, embedding_size),
                                                   train_inputs=train_inputs)
                 # scope.reuse_variables()
@@ -124,7 +127,12 @@ def Word2Vec(TEST=True, tSNE=True, model_name="Word2Vec", weight_selection="enco
             saver.export_meta_graph(meta_save_file_path, collection_list=["way"])
 
             config = tf.ConfigProto(log_device_placement=False, allow_soft_placement=True)
+            config = xla_config(config, xla)
+            config = apply_thread_config(config, "Word2Vec", threads)
             config.gpu_options.allow_growth = True
+            # profile_steps 에 있는 step 만 연산별 시간, 메모리를 기록한다.
+            profiler = StepProfiler(profile_steps=profile_steps, save_path=os.path.join("profile", model_name),
+                                    scopes=["embedding", "nce", "trainer"])
 
             with tf.Session(graph=JG_Graph, config=config) as sess:
                 print("initializing!!!")
@@ -167,13 +175,15 @@ def Word2Vec(TEST=True, tSNE=True, model_name="Word2Vec", weight_selection="enco
 
                 projector.visualize_embeddings(summary_writer, config)
 
-                for epoch in tqdm(range(training_epochs)):
+                for epoch in tqdm(range(1, training_epochs + 1)):
                     avg_cost = 0.
                     for minibatch in range(batches_per_epoch):  # # Number of batches per epoch of training
                         mbatch_x, mbatch_y = dp.generate_batch(batch_size=batch_size, num_skips=num_skips,
                                                                window_size=window_size)
                         feed_dict = {train_inputs: mbatch_x, train_labels: mbatch_y}
-                        _, new_cost = sess.run([train_operation, cost], feed_dict=feed_dict)
+                        _, new_cost = profiler.run(sess, [train_operation, cost], feed_dict=feed_dict,
+                                                   step=(epoch - 1) * batches_per_epoch + minibatch + 1,
+                                                   name="skip_gram")
                         # Compute average loss
                         avg_cost += new_cost / batches_per_epoch
                     print("cost : {0:0.3}".format(avg_cost))
@@ -309,6 +319,9 @@ if __name__ == "__main__":
              # num_skip : 하나의 문장당 num_skips 개의 데이터를 생성
              validation_number=30, embedding_size=128, batch_size=128, num_skips=2, window_size=1,
              negative_sampling=64, optimizer_selection="SGD", learning_rate=0.1, training_epochs=1000,
-             display_step=1, weight_sharing=False)
+             display_step=1, weight_sharing=False,
+             profile_steps=None,  # 예) [10, 11] -> 10, 11 번째 step 의 Chrome trace 와 scope 별 top-N 연산을 profile/{model_name} 에 저장
+             xla=None,  # None, global -> 그래프 전체를 XLA 로 JIT 컴파일, scope -> embedding 만 XLA 로 컴파일
+             threads=None)  # None -> benchmarks/autotune.py 가 저장한 이 host 의 설정(없으면 host 기본 설정), False -> tensorflow 기본값, dict -> 직접 지정
 else:
     print("word2vec imported")
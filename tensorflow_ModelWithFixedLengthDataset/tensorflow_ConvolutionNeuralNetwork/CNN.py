@@ -5,9 +5,14 @@ import tensorflow as tf
 from tensorflow.examples.tutorials.mnist import input_data
 from tqdm import tqdm
 
+from Profiler import StepProfiler
+from ThreadConfig import apply_thread_config
+from XLA import jit_scope, xla_config
+
 
 def model(TEST=False, optimizer_selection="Adam", learning_rate=0.001, training_epochs=10,
-          batch_size=256, display_step=1, batch_norm=False, regularization='L1', scale=0.0001):
+          batch_size=256, display_step=1, batch_norm=False, regularization='L1', scale=0.0001,
+          profile_steps=None, xla=None, threads=None):
     mnist = input_data.read_data_sets("", one_hot=True)
 
     model_name = "CNN"
@@ -129,7 +134,7 @@ def model(TEST=False, optimizer_selection="Adam", learning_rate=0.001, training_
             x = tf.placeholder("float", [None, 784])
             y = tf.placeholder("float", [None, 10])
         with tf.variable_scope("shared_variables", reuse=tf.AUTO_REUSE) as scope:
-            with tf.name_scope("inference"):
+            with tf.name_scope("inference"), jit_scope(xla):
                 output = inference(x)
             # or scope.reuse_variables()
 
@@ -149,7 +154,12 @@ def model(TEST=False, optimizer_selection="Adam", learning_rate=0.001, training_
             evaluate_operation = evaluate(output, y)
 
     config = tf.ConfigProto(log_device_placement=False, allow_soft_placement=True)
+    config = xla_config(config, xla)
+    config = apply_thread_config(config, "CNN", threads)
     config.gpu_options.allow_growth = True
+    # profile_steps 에 있는 step 만 연산별 시간, 메모리를 기록한다.
+    profiler = StepProfiler(profile_steps=profile_steps, save_path=os.path.join("profile", model_name),
+                            scopes=["conv_1", "conv_2", "conv_3", "conv_4", "loss", "trainer"])
     with tf.Session(graph=JG_Graph, config=config) as sess:
         print("initializing!!!")
         sess.run(tf.global_variables_initializer())
@@ -171,7 +181,8 @@ def model(TEST=False, optimizer_selection="Adam", learning_rate=0.001, training_
                 for i in range(total_batch):
                     mbatch_x, mbatch_y = mnist.train.next_batch(batch_size)
                     feed_dict = {x: mbatch_x, y: mbatch_y}
-                    sess.run(train_operation, feed_dict=feed_dict)
+                    profiler.run(sess, train_operation, feed_dict=feed_dict, step=(epoch - 1) * total_batch + i + 1,
+                                 name="train")
 
                     minibatch_cost = sess.run(cost, feed_dict=feed_dict)
                     avg_cost += (minibatch_cost / total_batch)
@@ -205,6 +216,9 @@ if __name__ == "__main__":
     # batch normalization은 Hidden Layer에만 추가합니다. 또한 활성화 함수전에 적용합니다.
     # regularization -> batch_norm = False 일때, L2 or L1 or nothing
     model(TEST=True, optimizer_selection="Adam", learning_rate=0.001, training_epochs=10,
-          batch_size=256, display_step=1, batch_norm=True, regularization='L2', scale=0.0001)
+          batch_size=256, display_step=1, batch_norm=True, regularization='L2', scale=0.0001,
+          profile_steps=None,  # 예) [10, 11] -> 10, 11 번째 step 의 Chrome trace 와 scope 별 top-N 연산을 profile/{model_name} 에 저장
+          xla=None,  # None, global -> 그래프 전체를 XLA 로 JIT 컴파일, scope -> inference 만 XLA 로 컴파일
+          threads=None)  # None -> benchmarks/autotune.py 가 저장한 이 host 의 설정(없으면 host 기본 설정), False -> tensorflow 기본값, dict -> 직접 지정
 else:
     print("model imported")
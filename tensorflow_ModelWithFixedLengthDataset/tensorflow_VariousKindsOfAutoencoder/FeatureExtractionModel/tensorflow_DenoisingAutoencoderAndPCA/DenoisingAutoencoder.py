@@ -7,13 +7,18 @@ import tensorflow as tf
 from tensorflow.examples.tutorials.mnist import input_data
 from tqdm import tqdm
 
+from Profiler import StepProfiler
+from ThreadConfig import apply_thread_config
+from XLA import jit_scope, xla_config
+
 import PCA
 
 
 def model(TEST=True, Comparison_with_PCA=True, corrupt_probability=0.5,
           optimizer_selection="Adam", model_name="DA",
           learning_rate=0.001, training_epochs=100,
-          batch_size=128, display_step=10, batch_norm=True, regularization='L1', scale=0.0001):
+          batch_size=128, display_step=10, batch_norm=True, regularization='L1', scale=0.0001,
+          profile_steps=None, xla=None, threads=None):
     mnist = input_data.read_data_sets("", one_hot=False)
 
     if batch_norm == True:
@@ -293,7 +298,7 @@ def model(TEST=True, Comparison_with_PCA=True, corrupt_probability=0.5,
             x = tf.placeholder("float", [None, 28, 28, 1])
             d_x = Denoising(x, r=corrupt_probability)
         with tf.variable_scope("shared_variables", reuse=tf.AUTO_REUSE) as scope:
-            with tf.name_scope("inference"):
+            with tf.name_scope("inference"), jit_scope(xla):
                 encoder_output, decoder_output = inference(d_x)
             # or scope.reuse_variables()
 
@@ -312,7 +317,12 @@ def model(TEST=True, Comparison_with_PCA=True, corrupt_probability=0.5,
             evaluate_operation = evaluate(decoder_output, d_x)
 
     config = tf.ConfigProto(log_device_placement=False, allow_soft_placement=True)
+    config = xla_config(config, xla)
+    config = apply_thread_config(config, "DenoisingAutoencoder", threads)
     config.gpu_options.allow_growth = True
+    # profile_steps 에 있는 step 만 연산별 시간, 메모리를 기록한다.
+    profiler = StepProfiler(profile_steps=profile_steps, save_path=os.path.join("profile", model_name),
+                            scopes=["encoder", "decoder", "loss", "trainer"])
     with tf.Session(graph=JG_Graph, config=config) as sess:
         print("initializing!!!")
         sess.run(tf.global_variables_initializer())
@@ -326,13 +336,14 @@ def model(TEST=True, Comparison_with_PCA=True, corrupt_probability=0.5,
 
             summary_writer = tf.summary.FileWriter(os.path.join("tensorboard", model_name), sess.graph)
 
-            for epoch in tqdm(range(training_epochs)):
+            for epoch in tqdm(range(1, training_epochs + 1)):
                 avg_cost = 0.
                 total_batch = int(mnist.train.num_examples / batch_size)
                 for i in range(total_batch):
                     mbatch_x, mbatch_y = mnist.train.next_batch(batch_size)
                     feed_dict = {x: mbatch_x.reshape((-1, 28, 28, 1))}
-                    _, minibatch_cost = sess.run([train_operation, cost], feed_dict=feed_dict)
+                    _, minibatch_cost = profiler.run(sess, [train_operation, cost], feed_dict=feed_dict,
+                                                     step=(epoch - 1) * total_batch + i + 1, name="train")
                     avg_cost += (minibatch_cost / total_batch)
 
                 print("L2 cost : {}".format(avg_cost))
@@ -405,6 +416,9 @@ if __name__ == "__main__":
     # regularization -> batch_norm = False 일때, L2 or L1 or nothing
     model(TEST=True, Comparison_with_PCA=True, corrupt_probability=0.5,
           optimizer_selection="Adam", model_name="CDA", learning_rate=0.001, training_epochs=1, batch_size=256,
-          display_step=1, batch_norm=True, regularization='L1', scale=0.0001)
+          display_step=1, batch_norm=True, regularization='L1', scale=0.0001,
+          profile_steps=None,  # 예) [10, 11] -> 10, 11 번째 step 의 Chrome trace 와 scope 별 top-N 연산을 profile/{model_name} 에 저장
+          xla=None,  # None, global -> 그래프 전체를 XLA 로 JIT 컴파일, scope -> inference 만 XLA 로 컴파일
+          threads=None)  # None -> benchmarks/autotune.py 가 저장한 이 host 의 설정(없으면 host 기본 설정), False -> tensorflow 기본값, dict -> 직접 지정
 else:
     print("model imported")
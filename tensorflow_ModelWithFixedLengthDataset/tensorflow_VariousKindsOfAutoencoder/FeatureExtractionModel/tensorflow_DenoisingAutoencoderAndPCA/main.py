@@ -6,4 +6,7 @@ import DenoisingAutoencoder as DA
 # regularization -> batch_norm = False 일때, L2 or L1 or nothing
 DA.model(TEST=True, Comparison_with_PCA=True, corrupt_probability=0.5,
          optimizer_selection="Adam", model_name="CDA", learning_rate=0.001, training_epochs=1, batch_size=256,
-         display_step=1, batch_norm=True, regularization='L1', scale=0.0001)
+         display_step=1, batch_norm=True, regularization='L1', scale=0.0001,
+         profile_steps=None,  # 예) [10, 11] -> 10, 11 번째 step 의 Chrome trace 와 scope 별 top-N 연산을 profile/{model_name} 에 저장
+         xla=None,  # None, global -> 그래프 전체를 XLA 로 JIT 컴파일, scope -> inference 만 XLA 로 컴파일
+         threads=None)  # None -> benchmarks/autotune.py 가 저장한 이 host 의 설정(없으면 host 기본 설정), False -> tensorflow 기본값, dict -> 직접 지정
@@ -7,6 +7,10 @@ import tensorflow as tf
 from tensorflow.examples.tutorials.mnist import input_data
 from tqdm import tqdm
 
+from Profiler import StepProfiler
+from ThreadConfig import apply_thread_config
+from XLA import jit_scope, xla_config
+
 
 # evaluate the data
 def show_image(model_name, generated_image, column_size=10, row_size=10):
@@ -25,7 +29,8 @@ def show_image(model_name, generated_image, column_size=10, row_size=10):
 
 def model(TEST=True, noise_size=100, targeting=True, distance_loss="L2", distance_loss_weight=1,
           optimizer_selection="Adam", learning_rate=0.001, training_epochs=100,
-          batch_size=128, display_step=10, batch_norm=True, regularization='L1', scale=0.0001):
+          batch_size=128, display_step=10, batch_norm=True, regularization='L1', scale=0.0001,
+          profile_steps=None, xla=None, threads=None):
     mnist = input_data.read_data_sets("", one_hot=True)
 
     if targeting == False:
@@ -148,9 +153,9 @@ def model(TEST=True, noise_size=100, targeting=True, distance_loss="L2", distanc
             target = tf.placeholder("float", [None, 10])
             z = tf.placeholder("float", [None, noise_size])
         with tf.variable_scope("shared_variables", reuse=tf.AUTO_REUSE) as scope:
-            with tf.name_scope("generator"):
+            with tf.name_scope("generator"), jit_scope(xla):
                 G = generator(noise=z, target=target)
-            with tf.name_scope("discriminator"):
+            with tf.name_scope("discriminator"), jit_scope(xla):
                 D_real, sigmoid_D_real = discriminator(x=x, target=target)
                 # scope.reuse_variables()
                 D_gene, sigmoid_D_gene = discriminator(x=G, target=target)
@@ -202,7 +207,13 @@ def model(TEST=True, noise_size=100, targeting=True, distance_loss="L2", distanc
             summary_operation = tf.summary.merge_all()
 
     config = tf.ConfigProto(log_device_placement=False, allow_soft_placement=True)
+    config = xla_config(config, xla)
+    config = apply_thread_config(config, "GAN", threads)
     config.gpu_options.allow_growth = True
+    # profile_steps 에 있는 step 만 연산별 시간, 메모리를 기록한다.
+    profiler = StepProfiler(profile_steps=profile_steps, save_path=os.path.join("profile", model_name),
+                            scopes=["generator", "discriminator", "Discriminator_loss", "Generator_loss",
+                                    "Discriminator_trainer", "Generator_trainer"])
     with tf.Session(graph=JG_Graph, config=config) as sess:
         print("initializing!!!")
         sess.run(tf.global_variables_initializer())
@@ -237,11 +248,13 @@ def model(TEST=True, noise_size=100, targeting=True, distance_loss="L2", distanc
                     noise = np.random.normal(loc=0.0, scale=1.0, size=(batch_size, noise_size))
                     feed_dict_all = {x: mbatch_x, target: mbatch_y, z: noise}
                     feed_dict_Generator = {x: mbatch_x, target: mbatch_y, z: noise}
-                    _, Discriminator_Loss, D_real_simgoid = sess.run([D_train_op, D_Loss, sigmoid_D_real],
-                                                                     feed_dict=feed_dict_all)
-                    _, Generator_Loss, Distance_Loss, D_gene_simgoid = sess.run(
-                        [G_train_op, G_Loss, dis_loss, sigmoid_D_gene],
-                        feed_dict=feed_dict_Generator)
+                    step = (epoch - 1) * total_batch + i + 1
+                    _, Discriminator_Loss, D_real_simgoid = profiler.run(sess, [D_train_op, D_Loss, sigmoid_D_real],
+                                                                         feed_dict=feed_dict_all, step=step,
+                                                                         name="discriminator")
+                    _, Generator_Loss, Distance_Loss, D_gene_simgoid = profiler.run(
+                        sess, [G_train_op, G_Loss, dis_loss, sigmoid_D_gene],
+                        feed_dict=feed_dict_Generator, step=step, name="generator")
                     Loss_D += (Discriminator_Loss / total_batch)
                     Loss_G += (Generator_Loss / total_batch)
                     Loss_Distance += (Distance_Loss / total_batch)
@@ -309,7 +322,10 @@ if __name__ == "__main__":
           distance_loss_weight=1, \
           optimizer_selection="Adam", learning_rate=0.0002, training_epochs=50,
           batch_size=128,
-          display_step=1, regularization='L2', scale=0.0001)
+          display_step=1, regularization='L2', scale=0.0001,
+          profile_steps=None,  # 예) [10, 11] -> 10, 11 번째 step 의 Chrome trace 와 scope 별 top-N 연산을 profile/{model_name} 에 저장
+          xla=None,  # None, global -> 그래프 전체를 XLA 로 JIT 컴파일, scope -> generator, discriminator 만 XLA 로 컴파일
+          threads=None)  # None -> benchmarks/autotune.py 가 저장한 이 host 의 설정(없으면 host 기본 설정), False -> tensorflow 기본값, dict -> 직접 지정
 
 else:
     print("model imported")
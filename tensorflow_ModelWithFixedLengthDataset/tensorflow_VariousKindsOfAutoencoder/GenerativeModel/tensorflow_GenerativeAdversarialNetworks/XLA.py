@@ -0,0 +1,43 @@
+import contextlib
+import os
+
+import tensorflow as tf
+
+'''
+XLA(Accelerated Linear Algebra) JIT 컴파일 설정
+
+1. xla="global" -> 그래프 전체에서 XLA 로 컴파일할 수 있는 연산들을 묶어(cluster) 하나의 kernel 로 컴파일한다.
+   -> tensorflow 1.x 의 global_jit_level 은 GPU 에만 적용되므로, CPU 에서도 적용되도록 TF_XLA_FLAGS 에
+      --tf_xla_cpu_global_jit 를 추가한다.(첫 Session 을 만들기 전에 설정되어야 한다.)
+2. xla="scope" -> jit_scope 로 감싼 부분(generator, discriminator, inference 등)과 그 역전파만 XLA 로 컴파일한다.
+   -> CPU, GPU 모두 적용된다.
+3. xla=None -> XLA 를 사용하지 않는다.
+-> leaky_relu, tanh, instance norm 처럼 원소 단위(elementwise) 연산이 이어진 부분이 몇 개의 kernel 로 합쳐진다.
+-> 첫 step 에서 컴파일하므로 첫 step 이 느려지고, 입력의 모양이 바뀌면 다시 컴파일한다.
+'''
+
+XLA_MODES = (None, "global", "scope")
+
+
+def check_xla(xla):
+    if xla not in XLA_MODES:
+        print("<<< xla 는 None, global, scope 중 하나입니다. >>>")
+        exit(0)
+
+
+def xla_config(config, xla):
+    check_xla(xla)
+    if xla == "global":
+        flags = os.environ.get("TF_XLA_FLAGS", "")
+        if "--tf_xla_cpu_global_jit" not in flags:
+            os.environ["TF_XLA_FLAGS"] = (flags + " --tf_xla_cpu_global_jit").strip()
+        config.graph_options.optimizer_options.global_jit_level = tf.OptimizerOptions.ON_1
+    return config
+
+
+def jit_scope(xla):
+    check_xla(xla)
+    if xla == "scope":
+        return tf.contrib.compiler.jit.experimental_jit_scope()
+    # 아무것도 하지 않는 context manager
+    return contextlib.ExitStack()
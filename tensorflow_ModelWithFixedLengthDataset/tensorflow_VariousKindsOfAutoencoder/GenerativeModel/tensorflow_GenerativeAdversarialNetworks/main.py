@@ -18,4 +18,7 @@ GenerativeAdversarialNetworks.model(TEST=True, noise_size=128, targeting=True, d
                                     distance_loss_weight=1, \
                                     optimizer_selection="Adam", learning_rate=0.0002, training_epochs=50,
                                     batch_size=128,
-                                    display_step=1, regularization='L2', scale=0.0001)
+                                    display_step=1, regularization='L2', scale=0.0001,
+                                    profile_steps=None,  # 예) [10, 11] -> 10, 11 번째 step 의 Chrome trace 와 scope 별 top-N 연산을 profile/{model_name} 에 저장
+                                    xla=None,  # None, global -> 그래프 전체를 XLA 로 JIT 컴파일, scope -> generator, discriminator 만 XLA 로 컴파일
+                                    threads=None)  # None -> benchmarks/autotune.py 가 저장한 이 host 의 설정(없으면 host 기본 설정), False -> tensorflow 기본값, dict -> 직접 지정
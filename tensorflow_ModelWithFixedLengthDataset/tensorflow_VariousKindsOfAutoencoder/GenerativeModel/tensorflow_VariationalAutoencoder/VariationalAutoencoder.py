@@ -7,6 +7,10 @@ import tensorflow as tf
 from tensorflow.examples.tutorials.mnist import input_data
 from tqdm import tqdm
 
+from Profiler import StepProfiler
+from ThreadConfig import apply_thread_config
+from XLA import jit_scope, xla_config
+
 
 # evaluate the data
 def show_image(model_name, generated_image, column_size=10, row_size=10):
@@ -25,7 +29,8 @@ def show_image(model_name, generated_image, column_size=10, row_size=10):
 
 def model(TEST=True, targeting=True, latent_number=16, optimizer_selection="Adam",
           learning_rate=0.001, training_epochs=100,
-          batch_size=128, display_step=10, batch_norm=True, regularization='L1', scale=0.0001):
+          batch_size=128, display_step=10, batch_norm=True, regularization='L1', scale=0.0001,
+          profile_steps=None, xla=None, threads=None):
     mnist = input_data.read_data_sets("", one_hot=False)
 
     if targeting:
@@ -170,7 +175,7 @@ def model(TEST=True, targeting=True, latent_number=16, optimizer_selection="Adam
             target = tf.placeholder("float", [None])
 
         with tf.variable_scope("shared_variables", reuse=tf.AUTO_REUSE) as scope:
-            with tf.name_scope("inference"):
+            with tf.name_scope("inference"), jit_scope(xla):
                 latent_variable, encoder_output, decoder_output = inference(x, target, latent_number)
             # scope.reuse_variables()
 
@@ -195,7 +200,12 @@ def model(TEST=True, targeting=True, latent_number=16, optimizer_selection="Adam
             evaluate_operation = evaluate(decoder_output, x)
 
     config = tf.ConfigProto(log_device_placement=False, allow_soft_placement=True)
+    config = xla_config(config, xla)
+    config = apply_thread_config(config, "VAE", threads)
     config.gpu_options.allow_growth = True
+    # profile_steps 에 있는 step 만 연산별 시간, 메모리를 기록한다.
+    profiler = StepProfiler(profile_steps=profile_steps, save_path=os.path.join("profile", model_name),
+                            scopes=["encoder", "mean_variance", "decoder", "loss", "trainer"])
     with tf.Session(graph=JG_Graph, config=config) as sess:
         sess.run(tf.global_variables_initializer())
         ckpt_all = tf.train.get_checkpoint_state(os.path.join('model', model_name, 'all'))
@@ -223,7 +233,8 @@ def model(TEST=True, targeting=True, latent_number=16, optimizer_selection="Adam
                 for i in range(total_batch):
                     mbatch_x, mbatch_y = mnist.train.next_batch(batch_size)
                     feed_dict = {x: mbatch_x.reshape((-1, 28, 28, 1)), target: mbatch_y}
-                    _, minibatch_cost = sess.run([train_operation, cost], feed_dict=feed_dict)
+                    _, minibatch_cost = profiler.run(sess, [train_operation, cost], feed_dict=feed_dict,
+                                                     step=(epoch - 1) * total_batch + i + 1, name="train")
                     avg_cost += (minibatch_cost / total_batch)
 
                 print("cost : {}".format(avg_cost))
@@ -283,7 +294,10 @@ if __name__ == "__main__":
     # regularization -> batch_norm = False 일때, L2 or L1 or nothing
     model(TEST=True, targeting=False, latent_number=32, optimizer_selection="Adam", \
           learning_rate=0.001, training_epochs=1, batch_size=512, display_step=1, batch_norm=True,
-          regularization='L2', scale=0.0001)
+          regularization='L2', scale=0.0001,
+          profile_steps=None,  # 예) [10, 11] -> 10, 11 번째 step 의 Chrome trace 와 scope 별 top-N 연산을 profile/{model_name} 에 저장
+          xla=None,  # None, global -> 그래프 전체를 XLA 로 JIT 컴파일, scope -> inference 만 XLA 로 컴파일
+          threads=None)  # None -> benchmarks/autotune.py 가 저장한 이 host 의 설정(없으면 host 기본 설정), False -> tensorflow 기본값, dict -> 직접 지정
     
 else:
     print("model imported")
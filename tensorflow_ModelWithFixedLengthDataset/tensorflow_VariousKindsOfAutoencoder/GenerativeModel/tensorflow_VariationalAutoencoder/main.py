@@ -9,4 +9,7 @@ targeting = True 일 때는 숫자를 타게팅 하여 생성하는 VAE 생성 -
 # batch normalization은 Hidden Layer에만 추가합니다. 또한 활성화 함수전에 적용합니다.
 # regularization -> batch_norm = False 일때, L2 or L1 or nothing
 VA.model(TEST=True, targeting=False, latent_number=32, optimizer_selection="Adam", \
-         learning_rate=0.001, training_epochs=1, batch_size=512, display_step=1, batch_norm=True, regularization='L2', scale=0.0001)
+         learning_rate=0.001, training_epochs=1, batch_size=512, display_step=1, batch_norm=True, regularization='L2', scale=0.0001,
+         profile_steps=None,  # 예) [10, 11] -> 10, 11 번째 step 의 Chrome trace 와 scope 별 top-N 연산을 profile/{model_name} 에 저장
+         xla=None,  # None, global -> 그래프 전체를 XLA 로 JIT 컴파일, scope -> inference 만 XLA 로 컴파일
+         threads=None)  # None -> benchmarks/autotune.py 가 저장한 이 host 의 설정(없으면 host 기본 설정), False -> tensorflow 기본값, dict -> 직접 지정